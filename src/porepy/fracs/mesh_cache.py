@@ -0,0 +1,195 @@
+"""
+On-disk cache of meshed fracture networks.
+
+Meshing of fractured domains (gmsh, conversion to grids, splitting of the
+fracture faces, computation of geometry) is expensive, and parameter studies
+tend to mesh the same geometry many times. A MeshCache stores the resulting
+GridBucket on disk, keyed by a hash of the arguments to the meshing function:
+fracture geometry, domain, tolerances and mesh size parameters.
+
+The cache is opt-in, by passing a MeshCache to the meshing functions:
+    cache = MeshCache('mesh_cache', max_bytes=2e9)
+    gb = meshing.simplex_grid(fracs, domain, mesh_cache=cache, **mesh_kwargs)
+
+Cached buckets are stored with grids.serialization, and contain the grids,
+the face_cells of the edges and the node ordering. The cache is limited in
+size and number of entries, with the least recently used entries evicted
+first.
+
+"""
+import os
+import glob
+import hashlib
+import logging
+import numpy as np
+
+from porepy.fracs.fractures import Fracture, FractureNetwork
+from porepy.grids import serialization
+
+logger = logging.getLogger(__name__)
+
+# Increase if the content of the stored grids changes, to invalidate caches
+_CACHE_VERSION = 1
+
+# Keyword arguments that do not affect the resulting mesh
+_IGNORED_KWARGS = ['verbose', 'file_name', 'mesh_cache']
+
+
+class MeshCache(object):
+    """
+    Content addressed on-disk cache of grid buckets.
+
+    Attributes:
+        folder (str): Folder of the cached files.
+        max_bytes (double): Maximum total size of the cached files.
+        max_entries (int): Maximum number of cached buckets.
+
+    """
+
+    def __init__(self, folder, max_bytes=None, max_entries=None):
+        """
+        Parameters:
+            folder (str): Folder of the cache, created if it does not exist.
+            max_bytes (double, optional): Maximum total size of the cache, in
+                bytes. Unlimited by default.
+            max_entries (int, optional): Maximum number of cached buckets.
+                Unlimited by default.
+
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def key(self, *args, **kwargs):
+        """
+        Hash of the arguments to a meshing function.
+
+        Arrays, numbers, strings, lists, dictionaries, Fractures and
+        FractureNetworks are supported. Keyword arguments that do not affect
+        the mesh (verbose, file_name) are ignored.
+
+        Returns:
+            str: Hexadecimal hash.
+
+        """
+        h = hashlib.sha1(str(_CACHE_VERSION).encode())
+        _update_hash(h, args)
+        _update_hash(h, {k: v for k, v in kwargs.items()
+                         if k not in _IGNORED_KWARGS})
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached grid bucket.
+
+        Parameters:
+            key (str): Key, see key().
+
+        Returns:
+            GridBucket: The cached bucket, or None if the key is not in the
+                cache.
+
+        """
+        file_name = self._file_name(key)
+        if not os.path.isfile(file_name):
+            logger.info('Mesh cache miss ' + key)
+            return None
+        # Mark as recently used
+        os.utime(file_name, None)
+        logger.info('Mesh cache hit ' + key)
+        return serialization.load_grid_bucket(file_name)
+
+    def put(self, key, gb):
+        """
+        Store a grid bucket in the cache, and evict the least recently used
+        entries if the cache exceeds its limits.
+
+        Parameters:
+            key (str): Key, see key().
+            gb (GridBucket): The bucket to be stored.
+
+        """
+        file_name = self._file_name(key)
+        # Write to a temporary file first, so that concurrent processes never
+        # see an incomplete entry.
+        tmp_name = file_name[:-4] + '.' + str(os.getpid()) + '.tmp.npz'
+        serialization.save_grid_bucket(gb, tmp_name)
+        os.replace(tmp_name, file_name)
+        self._evict(keep=file_name)
+
+    def clear(self):
+        """
+        Remove all entries in the cache.
+        """
+        for file_name in self._entries():
+            os.remove(file_name)
+
+    def size(self):
+        """
+        Returns:
+            int: Total size of the cached files, in bytes.
+
+        """
+        return sum(os.path.getsize(f) for f in self._entries())
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.isfile(self._file_name(key))
+
+    #------------------------------------------------------------------------#
+
+    def _file_name(self, key):
+        return os.path.join(self.folder, key + '.npz')
+
+    def _entries(self):
+        return [f for f in glob.glob(os.path.join(self.folder, '*.npz'))
+                if not f.endswith('.tmp.npz')]
+
+    def _evict(self, keep=None):
+        """ Remove least recently used entries until the limits are met. """
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        sizes = [os.path.getsize(f) for f in entries]
+        total = sum(sizes)
+        while entries:
+            too_many = self.max_entries is not None \
+                and len(entries) > self.max_entries
+            too_large = self.max_bytes is not None and total > self.max_bytes
+            if not (too_many or too_large) or entries[0] == keep:
+                break
+            logger.info('Mesh cache evict ' + entries[0])
+            os.remove(entries[0])
+            total -= sizes[0]
+            entries, sizes = entries[1:], sizes[1:]
+
+
+def _update_hash(h, obj):
+    """ Add a canonical representation of obj to the hash h. """
+    if obj is None or isinstance(obj, (bool, int, float, str, np.generic)):
+        h.update((type(obj).__name__ + repr(obj)).encode())
+    elif isinstance(obj, np.ndarray):
+        h.update(('array' + obj.dtype.str + str(obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(('dict' + str(len(obj))).encode())
+        for k in sorted(obj.keys(), key=str):
+            _update_hash(h, k)
+            _update_hash(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(('list' + str(len(obj))).encode())
+        for o in obj:
+            _update_hash(h, o)
+    elif isinstance(obj, Fracture):
+        h.update(type(obj).__name__.encode())
+        _update_hash(h, obj.p)
+    elif isinstance(obj, FractureNetwork):
+        h.update(type(obj).__name__.encode())
+        _update_hash(h, [f.p for f in obj._fractures])
+        _update_hash(h, obj.domain)
+        _update_hash(h, obj.tol)
+    else:
+        raise ValueError('Mesh cache cannot hash object of type '
+                         + str(type(obj)))
@@ -10,6 +10,10 @@ import numpy as np
 import scipy.sparse as sps
 import time
 import logging
+import os
+import shutil
+import tempfile
+import multiprocessing
 
 from porepy.fracs import structured, simplex, split_grid, non_conforming, utils
 from porepy.fracs.fractures import Intersection
@@ -37,6 +41,10 @@ def simplex_grid(fracs=None, domain=None, network=None, subdomains=[], verbose=0
     and go on with a surface mesh that likely is problematic, kwargs should
     contain a keyword ensure_matching_face_cell=False.
 
+    If kwargs contains a fracs.mesh_cache.MeshCache with keyword mesh_cache,
+    the grid bucket is taken from the cache if the same arguments have been
+    used before, and is otherwise stored in the cache.
+
     Parameters
     ----------
     fracs (list of np.ndarray): One list item for each fracture. Each item
@@ -81,6 +89,14 @@ def simplex_grid(fracs=None, domain=None, network=None, subdomains=[], verbose=0
     else:
         raise ValueError('simplex_grid only supported for 2 or 3 dimensions')
 
+    mesh_cache = kwargs.pop('mesh_cache', None)
+    if mesh_cache is not None:
+        key = mesh_cache.key('simplex_grid', fracs, domain, network,
+                             subdomains, **kwargs)
+        gb = mesh_cache.get(key)
+        if gb is not None:
+            return gb
+
     if verbose > 0:
         print('Construct mesh')
         tm_msh = time.time()
@@ -135,12 +151,14 @@ def simplex_grid(fracs=None, domain=None, network=None, subdomains=[], verbose=0
         print('Mesh construction completed. Total time ' +
               str(time.time() - tm_tot))
 
+    if mesh_cache is not None:
+        mesh_cache.put(key, gb)
     return gb
 
 #------------------------------------------------------------------------------#
 
 def dfn(fracs, conforming, intersections=None, keep_geo=False, tol=1e-4,
-        **kwargs):
+        num_proc=1, **kwargs):
     """ Create a mesh of a DFN model, that is, only of fractures.
 
     The mesh can eihter be conforming along fracture intersections, or each
@@ -159,13 +177,26 @@ def dfn(fracs, conforming, intersections=None, keep_geo=False, tol=1e-4,
             item is a numpy array representing intersection coordinates. If no
             intersections provided, intersections will be detected using
             function in FractureNetwork.
-        **kwargs: Parameters passed to gmsh.
+        num_proc (int, optional): Number of processes used to mesh the
+            fractures in the non-conforming case. Each process runs gmsh in
+            its own temporary directory. Defaults to 1, that is, the
+            fractures are meshed one after another.
+        **kwargs: Parameters passed to gmsh. May also contain a
+            fracs.mesh_cache.MeshCache, with keyword mesh_cache, see
+            simplex_grid().
 
     Returns:
         GridBucket (if conforming is True): Mixed-dimensional mesh that
             represents all fractures, and intersection poitns and line.
 
     """
+    mesh_cache = kwargs.pop('mesh_cache', None)
+    if mesh_cache is not None:
+        key = mesh_cache.key('dfn', fracs, conforming, intersections, tol,
+                             **kwargs)
+        gb = mesh_cache.get(key)
+        if gb is not None:
+            return gb
 
     if isinstance(fracs, FractureNetwork) \
        or isinstance(fracs, FractureNetwork_full):
@@ -192,57 +223,24 @@ def dfn(fracs, conforming, intersections=None, keep_geo=False, tol=1e-4,
     else:
         logger.warn('Create non-conforming mesh for DFN network')
         tic = time.time()
-        grid_list = []
-        neigh_list = []
-
-
-        for fi in range(len(network._fractures)):
-            logger.info('Meshing of fracture ' + str(fi))
-            # Rotate fracture vertexes and intersection points
-            fp, ip, other_frac, rot, cp = network.fracture_to_plane(fi)
-            frac_i = network[fi]
-
-            f_lines = np.reshape(np.arange(ip.shape[1]), (2, -1), order='F')
-            frac_dict = {'points': ip, 'edges': f_lines}
-            if keep_geo:
-                file_name = 'frac_mesh_' + str(fi)
-                kwargs['file_name'] = file_name
-            # Create mesh on this fracture surface.
-            grids = simplex.triangle_grid(frac_dict, fp, verbose=False,
-                                          **kwargs)
-
-            irot = rot.T
-            # Loop over grids, rotate back again to 3d coordinates
-            for gl in grids:
-                for g in gl:
-                    g.nodes = irot.dot(g.nodes) + cp
-
-            # Nodes of main (fracture) grid, in 3d coordinates1
-            main_nodes = grids[0][0].nodes
-            main_global_point_ind = grids[0][0].global_point_ind
-            # Loop over intersections, check if the intersection is on the
-            # boundary of this fracture.
-            for ind, isect in enumerate(network.intersections_of_fracture(fi)):
-                of = isect.get_other_fracture(frac_i)
-                if isect.on_boundary_of_fracture(frac_i):
-                    dist, _, _ = cg.dist_points_polygon(main_nodes, of.p)
-                    hit = np.argwhere(dist < tol).reshape((1, -1))[0]
-                    nodes_1d = main_nodes[:, hit]
-                    global_point_ind = main_global_point_ind[hit]
-
-                    assert cg.is_collinear(nodes_1d, tol=tol)
-                    sort_ind = cg.argsort_point_on_line(nodes_1d, tol=tol)
-                    g_aux = TensorGrid(np.arange(nodes_1d.shape[1]))
-                    g_aux.nodes = nodes_1d[:, sort_ind]
-                    g_aux.global_point_ind = global_point_ind[sort_ind]
-                    grids[1].insert(ind, g_aux)
-
-
-            assert len(grids[0]) == 1, 'Fracture should be covered by single'\
-                'mesh'
-
-            grid_list.append(grids)
-            neigh_list.append(other_frac)
+        num_fracs = len(network._fractures)
+        if num_proc > 1:
+            # Mesh the fractures concurrently. The network is sent once to
+            # each worker process.
+            jobs = [(fi, tol, keep_geo, kwargs) for fi in range(num_fracs)]
+            chunksize = max(1, num_fracs // (4 * num_proc))
+            pool = multiprocessing.Pool(num_proc, initializer=_init_dfn_worker,
+                                        initargs=(network,))
+            try:
+                results = pool.map(_dfn_worker, jobs, chunksize=chunksize)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_mesh_dfn_fracture(network, fi, tol, keep_geo, kwargs)
+                       for fi in range(num_fracs)]
+        grid_list = [r[0] for r in results]
+        neigh_list = [r[1] for r in results]
 
         logger.warn('Finished creating grids. Elapsed time ' + str(time.time() - tic))
         logger.warn('Merge grids')
@@ -275,9 +273,89 @@ def dfn(fracs, conforming, intersections=None, keep_geo=False, tol=1e-4,
     tic = time.time()
     split_grid.split_fractures(gb)
     logger.warn('Done. Elapsed time ' + str(time.time() - tic))
+    if mesh_cache is not None:
+        mesh_cache.put(key, gb)
     return gb
 
 
+def _mesh_dfn_fracture(network, fi, tol, keep_geo, kwargs):
+    """
+    Mesh a single fracture of a DFN, for non-conforming meshing.
+
+    Returns:
+        list of lists of grids: Grids of the fracture, and of the
+            intersections on its boundary, in 3d coordinates.
+        np.ndarray: Indices of the neighboring fractures.
+
+    """
+    logger.info('Meshing of fracture ' + str(fi))
+    # Rotate fracture vertexes and intersection points
+    fp, ip, other_frac, rot, cp = network.fracture_to_plane(fi)
+    frac_i = network[fi]
+
+    f_lines = np.reshape(np.arange(ip.shape[1]), (2, -1), order='F')
+    frac_dict = {'points': ip, 'edges': f_lines}
+    if keep_geo:
+        kwargs = dict(kwargs, file_name='frac_mesh_' + str(fi))
+    # Create mesh on this fracture surface.
+    grids = simplex.triangle_grid(frac_dict, fp, verbose=False, **kwargs)
+
+    irot = rot.T
+    # Loop over grids, rotate back again to 3d coordinates
+    for gl in grids:
+        for g in gl:
+            g.nodes = irot.dot(g.nodes) + cp
+
+    # Nodes of main (fracture) grid, in 3d coordinates1
+    main_nodes = grids[0][0].nodes
+    main_global_point_ind = grids[0][0].global_point_ind
+    # Loop over intersections, check if the intersection is on the
+    # boundary of this fracture.
+    for ind, isect in enumerate(network.intersections_of_fracture(fi)):
+        of = isect.get_other_fracture(frac_i)
+        if isect.on_boundary_of_fracture(frac_i):
+            dist, _, _ = cg.dist_points_polygon(main_nodes, of.p)
+            hit = np.argwhere(dist < tol).reshape((1, -1))[0]
+            nodes_1d = main_nodes[:, hit]
+            global_point_ind = main_global_point_ind[hit]
+
+            assert cg.is_collinear(nodes_1d, tol=tol)
+            sort_ind = cg.argsort_point_on_line(nodes_1d, tol=tol)
+            g_aux = TensorGrid(np.arange(nodes_1d.shape[1]))
+            g_aux.nodes = nodes_1d[:, sort_ind]
+            g_aux.global_point_ind = global_point_ind[sort_ind]
+            grids[1].insert(ind, g_aux)
+
+    assert len(grids[0]) == 1, 'Fracture should be covered by single'\
+        'mesh'
+    return grids, other_frac
+
+# Fracture network of a worker process in parallel DFN meshing
+_dfn_worker_network = None
+
+
+def _init_dfn_worker(network):
+    global _dfn_worker_network
+    _dfn_worker_network = network
+
+
+def _dfn_worker(job):
+    """
+    Mesh a fracture in a worker process. Unless the gmsh files are to be
+    kept, gmsh is run in a temporary directory, which is removed afterwards.
+    """
+    fi, tol, keep_geo, kwargs = job
+    if keep_geo:
+        return _mesh_dfn_fracture(_dfn_worker_network, fi, tol, keep_geo,
+                                  kwargs)
+    folder = tempfile.mkdtemp(prefix='dfn_mesh_')
+    try:
+        kwargs = dict(kwargs, file_name=os.path.join(folder, 'frac_mesh'))
+        return _mesh_dfn_fracture(_dfn_worker_network, fi, tol, keep_geo,
+                                  kwargs)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
 #------------------------------------------------------------------------------#
 
 def from_gmsh(file_name, dim, **kwargs):
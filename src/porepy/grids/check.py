@@ -1,67 +1,224 @@
 # -*- coding: utf-8 -*-
 """
+Sanity checks for grids.
+
+The checks are vectorized, with a cost proportional to the number of non-zeros
+in the topology matrices, so that they can be kept enabled after meshing or
+splitting of grids.
 
 @author:
 """
 import numpy as np
 import scipy.sparse as sps
+import scipy.spatial
 
 import porepy.utils.comp_geom as cg
+from porepy.grids.grid import FaceTag
+from porepy.utils import half_space
 
 #------------------------------------------------------------------------------#
 
-def grid(g):
+def grid(g, tol=1e-8):
     """ Sanity check for the grid. General method which apply the following:
-    - check if the face normals are actually normal to the faces
+    - check if a one-dimensional grid is collinear
     - check if a bidimensional grid is planar
+    - check if the face normals are actually normal to the faces
+    - check if the face normals point out of the cells with positive sign in
+      cell_faces, seen from points the cells are star shaped with respect to
+    - check if the boundaries of the cells are closed
+    - check if the cell volumes are positive
+    - check if the grid has duplicate nodes, other than those split along
+      fractures
+    - check if the grid has faces without cells, or with more than two cells
 
     Args:
         g (grid): Grid, or a subclass, with geometry fields computed.
+        tol (double, optional): Relative tolerance of the geometric checks.
+            Defaults to 1e-8.
 
     How to use:
-        import core.grids.check as check
+        import porepy.grids.check as check
         check.grid(g)
     """
 
     if g.dim == 1:
-        assert cg.is_collinear(g.nodes)
-        face_normals_1d(g)
+        assert collinear(g)
+        face_normals_1d(g, tol)
 
     if g.dim == 2:
         assert cg.is_planar(g.nodes)
 
-    if g.dim != 1:
-        face_normals(g)
+    if g.dim > 1:
+        face_normals(g, tol)
+
+    if g.dim > 0:
+        normal_orientation(g)
+        closed_cells(g, tol)
+        positive_volumes(g)
+        duplicate_nodes(g, tol)
+        isolated_faces(g)
 
 #------------------------------------------------------------------------------#
 
-def face_normals(g):
-    """ Check if the face normals are actually normal to the faces.
+def collinear(g, tol=1e-5):
+    """ Check if the nodes of a grid lie on a line.
 
     Args:
-        g (grid): Grid, or a subclass, with geometry fields computed.
+        g (grid): Grid, or a subclass.
+        tol (double, optional): Tolerance relative to the extent of the grid.
+            Defaults to 1e-5.
+
+    Returns:
+        boolean, True if the nodes are collinear.
     """
+    if g.num_nodes < 3:
+        return True
+    tangent = cg.compute_tangent(g.nodes)
+    diff = g.nodes - g.nodes[:, 0].reshape((-1, 1))
+    extent = np.linalg.norm(np.ptp(g.nodes, axis=1))
+    dist = np.linalg.norm(np.cross(diff, tangent, axis=0), axis=0)
+    return np.all(dist <= tol * extent)
 
-    nodes, faces, _ = sps.find(g.face_nodes)
+#------------------------------------------------------------------------------#
+
+def face_normals(g, tol=1e-8):
+    """ Check if the face normals are actually normal to the faces.
 
-    for f in np.arange(g.num_faces):
-        loc = slice(g.face_nodes.indptr[f], g.face_nodes.indptr[f+1])
-        normal = g.face_normals[:, f]
-        tangent = cg.compute_tangent(g.nodes[:, nodes[loc]])
-        assert np.isclose(np.dot(normal, tangent), 0)
+    For each face, the normal is compared with the vector from the mean of the
+    face nodes to the face node furthest away from it.
+
+    Args:
+        g (grid): Grid, or a subclass, with geometry fields computed.
+        tol (double, optional): Tolerance for the cosine of the angle between
+            the normal and the face. Defaults to 1e-8.
+    """
+    fn = g.face_nodes.tocsc()
+    num_nodes_per_face = np.diff(fn.indptr)
+    faces = np.repeat(np.arange(g.num_faces), num_nodes_per_face)
+    nodes = fn.indices
+
+    # Mean of the face nodes
+    mean_pts = (g.nodes * fn) / num_nodes_per_face
+    tangent = g.nodes[:, nodes] - mean_pts[:, faces]
+    dist = np.sum(tangent**2, axis=0)
+
+    # The node furthest away from the mean. In case of ties, all are checked.
+    furthest = dist == np.maximum.reduceat(dist, fn.indptr[:-1])[faces]
+    tangent = tangent[:, furthest]
+    assert np.all(dist[furthest] > 0)
+    tangent /= np.linalg.norm(tangent, axis=0)
+
+    normal = g.face_normals[:, faces[furthest]]
+    normal = normal / np.linalg.norm(normal, axis=0)
+    assert np.allclose(np.sum(normal * tangent, axis=0), 0, atol=tol)
 
 #------------------------------------------------------------------------------#
 
-def face_normals_1d(g):
-    """ Check if the face normals are actually normal to the faces, 1d case.
+def face_normals_1d(g, tol=1e-8):
+    """ Check if the face normals are actually normal to the faces, 1d case,
+    that is, if the normals are parallel to the line of the grid.
 
     Args:
         g (grid): 1D grid, or a subclass, with geometry fields computed.
+        tol (double, optional): Tolerance for the sine of the angle between
+            the normals and the line. Defaults to 1e-8.
     """
 
     assert g.dim == 1
-    a_normal = cg.compute_a_normal_1d(g.nodes)
-    for f in np.arange(g.num_faces):
-        assert np.isclose(np.dot(g.face_normals[:, f], a_normal), 0)
+    tangent = cg.compute_tangent(g.nodes)
+    normal = g.face_normals / np.linalg.norm(g.face_normals, axis=0)
+    cross = np.cross(normal, tangent, axis=0)
+    assert np.allclose(np.linalg.norm(cross, axis=0), 0, atol=tol)
+
+#------------------------------------------------------------------------------#
+
+def normal_orientation(g, cell_centers=None):
+    """ Check if the face normals point out of the cells where cell_faces has
+    positive sign, and into the cells where it is negative.
+
+    The check is done by comparing the normal with the vector from a point
+    in the interior of the cell to the face center. The point must be one
+    with respect to which the cell is star shaped; by default it is found by
+    half_space.star_shape_cell_centers(), which keeps the cell centers of
+    cells that are star shaped with respect to them. Cells without such a
+    point are not checked.
+
+    Args:
+        g (grid): Grid, or a subclass, with geometry fields computed.
+        cell_centers (np.ndarray, 3 x num_cells, optional): Points with
+            respect to which the cells are star shaped. Defaults to the
+            points found by half_space.star_shape_cell_centers().
+    """
+    if cell_centers is None:
+        cell_centers = half_space.star_shape_cell_centers(g)
+    faces, cells, sgn = sps.find(g.cell_faces)
+    outward = g.face_centers[:, faces] - cell_centers[:, cells]
+    dot = np.sum(g.face_normals[:, faces] * outward, axis=0)
+    has_center = ~np.isnan(dot)
+    assert np.all(dot[has_center] * sgn[has_center] > 0)
+
+#------------------------------------------------------------------------------#
+
+def closed_cells(g, tol=1e-8):
+    """ Check if the boundaries of the cells are closed, that is, if the
+    outward face normals, weighted by the face areas, sum to zero for each
+    cell.
+
+    Args:
+        g (grid): Grid, or a subclass, with geometry fields computed.
+        tol (double, optional): Tolerance relative to the area of the cell
+            boundary. Defaults to 1e-8.
+    """
+    net_normal = np.linalg.norm(g.face_normals * g.cell_faces, axis=0)
+    boundary_area = np.abs(g.cell_faces).T * g.face_areas
+    assert np.all(net_normal <= tol * boundary_area)
+
+#------------------------------------------------------------------------------#
+
+def positive_volumes(g):
+    """ Check if the cell volumes, and the face areas, are positive.
+
+    Args:
+        g (grid): Grid, or a subclass, with geometry fields computed.
+    """
+    assert np.all(g.cell_volumes > 0)
+    assert np.all(g.face_areas > 0)
+
+#------------------------------------------------------------------------------#
+
+def duplicate_nodes(g, tol=1e-8):
+    """ Check if the grid has distinct nodes closer than a tolerance.
+
+    Pairs of nodes that both lie on faces tagged as FRACTURE are accepted,
+    since splitting of the grid along fractures duplicates these nodes.
+
+    Args:
+        g (grid): Grid, or a subclass.
+        tol (double, optional): Tolerance relative to the extent of the grid.
+            Defaults to 1e-8.
+    """
+    extent = np.linalg.norm(np.ptp(g.nodes, axis=1))
+    tree = scipy.spatial.cKDTree(g.nodes.T)
+    pairs = np.array(sorted(tree.query_pairs(tol * extent)),
+                     dtype=int).reshape((-1, 2))
+
+    frac_faces = g.has_face_tag(FaceTag.FRACTURE)
+    on_frac = (g.face_nodes * frac_faces) > 0
+    assert np.all(np.logical_and(on_frac[pairs[:, 0]], on_frac[pairs[:, 1]]))
+
+#------------------------------------------------------------------------------#
+
+def isolated_faces(g):
+    """ Check if all faces belong to one or two cells, and all nodes to a
+    face.
+
+    Args:
+        g (grid): Grid, or a subclass.
+    """
+    num_cells_of_face = np.diff(g.cell_faces.tocsr().indptr)
+    assert np.all(num_cells_of_face > 0)
+    assert np.all(num_cells_of_face < 3)
+    num_faces_of_node = np.diff(g.face_nodes.tocsr().indptr)
+    assert np.all(num_faces_of_node > 0)
 
 #------------------------------------------------------------------------------#
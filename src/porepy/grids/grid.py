@@ -13,6 +13,8 @@ Acknowledgements:
 from __future__ import division
 import numpy as np
 import itertools
+import functools
+import weakref
 from enum import Enum
 from scipy import sparse as sps
 
@@ -20,6 +22,107 @@ from porepy.utils import matrix_compression, mcolon
 
 from porepy.utils import comp_geom as cg
 
+# Memoized derived topology of each grid, see _memoized(). The cache is kept
+# outside the grids, so that it does not interfere with copying and storage of
+# grids, and is freed together with the grid.
+_topology_cache = weakref.WeakKeyDictionary()
+# Number of cache hits and misses for each memoized method
+_topology_cache_stats = {}
+
+# Grid attributes the derived topology may depend on. The cache is
+# invalidated when they are reassigned.
+_TOPOLOGY_ATTRIBUTES = ('nodes', 'face_nodes', 'cell_faces', 'face_tags',
+                        'num_nodes')
+
+
+def topology_cache_statistics(reset=False):
+    """
+    Cache hit statistics of the memoized topology methods of the grids.
+
+    Parameters:
+        reset (boolean, optional): Reset the counters after reading them.
+
+    Returns:
+        dict: For each memoized method, a dictionary with the number of
+            'hits' and 'misses'.
+
+    """
+    stats = {name: {'hits': h, 'misses': m}
+             for name, (h, m) in _topology_cache_stats.items()}
+    if reset:
+        _topology_cache_stats.clear()
+    return stats
+
+
+def _fingerprint(val):
+    """ Objects that identify the state of an attribute. """
+    if sps.issparse(val) and hasattr(val, 'indptr'):
+        return (val, val.data, val.indices, val.indptr, val.shape)
+    if isinstance(val, np.ndarray):
+        return (val, val.shape)
+    return (val,)
+
+
+def _same_fingerprint(fp0, fp1):
+    for a, b in zip(fp0, fp1):
+        if a is b:
+            continue
+        if not isinstance(a, (tuple, int, np.integer)) or a != b:
+            return False
+    return True
+
+
+def _compact_sparse(mat, dtype):
+    """ Convert a csc or csr matrix to compact index and value types. """
+    data = mat.data.astype(dtype)
+    if not np.array_equal(data, mat.data):
+        raise ValueError('Values of topology matrix do not fit in '
+                         + np.dtype(dtype).name)
+    index_dtype = np.int32
+    if max(mat.shape + (mat.nnz,)) > np.iinfo(np.int32).max:
+        index_dtype = np.int64
+    # Construct from the arrays, to keep the order of the indices
+    return type(mat)((data, mat.indices.astype(index_dtype, copy=False),
+                      mat.indptr.astype(index_dtype, copy=False)),
+                     shape=mat.shape, copy=False)
+
+
+def _memoized(*deps):
+    """
+    Decorator that caches the result of a grid method without arguments.
+
+    The cached value is used as long as the attributes deps are the same
+    objects (the attribute, and for sparse matrices also their data, indices,
+    indptr and shape). The cache is also invalidated when an attribute in
+    _TOPOLOGY_ATTRIBUTES is reassigned, and when the face tags are changed by
+    the tag methods. Changes made in place, for instance to
+    g.face_nodes.indices[i], are not detected, and require a call to
+    g.invalidate_cache(). A copy of the cached value is returned, so that
+    callers are free to modify it.
+    """
+    def decorator(fct):
+        name = fct.__name__
+
+        @functools.wraps(fct)
+        def wrapper(self, *args, **kwargs):
+            if args or kwargs:
+                return fct(self, *args, **kwargs)
+            stats = _topology_cache_stats.setdefault(name, [0, 0])
+            fingerprint = [_fingerprint(getattr(self, d)) for d in deps]
+            cache = _topology_cache.setdefault(self, {})
+            entry = cache.get(name)
+            if entry is not None and all(_same_fingerprint(a, b) for a, b in
+                                         zip(entry[1], fingerprint)):
+                stats[0] += 1
+                val = entry[2]
+            else:
+                stats[1] += 1
+                val = fct(self)
+                cache[name] = (deps, fingerprint, val)
+            return val.copy()
+        return wrapper
+    return decorator
+
 class FaceTag(np.uint8, Enum):
     """
     FaceTag contains the following types:
@@ -129,6 +232,53 @@ class Grid(object):
         self.face_tags = np.tile(FaceTag.NONE, self.num_faces)
         self.update_boundary_face_tag()
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _TOPOLOGY_ATTRIBUTES:
+            self.invalidate_cache(name)
+
+    def invalidate_cache(self, attribute=None):
+        """
+        Discard memoized topology, such as cell_nodes().
+
+        The cache is invalidated automatically when the topology attributes
+        are reassigned, a call to this method is only needed after changes
+        made in place, e.g. to g.face_nodes.indices.
+
+        Parameters:
+            attribute (str, optional): Only discard values depending on this
+                attribute. Defaults to all values.
+
+        """
+        cache = _topology_cache.get(self)
+        if not cache:
+            return
+        if attribute is None:
+            cache.clear()
+            return
+        for name in [n for n, e in cache.items() if attribute in e[0]]:
+            del cache[name]
+
+    def compact_topology(self):
+        """
+        Store the topology in compact data types.
+
+        The index arrays of face_nodes and cell_faces are converted to int32
+        (if the grid is small enough), the values of face_nodes to bool, the
+        signs in cell_faces to int8, and face_tags to uint8. The matrices keep
+        their format, and the ordering of face_nodes.indices is preserved.
+        The compact arrays are used directly by the discretizations, without
+        copies.
+
+        Returns:
+            Grid: The grid itself.
+
+        """
+        self.face_nodes = _compact_sparse(self.face_nodes, np.bool)
+        self.cell_faces = _compact_sparse(self.cell_faces, np.int8)
+        self.face_tags = self.face_tags.astype(np.uint8, copy=False)
+        return self
+
     def copy(self):
         """
         Create a deep copy of the grid.
@@ -197,7 +347,8 @@ class Grid(object):
 
         return s
 
-    def compute_geometry(self, is_embedded=False):
+    def compute_geometry(self, is_embedded=False, chunk_size=None,
+                         num_threads=None):
         """Compute geometric quantities for the grid.
 
         This method initializes class variables describing the grid
@@ -207,6 +358,18 @@ class Grid(object):
         in cases where the grid is modified after the initial construction (
         say, grid refinement), this may lead to costly, unnecessary
         computations.
+
+        For 3D grids, the computation can be done in blocks of faces and
+        cells, to limit the size of the temporary arrays. This is activated
+        by chunk_size, and the blocks can be processed on a thread pool.
+
+        Parameters:
+            is_embedded (boolean, optional): For 2D grids, whether the grid
+                is embedded in 3D. Defaults to False.
+            chunk_size (int, optional): For 3D grids, number of faces (and
+                cells) in each block. Defaults to None, that is, no blocks.
+            num_threads (int, optional): Number of threads used for the
+                blocks. Defaults to None, that is, no threads.
         """
 
         self.name.append('Compute geometry')
@@ -217,6 +380,10 @@ class Grid(object):
             self.__compute_geometry_1d()
         elif self.dim == 2:
             self.__compute_geometry_2d(is_embedded)
+        elif chunk_size is not None:
+            if chunk_size <= 0:
+                raise ValueError('chunk_size must be positive')
+            self.__compute_geometry_3d_chunked(chunk_size, num_threads)
         else:
             self.__compute_geometry_3d()
 
@@ -527,6 +694,148 @@ class Grid(object):
         self.cell_centers = cell_centers
         self.cell_volumes = cell_volumes
 
+    def __compute_geometry_3d_chunked(self, chunk_size, num_threads):
+        """
+        Helper function to compute geometry for 3D grids in blocks.
+
+        The quantities are the same as in __compute_geometry_3d(), and are
+        computed in the same way, but for blocks of faces, and thereafter
+        blocks of cells, written into preallocated arrays. The sub-face
+        quantities are recomputed for the cell blocks, rather than stored,
+        so that the temporary memory is proportional to the block size.
+
+        """
+        face_node_ptr = self.face_nodes.indptr
+        num_nodes_per_face = np.diff(face_node_ptr)
+        nodes = self.nodes
+        # The cell blocks are column slices of cell_faces
+        cell_faces = self.cell_faces.tocsc()
+
+        # Temporary face centers, as the mean of the face nodes
+        tmp_face_center = np.zeros((3, self.num_faces))
+        self.face_centers = np.zeros((3, self.num_faces))
+        self.face_normals = np.zeros((3, self.num_faces))
+        self.face_areas = np.zeros(self.num_faces)
+        self.cell_centers = np.zeros((3, self.num_cells))
+        self.cell_volumes = np.zeros(self.num_cells)
+
+        def blocks(num):
+            return [(start, min(start + chunk_size, num))
+                    for start in range(0, num, chunk_size)]
+
+        def face_block(bounds):
+            f0, f1 = bounds
+            faces = np.arange(f0, f1)
+            edges = np.arange(face_node_ptr[f0], face_node_ptr[f1])
+            face_of_edge = matrix_compression.rldecode(
+                faces, num_nodes_per_face[f0:f1])
+            loc = face_of_edge - f0
+            edge_nodes = nodes[:, self.face_nodes.indices[edges]]
+            for d in range(3):
+                tmp_face_center[d, f0:f1] = np.bincount(
+                    loc, weights=edge_nodes[d], minlength=faces.size) \
+                    / num_nodes_per_face[f0:f1]
+            sub_normals, sub_areas, sub_centroids = self.__subface_geometry(
+                edges, face_of_edge, tmp_face_center)
+            areas = np.bincount(loc, weights=sub_areas, minlength=faces.size)
+            for d in range(3):
+                self.face_normals[d, f0:f1] = np.bincount(
+                    loc, weights=sub_normals[d], minlength=faces.size)
+                self.face_centers[d, f0:f1] = np.bincount(
+                    loc, weights=sub_areas * sub_centroids[d],
+                    minlength=faces.size) / areas
+            self.face_areas[f0:f1] = areas
+
+        def cell_block(bounds):
+            c0, c1 = bounds
+            cf = cell_faces[:, c0:c1]
+            # Face-cell pairs of the block, and their orientation
+            pair_cell = matrix_compression.rldecode(np.arange(c1 - c0),
+                                                    np.diff(cf.indptr))
+            pair_face = cf.indices
+            # Expand to edges, seen from each cell
+            num_pair_edges = num_nodes_per_face[pair_face]
+            edges = mcolon.mcolon(face_node_ptr[pair_face],
+                                  face_node_ptr[pair_face + 1])
+            face_of_edge = matrix_compression.rldecode(pair_face,
+                                                       num_pair_edges)
+            cell_of_edge = matrix_compression.rldecode(pair_cell,
+                                                       num_pair_edges)
+            orientation = matrix_compression.rldecode(cf.data,
+                                                      num_pair_edges)
+            num_cell_edges = np.bincount(cell_of_edge,
+                                         minlength=c1 - c0)
+
+            sub_normals, _, sub_centroids = self.__subface_geometry(
+                edges, face_of_edge, tmp_face_center)
+            sub_normals_sign = np.sign(np.sum(
+                sub_normals * self.face_normals[:, face_of_edge], axis=0))
+
+            tmp_cell_centers = np.zeros((3, c1 - c0))
+            for d in range(3):
+                tmp_cell_centers[d] = np.bincount(
+                    cell_of_edge, weights=self.face_centers[d, face_of_edge],
+                    minlength=c1 - c0) / num_cell_edges
+            dist_cellcenter_subface = sub_centroids \
+                - tmp_cell_centers[:, cell_of_edge]
+            outer_normals = sub_normals * orientation * sub_normals_sign
+            tet_volumes = np.sum(dist_cellcenter_subface * outer_normals,
+                                 axis=0) / 3
+            assert np.all(tet_volumes > -1e-12)  # On the fly test
+
+            volumes = np.bincount(cell_of_edge, weights=tet_volumes,
+                                  minlength=c1 - c0)
+            for d in range(3):
+                rel_centroid = np.bincount(
+                    cell_of_edge,
+                    weights=tet_volumes * 3 / 4 * dist_cellcenter_subface[d],
+                    minlength=c1 - c0) / volumes
+                self.cell_centers[d, c0:c1] = tmp_cell_centers[d] \
+                    + rel_centroid
+            self.cell_volumes[c0:c1] = volumes
+
+        # The blocks write to disjoint parts of the output arrays, and can be
+        # processed in parallel. The cells need all the faces.
+        if num_threads is not None and num_threads > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(num_threads) as pool:
+                list(pool.map(face_block, blocks(self.num_faces)))
+                list(pool.map(cell_block, blocks(self.num_cells)))
+        else:
+            for bounds in blocks(self.num_faces):
+                face_block(bounds)
+            for bounds in blocks(self.num_cells):
+                cell_block(bounds)
+
+    def __subface_geometry(self, edges, face_of_edge, tmp_face_center):
+        """
+        Area weighted normal vectors, areas and centroids of the triangular
+        sub-faces spanned by the given edges and the temporary face centers.
+        See __compute_geometry_3d().
+        """
+        face_node_ptr = self.face_nodes.indptr
+        face_nodes = self.face_nodes.indices
+        # Index of next node on the edge list, closing the loop of each face
+        next_node = edges + 1
+        last = next_node == face_node_ptr[face_of_edge + 1]
+        next_node[last] = face_node_ptr[face_of_edge[last]]
+
+        start = self.nodes[:, face_nodes[edges]]
+        end = self.nodes[:, face_nodes[next_node]]
+        center = tmp_face_center[:, face_of_edge]
+        along_edge = end - start
+        face_2_node = center - start
+        sub_normals = np.vstack((along_edge[1] * face_2_node[2] -
+                                 along_edge[2] * face_2_node[1],
+                                 along_edge[2] * face_2_node[0] -
+                                 along_edge[0] * face_2_node[2],
+                                 along_edge[0] * face_2_node[1] -
+                                 along_edge[1] * face_2_node[0])) / 2
+        sub_areas = np.sqrt(np.sum(sub_normals * sub_normals, axis=0))
+        sub_centroids = (start + end + center) / 3
+        return sub_normals, sub_areas, sub_centroids
+
+    @_memoized('face_nodes', 'cell_faces')
     def cell_nodes(self):
         """
         Obtain mapping between cells and nodes.
@@ -544,6 +853,7 @@ class Grid(object):
         mat = (self.face_nodes * cf_loc) > 0
         return mat
 
+    @_memoized('face_nodes', 'cell_faces')
     def num_cell_nodes(self):
         """ Number of nodes per cell.
 
@@ -553,6 +863,7 @@ class Grid(object):
         """
         return self.cell_nodes().sum(axis=0).A.ravel('F')
 
+    @_memoized('face_nodes', 'face_tags', 'num_nodes')
     def get_internal_nodes(self):
         """
         Get internal nodes id of the grid.
@@ -564,6 +875,7 @@ class Grid(object):
         return np.setdiff1d(np.arange(self.num_nodes), self.get_boundary_nodes(),
                             assume_unique=True)
 
+    @_memoized('face_tags')
     def get_internal_faces(self):
         """
         Get internal faces id of the grid
@@ -574,6 +886,7 @@ class Grid(object):
         """
         return self.__indices(self.has_not_face_tag(FaceTag.BOUNDARY))
 
+    @_memoized('face_tags')
     def get_boundary_faces(self):
         """
         Get boundary faces id of the grid
@@ -584,6 +897,7 @@ class Grid(object):
         """
         return self.__indices(self.has_face_tag(FaceTag.BOUNDARY))
 
+    @_memoized('face_tags')
     def get_domain_boundary_faces(self):
         """
         Get domain boundary faces id of the grid
@@ -594,6 +908,7 @@ class Grid(object):
         """
         return self.__indices(self.has_face_tag(FaceTag.DOMAIN_BOUNDARY))
 
+    @_memoized('face_nodes', 'face_tags')
     def get_boundary_nodes(self):
         """
         Get nodes on the boundary
@@ -641,6 +956,7 @@ class Grid(object):
         return np.array([diam(comb(cn.indices[cn.indptr[c]:cn.indptr[c + 1]]))
                          for c in np.arange(self.num_cells)])
 
+    @_memoized('cell_faces')
     def cell_face_as_dense(self):
         """
         Obtain the cell-face relation in the from of two rows, rather than a
@@ -669,6 +985,7 @@ class Grid(object):
         # pointing from first to second row.
         return neighs[::-1]
 
+    @_memoized('cell_faces')
     def cell_connection_map(self):
         """
         Get a matrix representation of cell-cell connections, as defined by
@@ -684,8 +1001,9 @@ class Grid(object):
         # will
         cell_faces = self.cell_faces.copy()
 
-        # Direction of normal vector does not matter here, only 0s and 1s
-        cell_faces.data = np.abs(cell_faces.data)
+        # Direction of normal vector does not matter here, only 0s and 1s.
+        # Use int, so that the products do not overflow for compact topology
+        cell_faces.data = np.abs(cell_faces.data).astype(np.int)
 
         # Find connection between cells via the cell-face map
         c2c = cell_faces.transpose() * cell_faces
@@ -728,20 +1046,24 @@ class Grid(object):
 
     def add_face_tag(self, f, tag):
         self.face_tags[f] = np.bitwise_or(self.face_tags[f], tag)
+        self.invalidate_cache('face_tags')
 
     def remove_face_tag(self, f, tag):
         self.face_tags[f] = np.bitwise_and(
             self.face_tags[f], np.bitwise_not(tag))
+        self.invalidate_cache('face_tags')
 
     def remove_face_tag_if_tag(self, tag, if_tag):
         f = self.has_face_tag(if_tag)
         self.face_tags[f] = np.bitwise_and(
             self.face_tags[f], np.bitwise_not(tag))
+        self.invalidate_cache('face_tags')
 
     def remove_face_tag_if_not_tag(self, tag, if_tag):
         f = self.has_not_face_tag(if_tag)
         self.face_tags[f] = np.bitwise_and(
             self.face_tags[f], np.bitwise_not(tag))
+        self.invalidate_cache('face_tags')
 
     def has_face_tag(self, tag):
         return np.bitwise_and(self.face_tags, tag).astype(np.bool)
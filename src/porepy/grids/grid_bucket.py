@@ -12,6 +12,7 @@ import networkx
 from porepy.utils import setmembership
 from porepy.numerics.mixed_dim import condensation
 from porepy.params.data import Parameters
+from porepy.grids import grid
 
 class GridBucket(object):
     """
@@ -728,6 +729,19 @@ class GridBucket(object):
 
         [g.compute_geometry(is_embedded=is_embedded) for g, _ in self]
 
+#------------------------------------------------------------------------------#
+
+    def compact_topology(self):
+        """
+        Store the topology of all grids, and the face_cells of the edges, in
+        compact data types. See Grid.compact_topology().
+        """
+        [g.compact_topology() for g, _ in self]
+        for _, d in self.edges_props():
+            fc = d['face_cells']
+            if sps.isspmatrix_csc(fc) or sps.isspmatrix_csr(fc):
+                d['face_cells'] = grid._compact_sparse(fc, np.bool)
+
 #------------------------------------------------------------------------------#
 
     def copy(self):
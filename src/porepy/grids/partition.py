@@ -1,7 +1,8 @@
 """
 Module for partitioning of grids based on various methods.
 
-Intended support is by Cartesian indexing, and METIS-based.
+Intended support is by Cartesian indexing, and METIS-based. Recursive
+coordinate and spectral bisection are available without METIS.
 
 """
 from __future__ import division
@@ -9,7 +10,10 @@ import warnings
 import sys
 import networkx
 import numpy as np
+import scipy.linalg
 import scipy.sparse as sps
+import scipy.sparse.csgraph
+import scipy.sparse.linalg
 
 try:
     import pymetis
@@ -19,10 +23,10 @@ except ImportError:
 
 from porepy.grids.grid import Grid
 from porepy.grids import structured
-from porepy.utils import permutations
+from porepy.utils import permutations, mcolon
 
 
-def partition_metis(g, num_part):
+def partition_metis(g, num_part, weights=None):
     """
     Partition a grid using metis.
 
@@ -38,6 +42,9 @@ def partition_metis(g, num_part):
         g: core.grids.grid: To be partitioned. Only the cell_face attribute is
             used
         num_part (int): Number of partitions.
+        weights (np.array, optional): Weight of each cell, for instance the
+            cost of its discretization stencil. Metis requires integer
+            weights, the weights are rounded. Defaults to equal weights.
 
     Returns:
         np.array (size:g.num_cells): Partition vector, one number in
@@ -45,13 +52,16 @@ def partition_metis(g, num_part):
 
     """
 
-    # Connection map between cells
-    c2c = g.cell_connection_map()
+    # Connection map between cells, in the compressed format used by metis
+    c2c = g.cell_connection_map().tocsr()
+
+    kwargs = {}
+    if weights is not None:
+        kwargs['vweights'] = np.round(weights).astype('int').tolist()
 
-    # Convert the cells into the format required by pymetis
-    adjacency_list = [c2c.getrow(i).indices for i in range(c2c.shape[0])]
     # Call pymetis
-    part = pymetis.part_graph(num_part, adjacency=adjacency_list)
+    part = pymetis.part_graph(num_part, xadj=c2c.indptr.tolist(),
+                              adjncy=c2c.indices.tolist(), **kwargs)
 
     # The meaning of the first number returned by pymetis is not clear (poor
     # documentation), only return the partitioning.
@@ -238,20 +248,230 @@ def partition_coordinates(g, num_coarse, check_connectivity=True):
     return partition
 
 
-def partition(g, num_coarse):
+def partition_rcb(g, num_part, weights=None):
+    """
+    Partition a grid by recursive coordinate bisection.
+
+    The cells are recursively split in two, normal to the direction in which
+    the cell centers have the largest extent, so that the weights of the two
+    halves are proportional to the number of partitions assigned to them.
+    Parts that turn out not to be connected are repaired afterwards, see
+    make_connected().
+
+    The method assumes that the cells have a center, that is,
+    g.compute_geometry() has been called. If g does not have a field
+    cell_centers, compute_geometry() will be called.
+
+    Parameters:
+        g (core.grids.grid): Grid to be partitioned.
+        num_part (int): Number of partitions.
+        weights (np.array, optional): Weight of each cell, for instance the
+            cost of its discretization stencil. Defaults to equal weights.
+
+    Returns:
+        np.ndarray (int), size g.num_cells: Partition vector, one number in
+            [0, num_part) for each cell.
+
+    """
+    # Compute geometry if necessary
+    if not hasattr(g, 'cell_centers'):
+        g.compute_geometry()
+    cc = g.cell_centers
+
+    def split(cells):
+        # Sort the cells along the direction of largest extent
+        extent = np.ptp(cc[:, cells], axis=1)
+        return cells[np.argsort(cc[np.argmax(extent), cells],
+                                kind='mergesort')]
+
+    part = _recursive_bisection(g, num_part, weights, split)
+    return make_connected(g, part)
+
+
+def partition_spectral(g, num_part, weights=None):
+    """
+    Partition a grid by recursive spectral bisection of its cell connection
+    graph.
+
+    The cells are recursively split in two according to the Fiedler vector
+    (eigenvector of the second smallest eigenvalue) of the graph Laplacian of
+    the cell_connection_map(), so that the weights of the two halves are
+    proportional to the number of partitions assigned to them. Parts that
+    turn out not to be connected are repaired afterwards, see
+    make_connected().
+
+    The method uses only the topology of the grid, and is more expensive
+    than partition_rcb(), but gives smaller interfaces between the parts for
+    irregular domains.
+
+    Parameters:
+        g (core.grids.grid): Grid to be partitioned. Only the cell_faces
+            attribute is used.
+        num_part (int): Number of partitions.
+        weights (np.array, optional): Weight of each cell, for instance the
+            cost of its discretization stencil. Defaults to equal weights.
+
+    Returns:
+        np.ndarray (int), size g.num_cells: Partition vector, one number in
+            [0, num_part) for each cell.
+
+    """
+    adj = _cell_adjacency(g)
+
+    def split(cells):
+        sub = adj[cells][:, cells]
+        laplacian = sps.diags(np.asarray(sub.sum(axis=1)).ravel()) - sub
+        if cells.size < 200:
+            _, vec = scipy.linalg.eigh(laplacian.toarray())
+        else:
+            # Shift-invert around a small negative number, to get the
+            # smallest eigenvalues of the positive semi-definite Laplacian
+            val, vec = sps.linalg.eigsh(laplacian.tocsc().astype(float),
+                                        k=2, sigma=-1e-4, which='LM')
+            vec = vec[:, np.argsort(val)]
+        return cells[np.argsort(vec[:, 1], kind='mergesort')]
+
+    part = _recursive_bisection(g, num_part, weights, split)
+    return make_connected(g, part)
+
+
+def _recursive_bisection(g, num_part, weights, split):
+    """
+    Recursive bisection of the cells of a grid.
+
+    Parameters:
+        g (core.grids.grid): Grid to be partitioned.
+        num_part (int): Number of partitions.
+        weights (np.array): Weight of each cell, or None.
+        split (function): Given an array of cells, return the same cells
+            sorted so that each half should form a part.
+
+    Returns:
+        np.ndarray (int), size g.num_cells: Partition vector.
+
+    """
+    if weights is None:
+        weights = np.ones(g.num_cells)
+    num_part = int(max(1, min(num_part, g.num_cells)))
+
+    part = np.zeros(g.num_cells, dtype='int')
+    # Stack of cell sets, with the number of parts and the first part index
+    # assigned to each of them
+    stack = [(np.arange(g.num_cells), num_part, 0)]
+    while len(stack) > 0:
+        cells, num, offset = stack.pop()
+        if num == 1:
+            part[cells] = offset
+            continue
+
+        num_low = num // 2
+        cells = split(cells)
+
+        # Cut where the weight of the lower half is closest to its share, but
+        # leave at least one cell for each part
+        cum_weight = np.cumsum(weights[cells])
+        target = cum_weight[-1] * num_low / num
+        cut = np.argmin(np.abs(cum_weight - target)) + 1
+        cut = min(max(cut, num_low), cells.size - (num - num_low))
+
+        stack.append((cells[:cut], num_low, offset))
+        stack.append((cells[cut:], num - num_low, offset + num_low))
+
+    return part
+
+
+def _cell_adjacency(g):
+    """ Cell connection map of a grid, as an integer csr matrix without the
+    diagonal.
+    """
+    c2c = g.cell_connection_map().tocoo()
+    off_diag = c2c.row != c2c.col
+    return sps.csr_matrix((np.ones(off_diag.sum(), dtype='int'),
+                           (c2c.row[off_diag], c2c.col[off_diag])),
+                          shape=c2c.shape)
+
+
+def make_connected(g, partition):
+    """
+    Modify a partitioning so that each part is connected.
+
+    For each part, the largest connected component (by cell_connection_map())
+    is kept. The other components are moved to the part they share most
+    faces with, among the kept components of the neighboring parts. This is
+    repeated until no more components can be moved; components of a grid
+    that is itself not connected are left as they are.
+
+    Parameters:
+        g (core.grids.grid): Partitioned grid. Only the cell_faces attribute
+            is used.
+        partition (np.array): Partition vector, one number for each cell.
+
+    Returns:
+        np.ndarray (int), size g.num_cells: Modified partition vector.
+
+    """
+    partition = np.asarray(partition).astype('int')
+    adj = _cell_adjacency(g).tocoo()
+    row, col = adj.row, adj.col
+    num_part = partition.max() + 1
+
+    while True:
+        # Connected components of the graph with the edges inside the parts
+        inside = partition[row] == partition[col]
+        num_comp, comp = sps.csgraph.connected_components(
+            sps.coo_matrix((np.ones(inside.sum()),
+                            (row[inside], col[inside])),
+                           shape=adj.shape), directed=False)
+        if num_comp == np.unique(partition).size:
+            break
+
+        # The part and size of each component. Keep the largest component of
+        # each part.
+        comp_part = np.zeros(num_comp, dtype='int')
+        comp_part[comp] = partition
+        comp_size = np.bincount(comp, minlength=num_comp)
+        order = np.lexsort((comp_size, comp_part))
+        is_last = np.hstack((comp_part[order][1:] != comp_part[order][:-1],
+                             True))
+        keep = np.zeros(num_comp, dtype=np.bool)
+        keep[order[is_last]] = True
+
+        # Count the faces between each moved component and the kept
+        # components of other parts
+        bridge = np.logical_and(~keep[comp[row]], keep[comp[col]])
+        bridge = np.logical_and(bridge, ~inside)
+        if not np.any(bridge):
+            break
+        counts = sps.csr_matrix((np.ones(bridge.sum()),
+                                 (comp[row[bridge]], partition[col[bridge]])),
+                                shape=(num_comp, num_part))
+        moved = np.where(np.diff(counts.indptr) > 0)[0]
+        target = np.asarray(counts[moved].argmax(axis=1)).ravel()
+
+        new_part = comp_part.copy()
+        new_part[moved] = target
+        partition = new_part[comp]
+
+    return partition
+
+
+def partition(g, num_coarse, weights=None):
     """
     Wrapper for partition methods, tries to apply best possible algorithm.
 
     The method will first try to use METIS; if this is not available (or fails
     otherwise), the partition_structured will be applied if the grid is
-    Cartesian. The last resort is partitioning based on coordinates.
+    Cartesian and no weights are given. The last resort is recursive
+    coordinate bisection.
 
     See the methods partition_metis(), partition_structured() and
-    partition_coordinates() for further details.
+    partition_rcb() for further details.
 
     Parameters:
         g (core.grids.grid): Grid to be partitioned.
         num_coarse (int): Target number of coarse cells.
+        weights (np.array, optional): Weight of each cell, for instance the
+            cost of its discretization stencil. Defaults to equal weights.
 
     Returns:
         np.ndarray (int), size g.num_cells: Partition vector.
@@ -263,12 +483,12 @@ def partition(g, num_coarse):
         # work.
         sys.modules['pymetis']
         # If we have made it this far, we can run pymetis.
-        return partition_metis(g, num_coarse)
+        return partition_metis(g, num_coarse, weights)
     except KeyError:
-        if isinstance(g, structured.TensorGrid):
+        if isinstance(g, structured.TensorGrid) and weights is None:
             return partition_structured(g, num_part=num_coarse)
         else:
-            return partition_coordinates(g, num_coarse)
+            return partition_rcb(g, num_coarse, weights)
 
 
 def determine_coarse_dimensions(target, fine_size):
@@ -447,10 +667,14 @@ def __extract_submatrix(mat, ind):
     return sps.csc_matrix((data, rows_sub, cols)), unique_rows
 
 
-def partition_grid(g, ind):
+def partition_grid(g, ind, num_layers=0):
     """
     Partition a grid into multiple subgrids based on an index set.
 
+    All subgrids are extracted in one pass over the cell-face and face-node
+    maps. The result is the same as calling extract_subgrid() for the cells
+    of each partition.
+
     No tests are made on whether the resulting grids are connected.
 
     Example:
@@ -461,28 +685,123 @@ def partition_grid(g, ind):
     Parameters:
         g (core.grids.grid): Global grid to be partitioned
         ind (np.array): Partition vector, one per cell. Should be 0-offset.
+        num_layers (int, optional): Number of overlap layers added to each
+            partition, as defined by overlap() with the node criterion.
+            Defaults to 0.
 
     Returns:
-        list: List of grids, each element representing a grid.
+        list: List of grids, each element representing a grid. The global
+            indices of the local cells are stored in the field
+            parent_cell_ind of each grid.
         list of np.arrays: Each element contains the global indices of the
             local faces.
         list of np.arrays: Each element contains the global indices of the
             local nodes.
     """
+    ind = np.asarray(ind)
+    _, part = np.unique(ind, return_inverse=True)
+    num_parts = part.max() + 1 if part.size > 0 else 0
+
+    # Cells of all partitions, as a cell-partition map
+    cell_part = sps.csc_matrix((np.ones(g.num_cells, dtype=np.bool),
+                                (np.arange(g.num_cells), part)),
+                               shape=(g.num_cells, num_parts))
+    if num_layers > 0:
+        # Extend all partitions at once, via the cells sharing a node
+        cn = g.cell_nodes()
+        for _ in range(num_layers):
+            cell_part = (cn.transpose() * (cn * cell_part)).astype(np.bool)
+        cell_part = cell_part.tocsc()
+    cell_part.sort_indices()
+    cells = cell_part.indices
+    cell_ptr = cell_part.indptr
+
+    cf_sub, face_ptr, faces = __extract_submatrices(g.cell_faces, cells,
+                                                    cell_ptr)
+    fn_sub, node_ptr, nodes = __extract_submatrices(g.face_nodes, faces,
+                                                    face_ptr)
+
+    # Append information on subgrid extraction to the new grid's history
+    name = list(g.name)
+    name.append('Extract subgrid')
 
     sub_grid = []
     face_map_list = []
     node_map_list = []
-    for i in np.unique(ind):
-        ci = np.squeeze(np.argwhere(ind == i))
-        sg, fm, nm = extract_subgrid(g, ci)
-        sub_grid.append(sg)
-        face_map_list.append(fm)
-        node_map_list.append(nm)
+    for i in range(num_parts):
+        c = cells[cell_ptr[i]:cell_ptr[i + 1]]
+        unique_faces = faces[face_ptr[i]:face_ptr[i + 1]]
+        unique_nodes = nodes[node_ptr[i]:node_ptr[i + 1]]
+
+        h = Grid(g.dim, g.nodes[:, unique_nodes], fn_sub[i], cf_sub[i],
+                 list(name))
+
+        # Copy geometric information if any
+        if hasattr(g, 'cell_centers'):
+            h.cell_centers = g.cell_centers[:, c]
+        if hasattr(g, 'cell_volumes'):
+            h.cell_volumes = g.cell_volumes[c]
+        if hasattr(g, 'face_centers'):
+            h.face_centers = g.face_centers[:, unique_faces]
+        if hasattr(g, 'face_normals'):
+            h.face_normals = g.face_normals[:, unique_faces]
+        if hasattr(g, 'face_areas'):
+            h.face_areas = g.face_areas[unique_faces]
+
+        h.parent_cell_ind = c
+
+        sub_grid.append(h)
+        face_map_list.append(unique_faces)
+        node_map_list.append(unique_nodes)
 
     return sub_grid, face_map_list, node_map_list
 
 
+def __extract_submatrices(mat, ind, ptr):
+    """ From a csc matrix, extract the columns of several index sets at once.
+    As in __extract_submatrix(), all zero rows are stripped from the
+    sub-matrices.
+
+    Parameters:
+        mat (sps.csc_matrix): Matrix to extract from.
+        ind (np.array): Concatenated column indices of all sets.
+        ptr (np.array): Set i is given by ind[ptr[i]:ptr[i+1]].
+
+    Returns:
+        list of sps.csc_matrix: The sub-matrices.
+        np.array: Pointers to the rows of each sub-matrix, as ptr.
+        np.array: Concatenated global indices of the rows of the sub-matrices.
+
+    """
+    num_sets = ptr.size - 1
+    num_rows = mat.shape[0]
+    set_of_col = np.repeat(np.arange(num_sets), np.diff(ptr))
+
+    # Non-zeros of all the columns, ordered by set and column
+    lo, hi = mat.indptr[ind], mat.indptr[ind + 1]
+    nnz = mcolon.mcolon(lo, hi)
+    set_of_nnz = np.repeat(set_of_col, hi - lo)
+
+    # Number the rows by set and global index. One sort gives the unique rows
+    # of all sets.
+    key = set_of_nnz.astype('int64') * num_rows + mat.indices[nnz]
+    unique_keys, rows_sub = np.unique(key, return_inverse=True)
+    row_ptr = np.searchsorted(unique_keys // num_rows, np.arange(num_sets + 1))
+    rows = unique_keys % num_rows
+    rows_sub = rows_sub - row_ptr[set_of_nnz]
+
+    data = mat.data[nnz]
+    nnz_ptr = np.hstack((0, np.cumsum(hi - lo)))
+    sub_mats = []
+    for i in range(num_sets):
+        loc = slice(nnz_ptr[ptr[i]], nnz_ptr[ptr[i + 1]])
+        cols = nnz_ptr[ptr[i]:ptr[i + 1] + 1] - nnz_ptr[ptr[i]]
+        shape = (row_ptr[i + 1] - row_ptr[i], ptr[i + 1] - ptr[i])
+        sub_mats.append(sps.csc_matrix((data[loc], rows_sub[loc], cols),
+                                       shape=shape))
+    return sub_mats, row_ptr, rows
+
+
 def overlap(g, cell_ind, num_layers, criterion='node'):
     """
     From a set of cell indices, find an extended set of cells that form an
@@ -0,0 +1,238 @@
+"""
+Binary storage of grids and grid buckets.
+
+A grid is stored with all its array attributes (topology, geometry, face
+tags, global_point_ind etc.) in an uncompressed .npz file. Sparse matrices
+are stored by their index arrays, so that the ordering of face_nodes.indices,
+which compute_geometry() relies on, is preserved. Scalar attributes, the name
+and the grid class are stored in a small json header within the file.
+
+A grid bucket is stored in a single file, containing all grids, the
+face_cells mappings of the edges and the node ordering. Other data in the
+nodes and edges of the bucket is not stored.
+
+The arrays in the file are stored uncompressed, and are by default memory
+mapped on load (copy on write). The cost of loading is then dominated by
+reading the data from disk when it is first used.
+
+Example:
+    gb = meshing.simplex_grid(...)
+    serialization.save_grid_bucket(gb, 'gb.npz')
+    ...
+    gb = serialization.load_grid_bucket('gb.npz')
+
+"""
+import json
+import zipfile
+import warnings
+import importlib
+import numpy as np
+import scipy.sparse as sps
+
+from porepy.grids.grid import Grid
+from porepy.grids.grid_bucket import GridBucket
+
+
+def save_grid(g, file_name):
+    """
+    Write a grid to file.
+
+    Parameters:
+        g (Grid): The grid.
+        file_name (str): Name of the file. The extension .npz is added if not
+            present.
+
+    """
+    arrays = {}
+    _grid_to_arrays(g, '', arrays)
+    np.savez(file_name, **arrays)
+
+
+def load_grid(file_name, mmap=True):
+    """
+    Read a grid from file.
+
+    Parameters:
+        file_name (str): Name of the file.
+        mmap (boolean, optional): Memory map the arrays. Defaults to True.
+
+    Returns:
+        Grid: The grid, of the same class as the one stored.
+
+    """
+    arrays = _read_npz(_npz_name(file_name), mmap)
+    return _grid_from_arrays('', arrays)
+
+
+def save_grid_bucket(gb, file_name):
+    """
+    Write a grid bucket to file.
+
+    The grids, the face_cells of the edges and the node ordering
+    ('node_number') are stored.
+
+    Parameters:
+        gb (GridBucket): The grid bucket.
+        file_name (str): Name of the file. The extension .npz is added if not
+            present.
+
+    """
+    grids = [g for g, _ in gb]
+    numbers = [d.get('node_number', None) for _, d in gb]
+    if None not in numbers:
+        grids = [grids[i] for i in np.argsort(numbers)]
+        numbers = sorted(numbers)
+    else:
+        numbers = None
+    grid_ind = {g: i for i, g in enumerate(grids)}
+
+    arrays = {}
+    for i, g in enumerate(grids):
+        _grid_to_arrays(g, 'grid_' + str(i) + '/', arrays)
+
+    edges = []
+    for k, (e, d) in enumerate(gb.edges_props()):
+        edges.append([grid_ind[e[0]], grid_ind[e[1]]])
+        _value_to_arrays(d['face_cells'], 'edge_' + str(k) + '/face_cells',
+                         arrays)
+
+    header = {'num_grids': len(grids), 'node_number': numbers,
+              'edges': edges}
+    arrays['bucket'] = np.array(json.dumps(header))
+    np.savez(file_name, **arrays)
+
+
+def load_grid_bucket(file_name, mmap=True):
+    """
+    Read a grid bucket from file.
+
+    Parameters:
+        file_name (str): Name of the file.
+        mmap (boolean, optional): Memory map the arrays. Defaults to True.
+
+    Returns:
+        GridBucket: The grid bucket, with face_cells on the edges, and
+            'node_number' in the nodes if it was present when saved.
+
+    """
+    arrays = _read_npz(_npz_name(file_name), mmap)
+    header = json.loads(str(arrays['bucket']))
+
+    grids = [_grid_from_arrays('grid_' + str(i) + '/', arrays)
+             for i in range(header['num_grids'])]
+    gb = GridBucket()
+    gb.add_nodes(grids)
+    if header['node_number'] is not None:
+        for g, num in zip(grids, header['node_number']):
+            gb.graph.node[g]['node_number'] = num
+
+    for k, (i, j) in enumerate(header['edges']):
+        face_cells = _value_from_arrays('edge_' + str(k) + '/face_cells',
+                                        arrays)
+        # Keep the order of the grids as stored, also for equal dimensions
+        gb.graph.add_edge(grids[i], grids[j], face_cells=face_cells)
+    return gb
+
+#------------------------------------------------------------------------------#
+
+
+def _grid_to_arrays(g, prefix, arrays):
+    """ Add the attributes of a grid to a dictionary of arrays. """
+    cls = type(g)
+    header = {'class': [cls.__module__, cls.__name__], 'values': {},
+              'arrays': []}
+    for key, val in g.__dict__.items():
+        if isinstance(val, np.generic):
+            val = val.item()
+        if isinstance(val, np.ndarray) and val.dtype != np.object \
+                or sps.issparse(val):
+            _value_to_arrays(val, prefix + key, arrays)
+            header['arrays'].append(key)
+            continue
+        try:
+            json.dumps(val)
+        except TypeError:
+            warnings.warn('Grid attribute ' + key + ' is not stored')
+            continue
+        header['values'][key] = val
+    arrays[prefix + 'grid'] = np.array(json.dumps(header))
+
+
+def _grid_from_arrays(prefix, arrays):
+    """ Create a grid from the arrays written by _grid_to_arrays(). """
+    header = json.loads(str(arrays[prefix + 'grid']))
+    module, name = header['class']
+    cls = getattr(importlib.import_module(module), name)
+    assert issubclass(cls, Grid)
+
+    # The grid is restored without calling the constructor.
+    g = cls.__new__(cls)
+    g.__dict__.update(header['values'])
+    for key in header['arrays']:
+        setattr(g, key, _value_from_arrays(prefix + key, arrays))
+    return g
+
+
+def _value_to_arrays(val, name, arrays):
+    if sps.issparse(val):
+        fmt = val.format if val.format in ('csc', 'csr') else 'csr'
+        val = val.asformat(fmt)
+        arrays[name + '/' + fmt + '_data'] = val.data
+        arrays[name + '/' + fmt + '_indices'] = val.indices
+        arrays[name + '/' + fmt + '_indptr'] = val.indptr
+        arrays[name + '/' + fmt + '_shape'] = np.array(val.shape)
+    else:
+        arrays[name] = val
+
+
+def _value_from_arrays(name, arrays):
+    if name in arrays:
+        return arrays[name]
+    for fmt, mat in (('csc', sps.csc_matrix), ('csr', sps.csr_matrix)):
+        key = name + '/' + fmt
+        if key + '_data' in arrays:
+            return mat((arrays[key + '_data'], arrays[key + '_indices'],
+                        arrays[key + '_indptr']),
+                       shape=tuple(arrays[key + '_shape']))
+    raise KeyError(name)
+
+
+def _npz_name(file_name):
+    if not file_name.endswith('.npz'):
+        file_name += '.npz'
+    return file_name
+
+
+def _read_npz(file_name, mmap):
+    """
+    Read all arrays in an npz file.
+
+    If mmap is True, arrays stored uncompressed are memory mapped directly
+    from their position in the zip archive, copy on write.
+    """
+    arrays = {}
+    with zipfile.ZipFile(file_name) as zf, open(file_name, 'rb') as f:
+        for info in zf.infolist():
+            name = info.filename[:-4]
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                # Skip the local file header to reach the npy data
+                f.seek(info.header_offset + 26)
+                len_name, len_extra = np.frombuffer(f.read(4), dtype='<u2')
+                f.seek(int(len_name) + int(len_extra), 1)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    header = np.lib.format.read_array_header_1_0(f)
+                else:
+                    header = np.lib.format.read_array_header_2_0(f)
+                shape, fortran, dtype = header
+                if not dtype.hasobject and len(shape) > 0 \
+                        and np.prod(shape) > 0:
+                    order = 'F' if fortran else 'C'
+                    arrays[name] = np.memmap(f, dtype=dtype, mode='c',
+                                             shape=shape, order=order,
+                                             offset=f.tell()
+                                             ).view(np.ndarray)
+                    continue
+            with zf.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member)
+    return arrays
@@ -12,7 +12,7 @@ import scipy.sparse as sps
 import scipy.spatial
 
 from porepy.grids.grid import Grid
-from porepy.utils import setmembership, accumarray
+from porepy.utils import accumarray
 
 
 class TriangleGrid(Grid):
@@ -67,7 +67,7 @@ class TriangleGrid(Grid):
                                 tri[[1, 2]],
                                 tri[[2, 0]])).transpose()
         face_nodes.sort(axis=1)
-        face_nodes, _, cell_faces = setmembership.unique_rows(face_nodes)
+        face_nodes, cell_faces = self._unique_faces(face_nodes)
 
         num_faces = face_nodes.shape[0]
         num_cells = tri.shape[1]
@@ -97,6 +97,25 @@ class TriangleGrid(Grid):
         super(TriangleGrid, self).__init__(2, nodes, face_nodes, cell_faces,
                                            name)
 
+    def _unique_faces(self, face_nodes):
+        """ Identify the faces of the cells.
+
+        Parameters:
+            face_nodes (np.ndarray, 3*num_cells x 2): Sorted nodes of the
+                faces of the cells. Row k * num_cells + c contains face k of
+                cell c.
+
+        Returns:
+            np.ndarray, num_faces x 2: Nodes of the unique faces.
+            np.ndarray, 3*num_cells: Face index of each row in face_nodes.
+
+        """
+        # Keep the face ordering of setmembership.unique_rows(), which sorts
+        # the rows as raw bytes, see _byte_order().
+        face_nodes, cell_faces = _unique_face_nodes(face_nodes.T,
+                                                    _byte_order)
+        return face_nodes.T, cell_faces
+
     def cell_node_matrix(self):
         """ Get cell-node relations in a Nc x 3 matrix
         Perhaps move this method to a superclass when tet-grids are implemented
@@ -166,19 +185,34 @@ class StructuredTriangleGrid(TriangleGrid):
         # first quad is split into cells 0 and 1 and so on
         tri_base = np.vstack((ind_1, ind_2, ind_3, ind_1, ind_3,
                               ind_4)).reshape((3, -1), order='F')
-        # Initialize array of triangles. For the moment, we will append the
-        # cells here, but we do know how many cells there are in advance,
-        # so pre-allocation is possible if this turns out to be a bottleneck
-        tri = tri_base
 
-        # Loop over all remaining rows in the y-direction.
-        for iter1 in range(nx[1].astype('int64') - 1):
-            # The node numbers are increased by nx[0] + 1 for each row
-            tri = np.hstack((tri, tri_base + (iter1 + 1) * (nx[0] + 1)))
+        # The node numbers are increased by nx[0] + 1 for each row in the
+        # y-direction. Add the increments of all rows at once.
+        increment = np.arange(nx[1]) * (nx[0] + 1)
+        tri = (tri_base[:, :, np.newaxis] + increment).reshape((3, -1),
+                                                               order='F')
 
+        self.cart_dims = nx
         super(self.__class__, self).__init__(p, tri,
                                              name='StructuredTriangleGrid')
 
+    def _unique_faces(self, face_nodes):
+        """ Number the faces from the Cartesian structure, see
+        _structured_face_numbering().
+        """
+        num_cells = face_nodes.shape[0] // 3
+        cells = np.tile(np.arange(num_cells), 3)
+        cell_faces = _structured_face_numbering(face_nodes.T, cells,
+                                                self.cart_dims)
+        face_nodes = _face_nodes_from_cells(face_nodes.T, cell_faces).T
+
+        # Keep the face ordering of setmembership.unique_rows(), which sorts
+        # the rows as raw bytes, see _byte_order().
+        rows = _byte_order(face_nodes)
+        order = np.lexsort((rows[:, 1], rows[:, 0]))
+        cell_faces = _renumber_faces(cell_faces, order)
+        return face_nodes[order], cell_faces
+
 
 class TetrahedralGrid(Grid):
     """ Class for Tetrahedral grids.
@@ -234,8 +268,7 @@ class TetrahedralGrid(Grid):
         face_nodes = face_nodes.reshape((3, 4*num_cells), order='F')
         sort_ind = np.squeeze(np.argsort(face_nodes, axis=0))
         face_nodes_sorted = np.sort(face_nodes, axis=0)
-        face_nodes, _, cell_faces = \
-            setmembership.unique_columns_tol(face_nodes_sorted)
+        face_nodes, cell_faces = self._unique_faces(face_nodes_sorted)
 
         num_faces = face_nodes.shape[1]
 
@@ -262,6 +295,20 @@ class TetrahedralGrid(Grid):
         super(TetrahedralGrid, self).__init__(3, nodes, face_nodes, cell_faces,
                                               'TetrahedralGrid')
 
+    def _unique_faces(self, face_nodes):
+        """ Identify the faces of the cells.
+
+        Parameters:
+            face_nodes (np.ndarray, 3 x 4*num_cells): Sorted nodes of the
+                faces of the cells, the faces of cell 0 first.
+
+        Returns:
+            np.ndarray, 3 x num_faces: Nodes of the unique faces.
+            np.ndarray, 4*num_cells: Face index of each column in face_nodes.
+
+        """
+        return _unique_face_nodes(face_nodes)
+
     def __permute_nodes(self, p, t):
         v = self.__triple_product(p, t)
         permute = np.where(v > 0)[0]
@@ -351,19 +398,212 @@ class StructuredTetrahedralGrid(TetrahedralGrid):
                               ind_2, ind_3, ind_4, ind_7,
                               ind_2, ind_4, ind_6, ind_7,
                               ind_4, ind_6, ind_7, ind_8)).reshape((4, -1), order='F')
-        # Initialize array of triangles. For the moment, we will append the
-        # cells here, but we do know how many cells there are in advance,
-        # so pre-allocation is possible if this turns out to be a bottleneck
-
-        # Loop over all remaining rows in the y-direction.
-        for iter2 in range(nx[2].astype('int64')):
-            for iter1 in range(nx[1].astype('int64')):
-                increment = iter2 * nxy + iter1 * (nx[0]+1)
-                if iter2 == 0 and iter1 == 0:
-                    tet = tet_base + increment
-                else:
-                    tet = np.hstack((tet, tet_base + increment))
 
+        # The node numbers are increased by nx[0] + 1 for each row in the
+        # y-direction, and by nxy for each layer in the z-direction. Add the
+        # increments of all rows, with the x-rows running fastest, at once.
+        increment = (np.arange(nx[1]) * (nx[0] + 1)
+                     + np.arange(nx[2]).reshape((-1, 1)) * nxy).ravel()
+        tet = (tet_base[:, :, np.newaxis] + increment).reshape((4, -1),
+                                                               order='F')
+
+        self.cart_dims = nx
         super(self.__class__, self).__init__(p, tet=tet,
                                              name='StructuredTetrahedralGrid')
 
+    def _unique_faces(self, face_nodes):
+        """ Number the faces from the Cartesian structure, see
+        _structured_face_numbering().
+        """
+        cells = np.repeat(np.arange(face_nodes.shape[1] // 4), 4)
+        cell_faces = _structured_face_numbering(face_nodes, cells,
+                                                self.cart_dims)
+        face_nodes = _face_nodes_from_cells(face_nodes, cell_faces)
+
+        # Keep the lexicographic face ordering of
+        # setmembership.unique_columns_tol()
+        order = np.lexsort(face_nodes[::-1])
+        cell_faces = _renumber_faces(cell_faces, order)
+        return face_nodes[:, order], cell_faces
+
+
+def _structured_face_numbering(face_nodes, cells, nx):
+    """
+    Number the faces of a simplex grid obtained by splitting the cells of a
+    Cartesian grid, without a search for unique faces.
+
+    Each face either lies in a facet of the Cartesian cells, or in the
+    interior of a Cartesian cell. The faces are numbered by Cartesian
+    indices: First the faces in the facets normal to the x-direction, then
+    those normal to the y- and z-direction, and finally the faces interior
+    to the Cartesian cells. Faces within the same facet or Cartesian cell are
+    told apart by the positions of their nodes relative to the cell.
+
+    Parameters:
+        face_nodes (np.ndarray, dim x num_cell_faces): Nodes of the faces of
+            all cells, sorted. The nodes are numbered as in the Cartesian
+            grid, with x running fastest.
+        cells (np.ndarray, num_cell_faces): Cell of each column in
+            face_nodes. The simplices obtained from a Cartesian cell are
+            numbered consecutively, with the Cartesian cells ordered as the
+            nodes.
+        nx (np.ndarray, size dim): Number of Cartesian cells in each
+            direction.
+
+    Returns:
+        np.ndarray, num_cell_faces: Face index of each column in face_nodes.
+
+    """
+    nx = np.asarray(nx, dtype=np.int64)
+    dim = nx.size
+    nodes_per_face, num_cell_faces = face_nodes.shape
+    num_cart = np.prod(nx)
+    num_per_dir = np.hstack((1, np.cumprod(nx + 1)[:-1]))
+
+    # Cartesian indices of the Cartesian cell of each column in face_nodes
+    cells_per_cart = num_cell_faces // (dim + 1) // num_cart
+    cart_ind = np.indices(nx).reshape((dim, -1), order='F')
+    cart_ind = cart_ind[:, cells // cells_per_cart]
+
+    # Position of the nodes relative to the lowest corner of the Cartesian
+    # cell, coded in binary (bit d is the offset in direction d)
+    bits = (np.arange(2**dim).reshape((-1, 1)) >> np.arange(dim)) & 1
+    lookup = np.zeros(bits.dot(num_per_dir).max() + 1, dtype=np.int64)
+    lookup[bits.dot(num_per_dir)] = np.arange(2**dim)
+    corner = lookup[face_nodes - num_per_dir.dot(cart_ind)]
+
+    # Directions where all nodes of the face have the same offset, coded in
+    # binary. The face then lies in a facet normal to that direction.
+    all_bits = np.bitwise_and.reduce(corner, axis=0)
+    flat_bits = ~(all_bits ^ np.bitwise_or.reduce(corner, axis=0)) \
+        & (2**dim - 1)
+
+    # The faces are grouped into facets normal to each direction, and
+    # (group dim) the interior of the Cartesian cells.
+    group_of_bits = np.full(2**dim, dim, dtype=np.int64)
+    group_of_bits[1 << np.arange(dim)] = np.arange(dim)
+    group = group_of_bits[flat_bits]
+    shapes = nx + np.eye(dim + 1, dim, dtype=np.int64)
+
+    # Index the facet from the lower side, that is, from the Cartesian cell
+    # on the upper side of the facet if the face is on the upper side of its
+    # Cartesian cell.
+    lower = cart_ind + (((all_bits & flat_bits)
+                         >> np.arange(dim).reshape((-1, 1))) & 1)
+    strides = np.hstack((np.ones((dim + 1, 1), dtype=np.int64),
+                         np.cumprod(shapes[:, :-1], axis=1)))
+    pos = np.sum(lower * strides[group].T, axis=0)
+
+    # Since the nodes are sorted, the corners identify the face within the
+    # facet or Cartesian cell. Enumerate the faces that occur in each group.
+    key = np.sum((corner & ~flat_bits)
+                 << (dim * np.arange(nodes_per_face)).reshape((-1, 1)), axis=0)
+    key += group << (dim * nodes_per_face)
+    occurs = np.zeros((dim + 1) << (dim * nodes_per_face), dtype=np.bool)
+    occurs[key] = True
+    occurs = occurs.reshape((dim + 1, -1))
+    local = (np.cumsum(occurs, axis=1) - 1).ravel()
+    num_local = np.sum(occurs, axis=1)
+
+    offset = np.hstack((0, np.cumsum(np.prod(shapes, axis=1) * num_local)))
+    cell_faces = offset[group] + pos * num_local[group] + local[key]
+    return cell_faces
+
+
+def _face_nodes_from_cells(face_nodes, cell_faces):
+    """ Nodes of the unique faces, given the face index of each column in
+    face_nodes.
+    """
+    unique_face_nodes = np.empty((face_nodes.shape[0], cell_faces.max() + 1),
+                                 dtype=face_nodes.dtype)
+    unique_face_nodes[:, cell_faces] = face_nodes
+    return unique_face_nodes
+
+
+def _renumber_faces(cell_faces, order):
+    """ Face indices after the faces are sorted by order. """
+    new_ind = np.empty(order.size, dtype=np.int64)
+    new_ind[order] = np.arange(order.size)
+    return new_ind[cell_faces]
+
+
+
+def _unique_face_nodes(face_nodes, node_order=None):
+    """
+    Identify the unique faces among the faces of all cells of a simplex grid.
+
+    The nodes are ranked among the nodes in use, and the ranks of each face
+    are packed into a single int64 key, so that the faces are found with one
+    sort of integers, rather than a lexicographic sort of the node tuples.
+    If there are too many nodes for one key (more than about 2 million for
+    tetrahedral grids), the ranks are packed into several keys, which are
+    sorted from the last to the first with a stable sort.
+
+    Parameters:
+        face_nodes (np.ndarray, nodes_per_face x num_cell_faces): Sorted
+            nodes of the faces of all cells.
+        node_order (function, optional): Maps node indices to values that
+            define the ordering of the unique faces. Defaults to the
+            ordering of the node indices.
+
+    Returns:
+        np.ndarray, nodes_per_face x num_faces: Nodes of the unique faces,
+            in lexicographic order.
+        np.ndarray, num_cell_faces: Face index of each column in face_nodes.
+
+    """
+    face_nodes = np.asarray(face_nodes).astype(np.int64, copy=False)
+    nodes_per_face, num_cell_faces = face_nodes.shape
+    if num_cell_faces == 0:
+        return face_nodes, np.zeros(0, dtype=np.int64)
+
+    # Rank of each node in the ordering of the faces, counting only the
+    # nodes in use
+    nodes = np.arange(face_nodes.max() + 1, dtype=np.int64)
+    if node_order is None:
+        rank = nodes
+    else:
+        rank = np.empty(nodes.size, dtype=np.int64)
+        rank[np.argsort(node_order(nodes), kind='mergesort')] = nodes
+    used = np.zeros(nodes.size, dtype=np.bool)
+    used[rank[face_nodes]] = True
+    num_nodes = int(np.sum(used))
+    rank = (np.cumsum(used) - 1)[rank[face_nodes]]
+
+    # Pack as many rows as fit into each key
+    rows_per_key = nodes_per_face
+    while num_nodes ** rows_per_key >= np.iinfo(np.int64).max:
+        rows_per_key -= 1
+    keys = []
+    for start in range(0, nodes_per_face, rows_per_key):
+        key = np.zeros(num_cell_faces, dtype=np.int64)
+        for row in rank[start:start + rows_per_key]:
+            key *= num_nodes
+            key += row
+        keys.append(key)
+
+    if len(keys) == 1:
+        order = np.argsort(keys[0])
+    else:
+        # Least significant key first, preserving the order of equal keys
+        order = np.arange(num_cell_faces)
+        for key in keys[::-1]:
+            order = order[np.argsort(key[order], kind='mergesort')]
+    is_new = np.zeros(num_cell_faces - 1, dtype=np.bool)
+    for key in keys:
+        is_new |= np.diff(key[order]) != 0
+
+    # Number the faces in sorted order
+    face_ind = np.hstack((0, np.cumsum(is_new)))
+    cell_faces = np.empty(num_cell_faces, dtype=np.int64)
+    cell_faces[order] = face_ind
+    first = order[np.hstack((True, is_new))]
+    return face_nodes[:, first], cell_faces
+
+
+def _byte_order(nodes):
+    """ Values that sort as the raw bytes of the node indices, that is, the
+    bytes read as big endian unsigned integers.
+    """
+    nodes = np.ascontiguousarray(nodes)
+    return nodes.view('>u' + str(nodes.dtype.itemsize))
@@ -20,6 +20,10 @@ class TensorGrid(Grid):
     For information on attributes and methods, see the documentation of the
     parent Grid class.
 
+    As long as the nodes and topology are not modified, the geometry is
+    computed in closed form from the coordinate vectors, see
+    compute_geometry().
+
     """
 
     def __init__(self, x, y=None, z=None, name=None):
@@ -56,6 +60,87 @@ class TensorGrid(Grid):
             super(TensorGrid, self).__init__(3, nodes, face_nodes,
                                              cell_faces, name)
 
+        # Coordinate vectors, for the closed form geometry
+        self._coord_x = np.asarray(x, dtype=np.float)
+        self._coord_y = None if y is None else np.asarray(y, dtype=np.float)
+        self._coord_z = None if z is None else np.asarray(z, dtype=np.float)
+
+    def compute_geometry(self, is_embedded=False, **kwargs):
+        """
+        Compute geometric quantities for the grid.
+
+        For 2D and 3D grids with nodes and topology as constructed, the face
+        areas, normals and centers, and the cell volumes and centers, are
+        computed in closed form from the coordinate vectors. Otherwise, for
+        instance if the nodes have been perturbed, the general algorithm of
+        Grid.compute_geometry() is used. The results are the same up to
+        rounding errors.
+        """
+        if self.dim < 2 or not self._is_lattice():
+            super(TensorGrid, self).compute_geometry(is_embedded, **kwargs)
+            return
+        self.name.append('Compute geometry')
+
+        coords = [self._coord_x, self._coord_y, self._coord_z][:self.dim]
+        # Cell widths and midpoints in each direction
+        widths = [np.diff(c) for c in coords]
+        mids = [0.5 * (c[1:] + c[:-1]) for c in coords]
+
+        face_areas = []
+        face_centers = []
+        face_normals = []
+        for d in range(self.dim):
+            # Faces normal to direction d: nodes in direction d, cells in the
+            # other directions. Ordered with x running fastest.
+            axes = [coords[i] if i == d else mids[i] for i in range(self.dim)]
+            sizes = [np.ones(coords[i].size) if i == d else widths[i]
+                     for i in range(self.dim)]
+            area = _tensor_product(sizes)
+            center = _tensor_coordinates(axes)
+            normal = np.zeros((3, area.size))
+            normal[d] = area
+            face_areas.append(area)
+            face_centers.append(center)
+            face_normals.append(normal)
+
+        self.face_areas = np.hstack(face_areas)
+        self.face_normals = np.hstack(face_normals)
+        self.face_centers = np.hstack(face_centers)
+        self.cell_volumes = _tensor_product(widths)
+        self.cell_centers = _tensor_coordinates(mids)
+
+    def _is_lattice(self):
+        """
+        Check if the nodes and topology are those of the tensor product of the
+        coordinate vectors, as created by the constructor.
+        """
+        coords = [self._coord_x, self._coord_y, self._coord_z][:self.dim]
+        shape = tuple(c.size for c in coords)
+        num_nodes = np.prod(shape)
+        num_cells = np.prod([n - 1 for n in shape])
+        num_faces = 0
+        for d in range(self.dim):
+            num_faces += np.prod([n - (i != d) for i, n in enumerate(shape)])
+        if self.num_nodes != num_nodes or self.num_cells != num_cells \
+                or self.num_faces != num_faces \
+                or self.face_nodes.shape != (num_nodes, num_faces) \
+                or self.cell_faces.shape != (num_faces, num_cells) \
+                or self.face_nodes.nnz != 2**(self.dim - 1) * num_faces \
+                or self.cell_faces.nnz != 2 * self.dim * num_cells:
+            return False
+
+        for d in range(3):
+            nodes = self.nodes[d].reshape(shape, order='F')
+            if d >= self.dim:
+                if np.any(nodes != 0):
+                    return False
+                continue
+            expand = [np.newaxis] * self.dim
+            expand[d] = slice(None)
+            if np.any(nodes != coords[d][tuple(expand)]):
+                return False
+        return True
+
     def _create_1d_grid(self, nodes_x):
         """
         Compute grid topology for 1D grids.
@@ -261,6 +346,29 @@ class TensorGrid(Grid):
         return nodes, face_nodes, cell_faces
 
 
+def _tensor_product(factors):
+    """
+    Products of all combinations of the elements in factors, ordered with
+    the first index running fastest.
+    """
+    prod = np.ones(1)
+    for f in factors:
+        prod = np.outer(f, prod).ravel()
+    return prod
+
+
+def _tensor_coordinates(axes):
+    """
+    Coordinates (3 x n) of the tensor product of the coordinate vectors in
+    axes, ordered with the first coordinate running fastest.
+    """
+    grids = np.meshgrid(*axes, indexing='ij')
+    coords = np.zeros((3, grids[0].size))
+    for d, g in enumerate(grids):
+        coords[d] = g.ravel(order='F')
+    return coords
+
+
 class CartGrid(TensorGrid):
     """Representation of a 2D or 3D Cartesian grid.
 
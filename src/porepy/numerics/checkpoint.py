@@ -0,0 +1,263 @@
+"""
+Checkpointing of time dependent simulations.
+
+A checkpoint contains the state vector, the time, and optionally the
+discretization matrices stored in the data dictionaries (e.g. 'flux',
+'bound_flux', 'stress'), so that a restarted simulation does not need to
+discretize again. The time steppers use the stored matrices for the first
+step after a restart, for discretizations on a single grid whose matrix_rhs()
+takes a discretize argument (Tpfa, Mpfa, Mpsa, Biot).
+
+The checkpoint is written to a single binary numpy file (.npz), first to a
+temporary file that is then moved into place, so that an interrupted write
+does not destroy the previous checkpoint.
+
+Example, with a time stepper:
+    solver = Implicit(problem)
+    solver.parameters['checkpoint'] = Checkpointer('run.npz', every=100)
+    solver.solve()
+
+    # After a failure
+    solver = Implicit(problem)
+    solver.restart('run.npz')
+    solver.solve()
+
+Example, with a user controlled time loop (e.g. Biot):
+    discr.discretize(g, data)
+    for step in range(num_steps):
+        ...
+        checkpoint.save('biot.npz', x, t, data)
+
+    # After a failure, no discretization needed
+    x, t = checkpoint.load('biot.npz', data)
+    A, b = discr.matrix_rhs(g, data, discretize=False)
+
+"""
+import os
+import signal
+import time
+import logging
+import numpy as np
+import scipy.sparse as sps
+
+from porepy.grids.grid_bucket import GridBucket
+
+# Module-wide logger
+logger = logging.getLogger(__name__)
+
+
+def save(file_name, x, t, data=None, keys=None, compress=False):
+    """
+    Write a checkpoint.
+
+    Parameters:
+        file_name (str): Name of the checkpoint file. The extension .npz is
+            added if not present.
+        x (np.ndarray): State vector.
+        t (double): Time.
+        data (dictionary or GridBucket, optional): Data dictionary of a single
+            grid, or a GridBucket, from which discretization matrices are
+            stored.
+        keys (list of str, optional): Keys of the matrices to be stored. If
+            None (default), all sparse matrices in the data are stored.
+        compress (boolean, optional): Compress the file. Defaults to False.
+
+    """
+    file_name = _npz_name(file_name)
+    arrays = {'x': np.asarray(x), 't': np.array(t, dtype=np.float)}
+    for prefix, d in _data_dicts(data):
+        for key, mat in d.items():
+            if not sps.issparse(mat):
+                continue
+            if keys is not None and key not in keys:
+                continue
+            mat = mat.tocsr()
+            name = prefix + key
+            arrays[name + '/data'] = mat.data
+            arrays[name + '/indices'] = mat.indices
+            arrays[name + '/indptr'] = mat.indptr
+            arrays[name + '/shape'] = np.array(mat.shape)
+
+    # Write to a temporary file first, so that the previous checkpoint is
+    # intact if the writing is interrupted.
+    tmp_name = file_name[:-4] + '.tmp.npz'
+    if compress:
+        np.savez_compressed(tmp_name, **arrays)
+    else:
+        np.savez(tmp_name, **arrays)
+    os.replace(tmp_name, file_name)
+
+
+def load(file_name, data=None):
+    """
+    Read a checkpoint.
+
+    Parameters:
+        file_name (str): Name of the checkpoint file.
+        data (dictionary or GridBucket, optional): Data dictionary of a single
+            grid, or a GridBucket. The stored discretization matrices are put
+            back into the data.
+
+    Returns:
+        np.ndarray: State vector.
+        double: Time.
+
+    """
+    with np.load(_npz_name(file_name)) as f:
+        x = f['x']
+        t = float(f['t'])
+        names = set(n.rsplit('/', 1)[0] for n in f.files if '/' in n)
+        for prefix, d in _data_dicts(data):
+            for name in names:
+                if not name.startswith(prefix):
+                    continue
+                key = name[len(prefix):]
+                if '/' in key:
+                    continue
+                d[key] = sps.csr_matrix((f[name + '/data'],
+                                         f[name + '/indices'],
+                                         f[name + '/indptr']),
+                                        shape=tuple(f[name + '/shape']))
+    return x, t
+
+
+class Checkpointer(object):
+    """
+    Periodic and signal triggered checkpoints for a time loop.
+
+    A checkpoint is written when dump() is called, if either of the following
+    holds:
+        - every steps have been taken since the last checkpoint,
+        - interval seconds (wall clock) have passed since the last checkpoint,
+        - one of the signals has been received.
+    If one of the exit_signals is received, a checkpoint is written in the
+    next call to dump(), and the program is then stopped by SystemExit.
+
+    Signal handlers are only installed if signals or exit_signals are given,
+    which must then be done from the main thread. The previous handlers are
+    restored by close(), or when the Checkpointer is used as a context
+    manager:
+        with Checkpointer('run.npz', signals=[signal.SIGUSR1]) as cp:
+            solver.parameters['checkpoint'] = cp
+            solver.solve()
+
+    The time steppers in time_stepper call dump() after each time step if
+    the Checkpointer is given as parameters['checkpoint'].
+
+    Attributes:
+        file_name (str): Name of the checkpoint file.
+        num_dumps (int): Number of checkpoints written.
+
+    """
+
+    def __init__(self, file_name, every=None, interval=None, keys=None,
+                 compress=False, signals=None, exit_signals=None):
+        """
+        Parameters:
+            file_name (str): Name of the checkpoint file.
+            every (int, optional): Number of steps between checkpoints.
+            interval (double, optional): Wall clock time in seconds between
+                checkpoints.
+            keys (list of str, optional): Keys of the discretization matrices
+                to store. All sparse matrices by default, pass an empty list
+                to store only the state.
+            compress (boolean, optional): Compress the checkpoints.
+            signals (list, optional): Signals that trigger a checkpoint,
+                e.g. [signal.SIGUSR1]. Defaults to none.
+            exit_signals (list, optional): Signals that trigger a checkpoint,
+                followed by exit. Defaults to none.
+
+        """
+        self.file_name = file_name
+        self.every = every
+        self.interval = interval
+        self.keys = keys
+        self.compress = compress
+        self.num_dumps = 0
+
+        self._steps = 0
+        self._last_time = time.time()
+        self._signaled = False
+        self._exit = False
+
+        # Previous handlers of the signals, restored by close()
+        self._old_handlers = {}
+        for sig in signals or []:
+            self._install_handler(sig, self._handle_signal)
+        for sig in exit_signals or []:
+            self._install_handler(sig, self._handle_exit_signal)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Restore the signal handlers that were replaced by the Checkpointer.
+        """
+        for sig, handler in self._old_handlers.items():
+            signal.signal(sig, handler)
+        self._old_handlers = {}
+
+    def _install_handler(self, sig, handler):
+        old = signal.signal(sig, handler)
+        # Keep the original handler if a signal is given twice
+        self._old_handlers.setdefault(sig, old)
+
+    def _handle_signal(self, signum, frame):
+        self._signaled = True
+
+    def _handle_exit_signal(self, signum, frame):
+        self._signaled = True
+        self._exit = True
+
+    def dump(self, x, t, data=None, force=False):
+        """
+        Write a checkpoint if it is due, see the class documentation.
+
+        Parameters:
+            x (np.ndarray): State vector.
+            t (double): Time.
+            data (dictionary or GridBucket, optional): Data with
+                discretization matrices.
+            force (boolean, optional): Write a checkpoint regardless.
+
+        Returns:
+            boolean: True if a checkpoint was written.
+
+        """
+        self._steps += 1
+        due = force or self._signaled \
+            or (self.every is not None and self._steps >= self.every) \
+            or (self.interval is not None
+                and time.time() - self._last_time >= self.interval)
+        if not due:
+            return False
+
+        save(self.file_name, x, t, data, self.keys, self.compress)
+        logger.info('Checkpoint written at time ' + str(t))
+        self.num_dumps += 1
+        self._steps = 0
+        self._last_time = time.time()
+        self._signaled = False
+        if self._exit:
+            raise SystemExit('Stopped by signal after checkpoint at time '
+                             + str(t))
+        return True
+
+
+def _npz_name(file_name):
+    if not file_name.endswith('.npz'):
+        file_name += '.npz'
+    return file_name
+
+
+def _data_dicts(data):
+    """ Data dictionaries, with a prefix to identify them in the file. """
+    if data is None:
+        return []
+    if isinstance(data, GridBucket):
+        return [('node_' + str(d['node_number']) + '/', d) for _, d in data]
+    return [('', data)]
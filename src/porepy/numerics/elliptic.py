@@ -86,6 +86,10 @@ class EllipticModel():
         self._flux_disc = self.flux_disc()
         self._source_disc = self.source_disc()
 
+        # Linear solver factory. Kept as an attribute so that amg hierarchies
+        # and factorizations can be reused between calls to solve().
+        self._ls_factory = LSFactory()
+
     def solve(self, max_direct=40000, callback=False, **kwargs):
         """ Reassemble and solve linear system.
 
@@ -123,7 +127,7 @@ class EllipticModel():
 
         # Solve
         tic = time.time()
-        ls = LSFactory()
+        ls = self._ls_factory
         if self.rhs.size < max_direct:
             logger.warning('Solve linear system using direct solver')
             self.x = ls.direct(self.lhs, self.rhs)
@@ -142,6 +146,127 @@ class EllipticModel():
         logger.warning('Done. Elapsed time ' + str(time.time() - tic))
         return self.x
 
+    def solve_scenarios(self, bc_vals=None, sources=None, discretize=True,
+                        max_direct=40000, callback=False):
+        """ Solve the linear system for a set of boundary value and source
+        scenarios.
+
+        The system matrix is assembled (at most) once, and the right hand sides
+        of all scenarios are formed from the stored discretization of the
+        boundary conditions (data['bound_flux']). With a direct solver, the
+        matrix is factorized once; for larger systems, the same preconditioner
+        is used for all the scenarios.
+
+        The attribute x is set to a 2d array, with one column per scenario.
+        The results can be distributed to the grid bucket by split(), which
+        then gives one 2d array per grid.
+
+        Parameters:
+            bc_vals (optional): Boundary values. For a Grid, a 2d array of size
+                g.num_faces x num_scenarios; for a GridBucket, a dictionary
+                with grids as keys, and such arrays as values. Grids not
+                present, or if bc_vals is None, use the boundary values
+                stored in the parameter class for all scenarios.
+            sources (optional): Sources, on the same format as bc_vals, but
+                with one row per cell.
+            discretize (boolean, optional): Whether to discretize and assemble
+                the system before solving. If False, the system must have been
+                assembled in a previous call to reassemble() or solve().
+                Defaults to True.
+            max_direct (int): Maximum number of unknowns where a direct solver
+                is applied, see solve().
+            callback (boolean, optional): If True iteration information will be
+                output when an iterative solver is applied.
+
+        Returns:
+            np.ndarray (ndof x num_scenarios): Pressure states.
+
+        """
+        if discretize:
+            tic = time.time()
+            logger.info('Discretize')
+            self.reassemble()
+            logger.info('Done. Elapsed time ' + str(time.time() - tic))
+
+        rhs = self.rhs_scenarios(bc_vals, sources)
+
+        tic = time.time()
+        ls = self._ls_factory
+        if rhs.shape[0] < max_direct:
+            logger.info('Solve ' + str(rhs.shape[1]) + ' linear systems using'
+                        + ' direct solver')
+            self.x = ls.direct(self.lhs, rhs)
+        else:
+            logger.info('Solve ' + str(rhs.shape[1]) + ' linear systems using'
+                        + ' GMRES')
+            precond = self._setup_preconditioner()
+            slv = ls.gmres(self.lhs)
+            self.x = np.zeros(rhs.shape)
+            for i in range(rhs.shape[1]):
+                self.x[:, i], info = slv(rhs[:, i], M=precond,
+                                         callback=callback, maxiter=10000,
+                                         restart=1500, tol=1e-8)
+                if info != 0:
+                    logger.warning('GMRES failed for scenario ' + str(i) +
+                                   ' with status ' + str(info))
+        logger.info('Done. Elapsed time ' + str(time.time() - tic))
+        return self.x
+
+    def rhs_scenarios(self, bc_vals=None, sources=None):
+        """ Assemble right hand sides for a set of boundary value and source
+        scenarios, using the stored discretization of the boundary conditions.
+
+        Parameters:
+            bc_vals, sources: See solve_scenarios().
+
+        Returns:
+            np.ndarray (ndof x num_scenarios): Right hand sides.
+
+        """
+        if self.is_GridBucket:
+            discr = self._flux_disc.discr
+            bc_vals = {} if bc_vals is None else bc_vals
+            sources = {} if sources is None else sources
+            num_scen = self._num_scenarios(list(bc_vals.values()) +
+                                           list(sources.values()))
+            rhs = np.zeros((self._flux_disc.ndof(self.grid()), num_scen))
+            for g, d in self.grid():
+                ind = self._flux_disc.solver.dof_of_grid(self.grid(), g)
+                rhs[ind] = self._rhs_scenarios_grid(discr, g, d,
+                                                    bc_vals.get(g),
+                                                    sources.get(g), num_scen)
+        else:
+            num_scen = self._num_scenarios([bc_vals, sources])
+            rhs = self._rhs_scenarios_grid(self._flux_disc, self.grid(),
+                                           self.data(), bc_vals, sources,
+                                           num_scen)
+        return rhs
+
+    def _num_scenarios(self, values):
+        num_scen = set([np.atleast_2d(v.T).shape[0] for v in values
+                        if v is not None])
+        if len(num_scen) > 1:
+            raise ValueError('All scenario arrays should have the same '
+                             'number of columns')
+        return num_scen.pop() if len(num_scen) == 1 else 1
+
+    def _rhs_scenarios_grid(self, discr, g, d, bc_val, source, num_scen):
+        if not hasattr(discr, 'rhs') or 'bound_flux' not in d:
+            raise NotImplementedError('Scenario right hand sides need a flux '
+                                      'discretization with a stored '
+                                      'bound_flux')
+        param = d['param']
+        if bc_val is None:
+            bc_val = param.get_bc_val(self.physics)
+        if source is None:
+            source = param.get_source(self.physics)
+        # Broadcast values that are common for all scenarios
+        bc_val = np.asarray(bc_val, dtype=np.float).reshape((g.num_faces, -1))
+        bc_val = np.tile(bc_val, (1, num_scen // bc_val.shape[1]))
+        source = np.asarray(source, dtype=np.float).reshape((g.num_cells, -1))
+        rhs_flux = discr.rhs(g, d['bound_flux'], bc_val)
+        return np.asarray(rhs_flux).reshape((g.num_cells, num_scen)) + source
+
     def step(self):
         return self.solve()
 
@@ -274,7 +399,7 @@ class EllipticModel():
         all_ind = np.arange(self.rhs.size)
         not_ind = [np.setdiff1d(all_ind, i) for i in ind]
 
-        factory = LSFactory()
+        factory = self._ls_factory
         num_mat = len(mat)
         solvers = np.empty(num_mat, dtype=np.object)
         for i, A in enumerate(mat):
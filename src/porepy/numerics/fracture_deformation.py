@@ -27,10 +27,16 @@ class FrictionSlipModel():
         'Param'
     physics: (string): defaults to 'slip'
 
+    Attributes:
+    changed_faces: (ndarray) Fracture faces (both sides) that started to slip
+             in the last call to solve(). The mechanics discretization can be
+             updated locally around these, see StaticModel.update().
+
     Functions:
     solve(): Calls reassemble and solves the linear system.
              Returns: new slip if T_s > mu * (T_n - p)
-             Sets attributes: self.x, self.is_slipping, self.d_n
+             Sets attributes: self.x, self.is_slipping, self.d_n,
+             self.changed_faces
     step(): Same as solve
     normal_shear_traction(): project the traction into the corresponding
                              normal and shear components
@@ -70,6 +76,7 @@ class FrictionSlipModel():
         self.d_n = np.zeros(gb.num_faces)
 
         self.is_slipping = np.zeros(gb.num_faces, dtype=np.bool)
+        self.changed_faces = np.zeros(0, dtype=np.int)
 
         self.slip_name = 'slip_distance'
         self.aperture_name = 'aperture_change'
@@ -119,6 +126,10 @@ class FrictionSlipModel():
             self.mu(fi, self.is_slipping[fi]) * \
             sigma_n > 1e-5 * self._data['rock'].MU
 
+        # Faces where the slip state changes
+        changed = new_slip & ~self.is_slipping[fi]
+        self.changed_faces = np.hstack((fi[changed], fi_left[changed]))
+
         self.is_slipping[fi] = self.is_slipping[fi] | new_slip
         excess_shear = np.abs(
             T_s) - self.mu(fi, self.is_slipping[fi]) * sigma_n
@@ -1,12 +1,16 @@
 import scipy.sparse as sps
 import scipy.sparse.linalg as la
 import time
+import logging
 import numpy as np
 
 from porepy.numerics.fv import mpfa, mpsa, fvutils
 from porepy.params import tensor, bc
 from porepy.numerics.mixed_dim.solver import Solver
 
+# Module-wide logger
+logger = logging.getLogger(__name__)
+
 
 class Biot(Solver):
 
@@ -178,6 +182,30 @@ class Biot(Solver):
             scipy.sparse.bmat: Block matrix with the combined MPSA/MPFA
                 discretization.
 
+        """
+        A_mech, A_grad_p, A_div_d, A_flow = self._assemble_blocks(g, data)
+
+        # Matrix for left hand side
+        A_biot = sps.bmat([[A_mech, A_grad_p],
+                           [A_div_d, A_flow]]).tocsr()
+
+        return A_biot
+
+    def _assemble_blocks(self, g, data):
+        """ Assemble the four blocks of the poro-elastic system matrix.
+
+        Parameters:
+            g (grid): Grid for disrcetization
+            data (dictionary): Data for discretization, as well as matrices
+                with discretization of the sub-parts of the system.
+
+        Returns:
+            sps.csr_matrix: Mechanics block, div_mech * stress.
+            sps.csr_matrix: Coupling from pressure to mechanics.
+            sps.csr_matrix: Coupling from displacement to flow.
+            sps.csr_matrix: Flow block, including compressibility and
+                stabilization.
+
         """
         div_flow = fvutils.scalar_divergence(g)
         div_mech = fvutils.vector_divergence(g)
@@ -186,7 +214,6 @@ class Biot(Solver):
         fluid_viscosity = param.fluid_viscosity
         biot_alpha = param.biot_alpha
 
-        # Put together linear system
         A_flow = div_flow * data['flux'] / fluid_viscosity
         A_mech = div_mech * data['stress']
 
@@ -194,14 +221,12 @@ class Biot(Solver):
         dt = data['dt']
 
         d_scaling = data.get('displacement_scaling', 1)
-        # Matrix for left hand side
-        A_biot = sps.bmat([[A_mech,
-                            data['grad_p'] * biot_alpha],
-                            [data['div_d'] * biot_alpha * d_scaling,
-                             data['compr_discr'] \
-                             + dt * A_flow + data['stabilization']]]).tocsr()
 
-        return A_biot
+        A_grad_p = data['grad_p'] * biot_alpha
+        A_div_d = data['div_d'] * biot_alpha * d_scaling
+        A_p = data['compr_discr'] + dt * A_flow + data['stabilization']
+        return A_mech.tocsr(), sps.csr_matrix(A_grad_p), \
+            sps.csr_matrix(A_div_d), sps.csr_matrix(A_p)
 
 
     def _discretize_flow(self, g, data):
@@ -503,6 +528,105 @@ class Biot(Solver):
 
         return slv
 
+    def fixed_stress(self, g, data, beta=0.5, tol=1e-10, max_iter=100,
+                     callback=None):
+        """ Iterative fixed-stress splitting solver for the Biot system.
+
+        The flow equation is solved with the volumetric stress lagged one
+        iteration, stabilized by the term
+            L = beta * biot_alpha^2 * cell_volumes / K_dr,
+        with K_dr = 2 * mu / dim + lmbda the drained bulk modulus. The
+        mechanics equation is next solved with the updated pressure. The
+        mechanics block (div_mech * stress) and the stabilized flow block are
+        factorized once, when this method is called, and reused for all
+        iterations in all subsequent calls to the returned function. As long
+        as the discretization and time step are unchanged, the function can
+        thus be reused over all time steps.
+
+        The monolithic matrix is never formed, thus the method is an
+        alternative to self.solve() when a direct solver on the full system
+        is too memory demanding.
+
+        Parameters:
+            g (grid): Grid for discretization.
+            data (dictionary): Data for discretization, should have been
+                through a call to self.discretize().
+            beta (double, optional): Scaling of the stabilization term.
+                Defaults to 0.5.
+            tol (double, optional): Tolerance for the residual of the full
+                system, relative to the norm of the right hand side. Defaults
+                to 1e-10.
+            max_iter (int, optional): Maximum number of iterations. Defaults
+                to 100.
+            callback (function, optional): Called after each iteration with
+                the iteration number and the relative residual.
+
+        Returns:
+            function: slv(b, x0=None), which solves the system for the right
+                hand side b, using x0 as initial guess (defaults to zero).
+
+        Example:
+            discr = Biot()
+            discr.discretize(g, data)
+            slv = discr.fixed_stress(g, data)
+            for t in times:
+                data['state'] = x
+                x = slv(discr.rhs(g, data), x0=x)
+
+        """
+        A_mech, A_grad_p, A_div_d, A_flow = self._assemble_blocks(g, data)
+
+        param = data['param']
+        constit = param.get_tensor('mechanics')
+        bulk = 2 * constit.mu / g.dim + constit.lmbda
+        d_scaling = data.get('displacement_scaling', 1)
+        stab = beta * d_scaling * np.power(param.biot_alpha, 2) \
+            * g.cell_volumes / bulk
+        L = sps.dia_matrix((stab, 0), shape=(g.num_cells, g.num_cells))
+
+        tic = time.time()
+        mech_solve = la.factorized(A_mech.tocsc())
+        flow_solve = la.factorized((A_flow + L).tocsc())
+        logger.info('Fixed stress factorization done. Elapsed time: '
+                    + str(time.time() - tic))
+
+        num_mech = g.dim * g.num_cells
+
+        def slv(b, x0=None):
+            b_mech = b[:num_mech]
+            b_flow = b[num_mech:]
+            if x0 is None:
+                d = np.zeros(num_mech)
+                p = np.zeros(g.num_cells)
+            else:
+                d = np.asarray(x0[:num_mech], dtype=np.float)
+                p = np.asarray(x0[num_mech:], dtype=np.float)
+
+            b_norm = np.linalg.norm(b)
+            if b_norm == 0:
+                b_norm = 1
+
+            for it in range(max_iter):
+                p = flow_solve(b_flow - A_div_d * d + L * p)
+                d = mech_solve(b_mech - A_grad_p * p)
+                # The mechanics equation is solved exactly, the residual is
+                # all in the flow equation.
+                res = np.linalg.norm(b_flow - A_div_d * d - A_flow * p) \
+                    / b_norm
+                logger.info('Fixed stress iteration ' + str(it + 1)
+                            + ', residual ' + str(res))
+                if callback:
+                    callback(it + 1, res)
+                if res < tol:
+                    break
+            else:
+                logger.warning('Fixed stress iterations did not converge. '
+                               'Residual ' + str(res))
+
+            return np.hstack((d, p))
+
+        return slv
+
 
 #----------------------- Methods for post processing -------------------------
     def extractD(self, g, u, dims=None, as_vector=False):
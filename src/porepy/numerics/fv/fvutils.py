@@ -7,6 +7,8 @@ Created on Fri Mar  4 09:04:16 2016
 from __future__ import division
 import numpy as np
 import scipy.sparse as sps
+import scipy.sparse.csgraph
+from scipy.sparse.linalg import spsolve
 
 from porepy.utils import matrix_compression, mcolon
 from porepy.params.data import Parameters
@@ -515,7 +517,9 @@ def expand_indices_nd(ind, nd, direction=1):
     dim_inds = np.arange(nd)
     dim_inds = dim_inds[:, np.newaxis]  # Prepare for broadcasting
     new_ind = nd * ind + dim_inds
-    new_ind = new_ind.ravel(direction)
+    # direction 1 means Fortran ordering (one index after the other), 0 means
+    # C ordering (one dimension after the other).
+    new_ind = new_ind.ravel('F' if direction else 'C')
     return new_ind
 
 
@@ -626,6 +630,172 @@ def zero_out_sparse_rows(A, rows, diag=None):
     return A
 
 
+def flow_ordering(A):
+    """
+    Order cells along the flow direction given by an upwind matrix.
+
+    The upwind graph has an edge from cell j to cell i if A[i, j] is nonzero,
+    that is, if j is upstream of i. Cycles in the graph are collapsed into
+    strongly connected components, and the components are sorted
+    topologically, so that all upstream components come before their
+    downstream neighbors. The components are further grouped into levels
+    (wave fronts), where the components in a level only depend on components
+    in previous levels.
+
+    Parameters:
+        A (sps.spmatrix, num_cells x num_cells): Upwind matrix. The diagonal
+            is ignored.
+
+    Returns:
+        np.ndarray (int): Cells in flow order. Cells in the same component
+            are contiguous.
+        np.ndarray (int): Pointer to the start of each component in the cell
+            order, of size num_components + 1.
+        np.ndarray (int): Pointer to the first component of each level, of
+            size num_levels + 1.
+
+    """
+    G = sps.csr_matrix(A)
+    G = G - sps.dia_matrix((G.diagonal(), 0), shape=G.shape)
+    G.eliminate_zeros()
+    nc = G.shape[0]
+
+    num_comp, labels = sps.csgraph.connected_components(G, directed=True,
+                                                        connection='strong')
+
+    # Condensed graph: row i holds the components upstream of component i.
+    # Duplicate edges are merged by the conversion to csr.
+    G = G.tocoo()
+    ci = labels[G.row]
+    cj = labels[G.col]
+    between = ci != cj
+    upstream = sps.coo_matrix((np.ones(between.sum()),
+                               (ci[between], cj[between])),
+                              shape=(num_comp, num_comp)).tocsr()
+    downstream = upstream.transpose().tocsr()
+    in_degree = np.diff(upstream.indptr)
+
+    # Kahn's algorithm, treating one level of components at a time
+    comp_order = np.empty(num_comp, dtype=np.int)
+    level_ptr = [0]
+    front = np.where(in_degree == 0)[0]
+    while front.size > 0:
+        start = level_ptr[-1]
+        comp_order[start:start + front.size] = front
+        level_ptr.append(start + front.size)
+
+        targets = downstream.indices[mcolon.mcolon(downstream.indptr[front],
+                                                   downstream.indptr[front + 1])]
+        in_degree -= np.bincount(targets, minlength=num_comp)
+        front = np.unique(targets[in_degree[targets] == 0])
+
+    # Sort cells according to the rank of their component
+    rank = np.empty(num_comp, dtype=np.int)
+    rank[comp_order] = np.arange(num_comp)
+    cell_order = np.argsort(rank[labels], kind='mergesort')
+    comp_size = np.bincount(labels, minlength=num_comp)[comp_order]
+    comp_ptr = np.hstack((0, np.cumsum(comp_size)))
+
+    assert comp_ptr[-1] == nc
+    return cell_order, comp_ptr, np.array(level_ptr)
+
+
+def flow_ordered_solve(A, b, ordering=None, diag=None):
+    """
+    Solve an upwind system by substitution in flow order.
+
+    Cells are treated one level at a time, see flow_ordering(). Within a
+    level, single cells are solved by a division with the diagonal, while
+    strongly connected components (cycles) are solved as small local systems.
+    The cost is thus linear in the number of cells for a graph without
+    cycles.
+
+    Several systems that share the off-diagonal part of A can be solved in the
+    same sweep, by giving one diagonal per right hand side.
+
+    Parameters:
+        A (sps.spmatrix, num_cells x num_cells): Upwind matrix.
+        b (np.ndarray): Right hand side, either of size num_cells or
+            num_cells x num_rhs.
+        ordering (tuple, optional): Output of flow_ordering(A). Computed if
+            not provided.
+        diag (np.ndarray, optional): Diagonal to be used instead of the
+            diagonal of A, same shape as b.
+
+    Returns:
+        np.ndarray: Solution, same shape as b.
+
+    """
+    if ordering is None:
+        ordering = flow_ordering(A)
+    cell_order, comp_ptr, level_ptr = ordering
+
+    A = sps.csr_matrix(A)
+    nc = A.shape[0]
+
+    b = np.asarray(b, dtype=np.float)
+    is_vector = b.ndim == 1
+    if is_vector:
+        b = b.reshape((-1, 1))
+    num_rhs = b.shape[1]
+    if diag is None:
+        diag = np.tile(A.diagonal().reshape((-1, 1)), (1, num_rhs))
+    else:
+        diag = np.asarray(diag, dtype=np.float).reshape(b.shape)
+
+    # Permute the system to flow order. The rows of a level are then
+    # contiguous, and the upstream contributions can be computed directly
+    # from the csr storage.
+    offdiag = A - sps.dia_matrix((A.diagonal(), 0), shape=A.shape)
+    offdiag = offdiag[cell_order][:, cell_order].tocsr()
+    offdiag.eliminate_zeros()
+    indptr, indices, data = offdiag.indptr, offdiag.indices, offdiag.data
+    row = np.repeat(np.arange(nc), np.diff(indptr))
+    b = b[cell_order]
+    diag = diag[cell_order]
+
+    x = np.zeros_like(b)
+    comp_size = np.diff(comp_ptr)
+    for level in range(level_ptr.size - 1):
+        first, last = level_ptr[level], level_ptr[level + 1]
+        start, end = comp_ptr[first], comp_ptr[last]
+
+        # Unknowns in this and later levels are still zero, thus only upstream
+        # values enter the right hand side.
+        nz = slice(indptr[start], indptr[end])
+        rhs = b[start:end].copy()
+        for col in range(num_rhs):
+            rhs[:, col] -= np.bincount(row[nz] - start,
+                                       weights=data[nz] * x[indices[nz], col],
+                                       minlength=end - start)
+
+        sizes = comp_size[first:last]
+        if np.all(sizes == 1):
+            x[start:end] = rhs / diag[start:end]
+            continue
+
+        single = np.repeat(sizes, sizes) == 1
+        x[start:end][single] = rhs[single] / diag[start:end][single]
+
+        for comp in np.where(sizes > 1)[0] + first:
+            loc = np.arange(comp_ptr[comp], comp_ptr[comp + 1])
+            loc_rhs = rhs[loc - start]
+            A_loc = offdiag[loc][:, loc]
+            for col in range(num_rhs):
+                A_col = A_loc + sps.dia_matrix((diag[loc, col], 0),
+                                               shape=A_loc.shape)
+                if loc.size > 100:
+                    x[loc, col] = spsolve(A_col.tocsc(), loc_rhs[:, col])
+                else:
+                    x[loc, col] = np.linalg.solve(A_col.toarray(),
+                                                  loc_rhs[:, col])
+
+    sol = np.zeros_like(x)
+    sol[cell_order] = x
+    if is_vector:
+        return sol.ravel()
+    return sol
+
 #-----------------------------------------------------------------------------
 
 class ExcludeBoundaries(object):
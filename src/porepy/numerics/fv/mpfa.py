@@ -10,7 +10,7 @@ import scipy.sparse as sps
 from porepy.numerics.fv import fvutils, tpfa
 from porepy.grids import partition
 from porepy.params import tensor, bc, data
-from porepy.utils import matrix_compression
+from porepy.utils import matrix_compression, sparse_mat
 from porepy.utils import comp_geom as cg
 from porepy.numerics.mixed_dim.solver import Solver, SolverMixedDim
 from porepy.numerics.mixed_dim.coupler import Coupler
@@ -170,6 +170,60 @@ class Mpfa(Solver):
         data['flux'] = trm
         data['bound_flux'] = bound_flux
 
+#------------------------------------------------------------------------------#
+
+    def update(self, g, data, cells=None, faces=None, nodes=None):
+        """
+        Update the discretization stored in data in a part of the grid.
+
+        Only the interaction regions affected by the specified cells, faces
+        or nodes are recomputed, see mpfa_partial() and
+        fvutils.cell_ind_for_partial_update() for details. The rows of
+        data['flux'] and data['bound_flux'] that belong to the updated faces
+        are replaced in place, all other rows are left untouched. The intended
+        use is updates of the permeability in a small part of the domain;
+        the permeability, boundary conditions and apertures are read from
+        data['param'] as in discretize().
+
+        Parameters
+        ----------
+        g : grid, or a subclass, with geometry fields computed.
+        data: dictionary to store the data. Should contain a discretization
+            computed by discretize().
+        cells (np.array, int, optional): Index of cells on which to base the
+            update.
+        faces (np.array, int, optional): Index of faces on which to base the
+            update.
+        nodes (np.array, int, optional): Index of nodes on which to base the
+            update.
+
+        Returns
+        -------
+        np.array (int): Index of the faces that were updated.
+
+        """
+        if g.dim == 0:
+            return np.zeros(0, dtype=np.int)
+
+        param = data['param']
+        k = param.get_tensor(self)
+        bnd = param.get_bc(self)
+        a = param.aperture
+
+        flux, bound_flux, active_faces = \
+            _mpfa_partial_rows(g, k, bnd, eta=None, inverter=None,
+                               cells=cells, faces=faces, nodes=nodes,
+                               apertures=a)
+
+        # Replace the rows of the active faces. This requires csr matrices,
+        # convert if necessary (should only happen the first time).
+        for key, rows in zip(['flux', 'bound_flux'], [flux, bound_flux]):
+            if data[key].getformat() != 'csr':
+                data[key] = data[key].tocsr()
+            sparse_mat.merge_matrices(data[key], rows.tocsr(), active_faces)
+
+        return active_faces
+
 #------------------------------------------------------------------------------#
 
 
@@ -359,10 +413,35 @@ def mpfa_partial(g, k, bnd, eta=0, inverter='numba', cells=None, faces=None,
     if faces is not None:
         warnings.warn('Faces keyword for partial mpfa has not been tested')
 
+    flux_rows, bound_flux_rows, active_faces = \
+        _mpfa_partial_rows(g, k, bnd, eta=eta, inverter=inverter, cells=cells,
+                           faces=faces, nodes=nodes, apertures=apertures)
+
+    # Expand to all faces of the grid. By design of mpfa, and the subgrids,
+    # the discretization will also update faces outside the active faces;
+    # these were removed already in _mpfa_partial_rows, and will be empty
+    # rows here.
+    expand = sps.csr_matrix((np.ones(active_faces.size),
+                             (active_faces, np.arange(active_faces.size))),
+                            shape=(g.num_faces, active_faces.size))
+
+    return expand * flux_rows, expand * bound_flux_rows, active_faces
+
+
+def _mpfa_partial_rows(g, k, bnd, eta=0, inverter='numba', cells=None,
+                       faces=None, nodes=None, apertures=None):
+    """
+    Actual implementation of mpfa_partial(). The discretization is returned
+    only for the rows of the active faces, that is, with shape
+    (active_faces.size x g.num_cells) and (active_faces.size x g.num_faces).
+    See mpfa_partial() for a description of the parameters.
+
+    """
     # Find computational stencil, based on specified cells, faces and nodes.
     ind, active_faces = fvutils.cell_ind_for_partial_update(g, cells=cells,
                                                             faces=faces,
                                                             nodes=nodes)
+    active_faces = np.atleast_1d(active_faces)
 
     # Extract subgrid, together with mappings between local and global
     # cells
@@ -374,6 +453,9 @@ def mpfa_partial(g, k, bnd, eta=0, inverter='numba', cells=None, faces=None,
     loc_k = k.copy()
     loc_k.perm = loc_k.perm[::, ::, l2g_cells]
 
+    if apertures is not None:
+        apertures = np.asarray(apertures)[l2g_cells]
+
     glob_bound_face = g.get_boundary_faces()
 
     # Boundary conditions are slightly more complex. Find local faces
@@ -397,17 +479,14 @@ def mpfa_partial(g, k, bnd, eta=0, inverter='numba', cells=None, faces=None,
     # Map to global indices
     face_map, cell_map = fvutils.map_subgrid_to_grid(g, l2g_faces, l2g_cells,
                                                      is_vector=False)
-    flux_glob = face_map * flux_loc * cell_map
-    bound_flux_glob = face_map * bound_flux_loc * face_map.transpose()
-
-    # By design of mpfa, and the subgrids, the discretization will update faces
-    # outside the active faces. Kill these.
-    outside = np.setdiff1d(np.arange(g.num_faces), active_faces,
-                           assume_unique=True)
-    flux_glob[outside, :] = 0
-    bound_flux_glob[outside, :] = 0
-
-    return flux_glob, bound_flux_glob, active_faces
+    # Only the active faces should be kept. Discard the other rows before the
+    # matrix products, rather than zeroing rows of the global matrices, which
+    # is expensive for csr matrices.
+    row_map = face_map[active_faces]
+    flux_rows = row_map * flux_loc * cell_map
+    bound_flux_rows = row_map * bound_flux_loc * face_map.transpose()
+
+    return flux_rows, bound_flux_rows, active_faces
 
 
 def _mpfa_local(g, k, bnd, eta=None, inverter='numba', apertures=None):
@@ -8,6 +8,7 @@ equations tend to become slightly more complex thus, it may be useful to confer
 that module as well.
 
 """
+import warnings
 import numpy as np
 import scipy.sparse as sps
 
@@ -115,6 +116,56 @@ class Mpsa(Solver):
         data['stress'] = stress
         data['bound_stress'] = bound_stress
 
+#------------------------------------------------------------------------------#
+
+    def update(self, g, data, cells=None, faces=None, nodes=None):
+        """
+        Update the discretization stored in data in a part of the grid.
+
+        Only the stencils affected by the specified cells, faces or nodes are
+        recomputed, see mpsa_partial() and
+        fvutils.cell_ind_for_partial_update() for details. The rows of
+        data['stress'] and data['bound_stress'] that belong to the updated
+        faces are replaced in place, all other rows are left untouched. The
+        stiffness and boundary conditions are read from data['param'] as in
+        discretize().
+
+        Parameters
+        ----------
+        g : grid, or a subclass, with geometry fields computed.
+        data: dictionary to store the data. Should contain a discretization
+            computed by discretize().
+        cells (np.array, int, optional): Index of cells on which to base the
+            update.
+        faces (np.array, int, optional): Index of faces on which to base the
+            update.
+        nodes (np.array, int, optional): Index of nodes on which to base the
+            update.
+
+        Returns
+        -------
+        np.array (int): Index of the faces that were updated.
+
+        """
+        c = data['param'].get_tensor(self)
+        bnd = data['param'].get_bc(self)
+
+        stress, bound_stress, active_faces = \
+            _mpsa_partial_rows(g, c, bnd, eta=fvutils.determine_eta(g),
+                               inverter=None, cells=cells, faces=faces,
+                               nodes=nodes)
+
+        # Replace the rows of the active faces in place. This requires csr
+        # matrices, convert if necessary.
+        rows = fvutils.expand_indices_nd(active_faces, g.dim)
+        for key, mat in zip(['stress', 'bound_stress'],
+                            [stress, bound_stress]):
+            if data[key].getformat() != 'csr':
+                data[key] = data[key].tocsr()
+            sparse_mat.merge_matrices(data[key], mat.tocsr(), rows)
+
+        return active_faces
+
 #------------------------------------------------------------------------------#
 
     def rhs(self, g, bound_stress, bc_val, f):
@@ -192,7 +243,7 @@ class FracturedMpsa(Mpsa):
 
         bc_val = data['param'].get_bc_val(self)
         
-        frac_faces = np.matlib.repmat(g.has_face_tag(FaceTag.FRACTURE), 3, 1)
+        frac_faces = np.tile(g.has_face_tag(FaceTag.FRACTURE), (3, 1))
         assert np.all(bc_val[frac_faces.ravel('F')] == 0), \
             '''Fracture should have zero boundary condition. Set slip by
                Parameters.set_slip_distance'''
@@ -314,6 +365,53 @@ class FracturedMpsa(Mpsa):
 
         # Discretize with normal mpsa
         self.discretize(g, data, **kwargs)
+        self._assemble_fracture_system(g, data, faces)
+
+    def update_fractures(self, g, data, faces=None, cells=None):
+        """
+        Update the discretization of a fractured domain in the vicinity of
+        the given faces or cells.
+
+        The mpsa stencils around the faces and cells are recomputed, and the
+        rows of data['stress'] and data['bound_stress'] are replaced in place,
+        see Mpsa.update(). The fracture system (data['A_e'], data['b_e']) is
+        then reassembled from the stored stress discretization, without any
+        global re-discretization.
+
+        The intended use is iterations where the state of a few fracture faces
+        change, e.g. slip iterations, see
+        fracture_deformation.FrictionSlipModel.changed_faces.
+
+        Parameters
+        ----------
+        g : grid, or a subclass, with geometry fields computed.
+        data: dictionary to store the data. Should contain a discretization
+            computed by discretize_fractures().
+        faces (np.array, int, optional): Faces around which to update.
+        cells (np.array, int, optional): Cells around which to update.
+
+        Returns
+        -------
+        np.array (int): Index of the faces where the stress was updated.
+
+        """
+        # Empty index arrays are treated as not given
+        if faces is not None and np.asarray(faces).size == 0:
+            faces = None
+        if cells is not None and np.asarray(cells).size == 0:
+            cells = None
+        if faces is None and cells is None:
+            return np.zeros(0, dtype=np.int)
+
+        active_faces = self.update(g, data, cells=cells, faces=faces)
+        self._assemble_fracture_system(g, data)
+        return active_faces
+
+    def _assemble_fracture_system(self, g, data, faces=None):
+        """
+        Assemble the matrices of the fractured system, data['A_e'] and
+        data['b_e'], from the stress discretization stored in data.
+        """
         stress, bound_stress = data['stress'], data['bound_stress']
         # Create A and rhs
         div = fvutils.vector_divergence(g)
@@ -634,10 +732,34 @@ def mpsa_partial(g, constit, bound, eta=0, inverter='numba', cells=None,
     if faces is not None:
         warnings.warn('Faces keyword for partial mpfa has not been tested')
 
+    stress_rows, bound_stress_rows, active_faces = \
+        _mpsa_partial_rows(g, constit, bound, eta=eta, inverter=inverter,
+                           cells=cells, faces=faces, nodes=nodes)
+
+    # Expand to all faces of the grid. The rows of faces outside the active
+    # faces were removed in _mpsa_partial_rows, and will be empty here.
+    rows = fvutils.expand_indices_nd(active_faces, g.dim)
+    expand = sps.csr_matrix((np.ones(rows.size),
+                             (rows, np.arange(rows.size))),
+                            shape=(g.num_faces * g.dim, rows.size))
+
+    return expand * stress_rows, expand * bound_stress_rows, active_faces
+
+
+def _mpsa_partial_rows(g, constit, bound, eta=0, inverter='numba',
+                       cells=None, faces=None, nodes=None):
+    """
+    Actual implementation of mpsa_partial(). The discretization is returned
+    only for the rows of the active faces, that is, with
+    g.dim * active_faces.size rows. See mpsa_partial() for a description of
+    the parameters.
+
+    """
     # Find computational stencil, based on specified cells, faces and nodes.
     ind, active_faces = fvutils.cell_ind_for_partial_update(g, cells=cells,
                                                             faces=faces,
                                                             nodes=nodes)
+    active_faces = np.atleast_1d(active_faces)
 
     # Extract subgrid, together with mappings between local and global
     # cells
@@ -674,19 +796,13 @@ def mpsa_partial(g, constit, bound, eta=0, inverter='numba', cells=None,
     face_map, cell_map = fvutils.map_subgrid_to_grid(g, l2g_faces, l2g_cells,
                                                      is_vector=True)
 
-    # Update global face fields.
-    stress_glob = face_map * stress_loc * cell_map
-    bound_stress_glob = face_map * bound_stress_loc * face_map.transpose()
-
-    # By design of mpfa, and the subgrids, the discretization will update faces
-    # outside the active faces. Kill these.
-    outside = np.setdiff1d(np.arange(g.num_faces), active_faces,
-                           assume_unique=True)
-    eliminate_ind = fvutils.expand_indices_nd(outside, g.dim)
-    fvutils.zero_out_sparse_rows(stress_glob, eliminate_ind)
-    fvutils.zero_out_sparse_rows(bound_stress_glob, eliminate_ind)
+    # By design of mpsa, and the subgrids, the discretization will update faces
+    # outside the active faces. Only keep the rows of the active faces.
+    row_map = face_map[fvutils.expand_indices_nd(active_faces, g.dim)]
+    stress_rows = row_map * stress_loc * cell_map
+    bound_stress_rows = row_map * bound_stress_loc * face_map.transpose()
 
-    return stress_glob, bound_stress_glob, active_faces
+    return stress_rows, bound_stress_rows, active_faces
 
 def _mpsa_local(g, constit, bound, eta=0, inverter='numba'):
     """
@@ -1350,7 +1466,7 @@ def __unique_hooks_law(csym, casym, subcell_topology, nd):
     """
     # unique_sub_fno covers scalar equations only. Extend indices to cover
     # multiple dimensions
-    num_eqs = csym.shape[0] / nd
+    num_eqs = csym.shape[0] // nd
     ind_single = np.tile(subcell_topology.unique_subfno, (nd, 1))
     increments = np.arange(nd) * num_eqs
     ind_all = np.reshape(ind_single + increments[:, np.newaxis], -1)
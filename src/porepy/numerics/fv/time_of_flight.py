@@ -6,6 +6,8 @@ import numpy as np
 import scipy.sparse as sps
 from scipy.sparse.linalg import spsolve
 
+from porepy.numerics.fv import fvutils
+
 
 def compute_tof(g, flux, poro, q):
     """
@@ -25,7 +27,106 @@ def compute_tof(g, flux, poro, q):
         np.array, size num_cells: Cell-wise time of flight
 
     """
+    A, accum, q = _upwind_system(g, flux, q)
+
+    # The average TOF for cells with sources are set to twice the time it takes
+    # to fill the cell. Achieve this by adding twice the sources.
+    sources = accum + 2 * q
+
+    nc = g.num_cells
+
+    # Add accumulation in each cell
+    A += sps.dia_matrix((sources, 0), shape=(nc, nc))
 
+    # Pore volume equals porosity times cell volume
+    pv = g.cell_volumes * poro
+
+    tof = spsolve(A, pv)
+    return tof
+
+
+def compute_tof_reordered(g, flux, poro, q, backward=False, tracers=None):
+    """
+    Compute time of flight by substitution along the flow direction.
+
+    The discretization is the same as in compute_tof(), but the cells are
+    sorted topologically according to the upwind graph, see
+    fvutils.flow_ordering(). The system is then solved one cell at a time,
+    with cycles in the flux field treated as small local systems. For flux
+    fields without cycles, the cost is linear in the number of cells.
+
+    Backward time of flight (the time to reach a sink) is computed by
+    reversing the flux field, and treating the sinks in q as sources.
+
+    Optionally, the tracer partition of a set of sources (forward) or sinks
+    (backward) is computed in the same sweep. The tracer concentration of
+    partition k is the fraction of the flow through a cell that originates
+    from (or ends in) the cells in tracers[k].
+
+    Parameters:
+        g (core.grids.grid): Grid structure.
+        flux (np.array, size num_faces): Flow field used in the computation.
+        poro (np.array, size num_cells): Cell-wise porosity
+        q (np.array, size num_cells): Combined source terms and flux
+            contribution from boundary conditions.
+        backward (boolean, optional): If True, compute the backward time of
+            flight. Defaults to False.
+        tracers (list of np.array, optional): Each element contains the
+            source (or sink, if backward) cells of a tracer partition.
+
+    Returns:
+        np.array, size num_cells: Cell-wise time of flight
+        np.array, num_tracers x num_cells: Tracer concentrations. Only
+            returned if tracers is given.
+
+    """
+    if backward:
+        flux = -flux
+        q = -q
+
+    A, accum, q = _upwind_system(g, flux, q)
+    A = A.tocsr()
+    ordering = fvutils.flow_ordering(A)
+
+    nc = g.num_cells
+    pv = g.cell_volumes * poro
+
+    # The time of flight and the tracers share the off-diagonal upwind
+    # coupling, but the tracers are not given the doubled source term on the
+    # diagonal, see compute_tof(). The systems are solved in the same sweep.
+    tof_diag = accum + 2 * q
+    if tracers is None:
+        A += sps.dia_matrix((tof_diag, 0), shape=(nc, nc))
+        return fvutils.flow_ordered_solve(A, pv, ordering)
+
+    num_tracers = len(tracers)
+    rhs = np.zeros((nc, num_tracers + 1))
+    rhs[:, 0] = pv
+    for ti, cells in enumerate(tracers):
+        rhs[cells, ti + 1] = q[cells]
+    diag = np.tile((accum + q).reshape((-1, 1)), (1, num_tracers + 1))
+    diag[:, 0] = tof_diag
+
+    x = fvutils.flow_ordered_solve(A, rhs, ordering, diag=diag)
+    return x[:, 0], x[:, 1:].T
+
+
+def _upwind_system(g, flux, q):
+    """
+    Upwind coupling between cells for the time of flight equation.
+
+    Parameters:
+        g (core.grids.grid): Grid structure.
+        flux (np.array, size num_faces): Flow field used in the computation.
+        q (np.array, size num_cells): Combined source terms and flux
+        contribution from boundary conditions.
+
+    Returns:
+        sps.coo_matrix: Off-diagonal part of the upwind matrix.
+        np.array, size num_cells: Inflow from neighboring cells.
+        np.array, size num_cells: Positive part of the sources.
+
+    """
     # Get neighbors on a dense form (array of two rows)
     neighs = g.cell_face_as_dense()
     # We're only interested in internal faces, boundaries are hanled below
@@ -37,35 +138,23 @@ def compute_tof(g, flux, poro, q):
     # Inflow fluxes are non-negative
     in_flow = np.maximum(flux[is_int], 0)
 
+    nc = g.num_cells
+
     # Find accumulation in each cell.
     # A positive flow is from neigh[0] to neigh[1], so in_flow will
     # add to neigh[1]. Conversely, the accumulation in neigh[0] is
     # the negative of outflow
     accum = np.bincount(np.hstack((int_neigh[1], int_neigh[0])),
-                                            weights=np.hstack((in_flow,
-                                                               -out_flow)))
+                        weights=np.hstack((in_flow, -out_flow)),
+                        minlength=nc)
 
     # To consider flow from sources/boundaries to cells, we only need to
     # consider positive sources
-    np.clip(q, 0, np.inf, out=q)
-
-    # The average TOF for cells with sources are set to twice the time it takes
-    # to fill the cell. Achieve this by adding twice the sources.
-    sources = accum + 2 * q
-
-    nc = g.num_cells
+    q = np.clip(q, 0, np.inf)
 
     # Upstream weighting of fluxes taken out of cells
     A = sps.coo_matrix((-in_flow, (int_neigh[1], int_neigh[0])), shape=(nc,
                                                                         nc)) \
                 + sps.coo_matrix((out_flow, (int_neigh[0], int_neigh[1])),
                                  shape=(nc, nc))
-
-    # Add accumulation in each cell
-    A += sps.dia_matrix((sources, 0), shape=(nc, nc))
-
-    # Pore volume equals porosity times cell volume
-    pv = g.cell_volumes * poro
-
-    tof = spsolve(A, pv)
-    return tof
+    return A, accum, q
@@ -120,63 +120,23 @@ class Upwind(Solver):
         bc_val = param.get_bc_val(self)
 
         has_bc = not(bc is None or bc_val is None)
+        if not has_bc:
+            bc = None
 
-        # Compute the face flux respect to the real direction of the normals
-        indices = g.cell_faces.indices
-        flow_faces = g.cell_faces.copy()
-        flow_faces.data *= discharge[indices]
-
-        # Retrieve the faces boundary and their numeration in the flow_faces
-        # We need to impose no-flow for the inflow faces without boundary
-        # condition
-        mask = np.unique(indices, return_index=True)[1]
-        bc_neu = g.get_boundary_faces()
-
-        if has_bc:
-            # If boundary conditions are imposed remove the faces from this
-            # procedure.
-            bc_dir = np.where(bc.is_dir)[0]
-            bc_neu = np.setdiff1d(bc_neu, bc_dir, assume_unique=True)
-            bc_dir = mask[bc_dir]
-
-            # Remove Dirichlet inflow
-            inflow = flow_faces.copy()
-
-            inflow.data[bc_dir] = inflow.data[bc_dir].clip(max=0)
-            flow_faces.data[bc_dir] = flow_faces.data[bc_dir].clip(min=0)
-
-        # Remove all Neumann
-        bc_neu = mask[bc_neu]
-        flow_faces.data[bc_neu] = 0
+        # The grid dependent part of the discretization is computed once, and
+        # stored in the data dictionary. Only the matrix values are updated
+        # for a new discharge.
+        operator = data.get('upwind_operator', None)
+        if operator is None or not operator.is_valid(g, bc):
+            operator = UpwindOperator(g, bc)
+            data['upwind_operator'] = operator
 
-        # Determine the outflow faces
-        if_faces = flow_faces.copy()
-        if_faces.data = np.sign(if_faces.data)
-
-        # Compute the inflow/outflow related to the cells of the problem
-        flow_faces.data = flow_faces.data.clip(min=0)
-        flow_cells = if_faces.transpose() * flow_faces
-        flow_cells.tocsr()
+        flow_cells = operator.refresh(discharge)
 
         if not has_bc:
             return flow_cells, np.zeros(g.num_cells)
 
-        # Impose the boundary conditions
-        bc_val_dir = np.zeros(g.num_faces)
-        if np.any(bc.is_dir):
-            is_dir = np.where(bc.is_dir)[0]
-            bc_val_dir[is_dir] = bc_val[is_dir]
-
-        # We assume that for Neumann boundary condition a positive 'bc_val'
-        # represents an outflow for the domain. A negative 'bc_val' represents
-        # an inflow for the domain.
-        bc_val_neu = np.zeros(g.num_faces)
-        if np.any(bc.is_neu):
-            is_neu = np.where(bc.is_neu)[0]
-            bc_val_neu[is_neu] = bc_val[is_neu]
-
-        return flow_cells, - inflow.transpose() * bc_val_dir \
-            - np.abs(g.cell_faces.transpose()) * bc_val_neu
+        return flow_cells, operator.rhs(discharge, bc_val)
 
 #------------------------------------------------------------------------------#
 
@@ -281,7 +241,8 @@ class Upwind(Solver):
 
         # Compute the face flux respect to the real direction of the normals
         indices = g.cell_faces.indices
-        flow_faces = g.cell_faces.copy()
+        # Float copy, the signs in cell_faces may be stored as int8
+        flow_faces = g.cell_faces.astype(np.float)
         flow_faces.data *= discharge[indices]
 
         # Retrieve the faces boundary and their numeration in the flow_faces
@@ -330,6 +291,165 @@ class Upwind(Solver):
 
 #------------------------------------------------------------------------------#
 
+class UpwindOperator(object):
+    """
+    Upwind matrix of a grid, prepared for repeated updates of the discharge.
+
+    The sparsity pattern of the upwind matrix (cell to cell connections over
+    faces), and the maps from the entries of g.cell_faces to the matrix
+    entries, only depend on the grid and the boundary conditions. They are
+    computed once, when the operator is constructed. A refresh with a new
+    discharge field then only computes the values of the matrix.
+
+    The discretization is the same as described in Upwind.matrix_rhs().
+
+    Attributes:
+        matrix (sps.csr_matrix): Upwind matrix, updated by refresh().
+
+    Example:
+        op = UpwindOperator(g, bc)
+        for discharge in discharges:
+            U = op.refresh(discharge)
+            rhs = op.rhs(discharge, bc_val)
+
+    """
+
+    def __init__(self, g, bc=None):
+        """
+        Parameters:
+            g: grid, or a subclass.
+            bc (BoundaryCondition, optional): Boundary conditions. If not
+                given, all boundary faces are no-flow.
+
+        """
+        self.g = g
+        self.bc = bc
+        self._is_dir = None if bc is None else bc.is_dir.copy()
+
+        cell_faces = g.cell_faces.tocsc()
+        # Face, cell and orientation of each entry in cell_faces
+        self._faces = cell_faces.indices
+        self._cells = np.repeat(np.arange(g.num_cells),
+                                np.diff(cell_faces.indptr))
+        self._sgn = cell_faces.data
+
+        # Entries of Neumann (no bc, or homogeneous no-flow) and Dirichlet
+        # faces. Only the first entry of a face is considered.
+        mask = np.unique(self._faces, return_index=True)[1]
+        bc_neu = g.get_boundary_faces()
+        if bc is None:
+            self._dir = np.zeros(0, dtype=np.int)
+        else:
+            bc_dir = np.where(bc.is_dir)[0]
+            bc_neu = np.setdiff1d(bc_neu, bc_dir, assume_unique=True)
+            self._dir = mask[bc_dir]
+        self._neu = mask[bc_neu]
+
+        # Pairs of entries in cell_faces that share a face. The first entry
+        # gives the row in the upwind matrix, the second the column.
+        num_entries = self._faces.size
+        face_entries = sps.coo_matrix((np.ones(num_entries),
+                                       (self._faces,
+                                        np.arange(num_entries))),
+                                      shape=(g.num_faces, num_entries)).tocsc()
+        pairs = (face_entries.transpose() * face_entries).tocoo()
+        self._row_entry = pairs.row
+        self._col_entry = pairs.col
+
+        # Position of each pair in the data of the upwind matrix
+        rows = self._cells[pairs.row]
+        cols = self._cells[pairs.col]
+        key, self._pos = np.unique(rows * g.num_cells + cols,
+                                   return_inverse=True)
+        indices = key % g.num_cells
+        indptr = np.hstack((0, np.cumsum(np.bincount(key // g.num_cells,
+                                                     minlength=g.num_cells))))
+        self.matrix = sps.csr_matrix((np.zeros(key.size), indices, indptr),
+                                     shape=(g.num_cells, g.num_cells))
+
+        self._abs_div = np.abs(cell_faces.transpose()).tocsr()
+
+    def is_valid(self, g, bc=None):
+        """ Check if the operator can be used for the given grid and boundary
+        conditions.
+        """
+        if g is not self.g or (bc is None) != (self.bc is None):
+            return False
+        return bc is None or np.array_equal(bc.is_dir, self._is_dir)
+
+    def refresh(self, discharge, in_place=False):
+        """
+        Compute the upwind matrix for a new discharge field.
+
+        Parameters:
+            discharge (np.ndarray, size num_faces): Normal velocity at each
+                face, weighted by the face area.
+            in_place (boolean, optional): If True, the values of self.matrix
+                are overwritten. If False (default), a new matrix is returned,
+                which shares the sparsity pattern with self.matrix, thus
+                matrices from previous refreshes are left untouched.
+
+        Returns:
+            sps.csr_matrix: The upwind matrix.
+
+        """
+        # Face flux with respect to the direction of the normals
+        flux = self._sgn * discharge[self._faces]
+        flux[self._neu] = 0
+        flux[self._dir] = flux[self._dir].clip(min=0)
+
+        # The sign of the flux is taken from the receiving cell, the outflow
+        # from the giving cell
+        vals = np.sign(flux[self._row_entry]) \
+            * flux[self._col_entry].clip(min=0)
+        data = np.bincount(self._pos, weights=vals,
+                           minlength=self.matrix.indices.size)
+
+        if in_place:
+            self.matrix.data[:] = data
+            return self.matrix
+
+        self.matrix = sps.csr_matrix((data, self.matrix.indices,
+                                      self.matrix.indptr),
+                                     shape=self.matrix.shape)
+        return self.matrix
+
+    def rhs(self, discharge, bc_val):
+        """
+        Right hand side from the boundary conditions.
+
+        Parameters:
+            discharge (np.ndarray, size num_faces): Normal velocity at each
+                face, weighted by the face area.
+            bc_val (np.ndarray, size num_faces): Boundary values.
+
+        Returns:
+            np.ndarray, size num_cells: Right hand side.
+
+        """
+        rhs = np.zeros(self.g.num_cells)
+        if self.bc is None:
+            return rhs
+
+        # Inflow over Dirichlet faces
+        inflow = self._sgn[self._dir] * discharge[self._faces[self._dir]]
+        rhs -= np.bincount(self._cells[self._dir],
+                           weights=inflow.clip(max=0) \
+                           * bc_val[self._faces[self._dir]],
+                           minlength=self.g.num_cells)
+
+        # We assume that for Neumann boundary condition a positive 'bc_val'
+        # represents an outflow for the domain. A negative 'bc_val' represents
+        # an inflow for the domain.
+        bc_val_neu = np.zeros(self.g.num_faces)
+        if np.any(self.bc.is_neu):
+            is_neu = np.where(self.bc.is_neu)[0]
+            bc_val_neu[is_neu] = bc_val[is_neu]
+        rhs -= self._abs_div * bc_val_neu
+        return rhs
+
+#------------------------------------------------------------------------------#
+
 class UpwindCoupling(AbstractCoupling):
 
 #------------------------------------------------------------------------------#
@@ -8,8 +8,11 @@ Created on Thu Nov  2 19:08:28 2017
 @author: Eirik Keilegavlen
 """
 import numpy as np
+import scipy.sparse as sps
 import scipy.sparse.linalg as spl
+import hashlib
 import logging
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -43,8 +46,60 @@ class Factory():
     For information on parameters etc, confer the wrapped functions and
     libraries.
 
+    The factory keeps a cache of amg hierarchies and factorizations (lu, ilu),
+    so that a factory object that lives through a time loop or a nonlinear
+    iteration can reuse setup work. Matrices are identified by a fingerprint
+    of their sparsity pattern and of their values:
+        - If both pattern and values are unchanged, the stored hierarchy or
+          factorization is reused.
+        - If only the values have changed, the aggregates of an amg hierarchy
+          are reused, and only the numerical values (smoothed prolongation
+          and Galerkin products) are recomputed. Factorizations are always
+          recomputed in this case.
+    Statistics on hits and misses are available through cache_stats().
+
+    Attributes:
+        max_cache_size (int): Maximum number of cached objects of each kind.
+            When exceeded, the least recently used object is dropped.
+        use_cache (boolean): If False, the cache is bypassed.
+
     """
 
+    def __init__(self, use_cache=True, max_cache_size=5):
+        self.use_cache = use_cache
+        self.max_cache_size = max_cache_size
+        self.clear_cache()
+
+    def clear_cache(self):
+        """ Remove all cached hierarchies and factorizations, and reset the
+        cache statistics.
+        """
+        # One ordered dictionary for each kind of cached object. The keys are
+        # (pattern fingerprint, kind-specific options), the values are tuples
+        # (value fingerprint, cached object).
+        self._cache = {'amg': OrderedDict(), 'lu': OrderedDict(),
+                       'ilu': OrderedDict()}
+        self._stats = {'hits': 0, 'value_updates': 0, 'misses': 0}
+
+    def cache_stats(self):
+        """ Statistics of the solver cache.
+
+        Returns:
+            dictionary with the fields
+                hits (int): Number of calls where a cached object was reused
+                    without modifications.
+                value_updates (int): Number of calls where the sparsity
+                    pattern was recognized, but the values had changed. For
+                    amg, the aggregates were then reused.
+                misses (int): Number of calls where no information could be
+                    reused.
+                size (int): Number of objects currently in the cache.
+
+        """
+        stats = dict(self._stats)
+        stats['size'] = sum([len(c) for c in self._cache.values()])
+        return stats
+
     def ilu(self, A, **kwargs):
         """ Wrapper around ILU function from scipy.sparse.linalg.
         Confer that function for documetnation.
@@ -58,7 +113,8 @@ class Factory():
 
         """
         opts = self.__extract_spilu_args(**kwargs)
-        iA = spl.spilu(A, **opts)
+        A = sps.csc_matrix(A)
+        iA = self.__cached_factorization('ilu', A, opts, spl.spilu)
         iA_x = lambda x: iA.solve(x)
         return spl.LinearOperator(A.shape, iA_x)
 
@@ -76,7 +132,8 @@ class Factory():
 
         """
         opts = self.__extract_splu_args(**kwargs)
-        iA = spl.splu(A, **opts)
+        A = sps.csc_matrix(A)
+        iA = self.__cached_factorization('lu', A, opts, spl.splu)
         return iA.solve
 
 
@@ -84,9 +141,14 @@ class Factory():
         """ Wrapper around spsolve from scipy.sparse.linalg.
         Confer that function for documetnation.
 
+        If the right hand side is a 2d array, each column is treated as a
+        separate right hand side. The matrix is then factorized once (by lu),
+        and the factorization is reused for all columns.
+
         Parameters:
             A: Matrix to be factorized
-            rhs (optional): Right hand side vector. If not provided, a funciton
+            rhs (optional): Right hand side vector, or 2d array with one
+                right hand side per column. If not provided, a funciton
                 to solve with the given A is returned instead.
 
         Returns:
@@ -95,6 +157,8 @@ class Factory():
 
         """
         def solve(b):
+            if b.ndim == 2:
+                return self.lu(A)(np.asarray(b, dtype=np.float))
             return spl.spsolve(A, b)
 
         if rhs is None:
@@ -166,6 +230,10 @@ class Factory():
         If you need other types of solvers or functionality, access pyamg
         directly.
 
+        The hierarchy is cached, see the class documentation. If the matrix
+        has the same sparsity pattern as a cached matrix, but different
+        values, the aggregates of the cached hierarchy are reused.
+
         For documentation of pyamg, including parameters options, confer
         https://github.com/pyamg/pyamg.
 
@@ -195,10 +263,12 @@ class Factory():
         if null_space is None:
             null_space = np.ones(A.shape[0])
         try:
-            ml = pyamg.smoothed_aggregation_solver(A, B=null_space)
+            pyamg
         except NameError:
             raise ImportError('Using amg needs requires the pyamg package. pyamg was not imported')
-        
+
+        A = sps.csr_matrix(A)
+        ml = self.__cached_amg(A, null_space)
 
         def solve(b, res=None, **kwargs):
             if res is None:
@@ -214,6 +284,85 @@ class Factory():
 
     #### Helper functions below
 
+    def __fingerprint(self, A):
+        """ Fingerprints of the sparsity pattern and the values of a matrix.
+
+        The matrix should be in csr or csc format. The pattern fingerprint
+        also includes the format and the shape of the matrix.
+        """
+        if not A.has_sorted_indices:
+            A = A.sorted_indices()
+        pattern = hashlib.sha1(A.indptr.astype(np.int64).tobytes())
+        pattern.update(A.indices.astype(np.int64).tobytes())
+        pattern = (A.format, A.shape, pattern.hexdigest())
+        values = hashlib.sha1(np.ascontiguousarray(A.data).tobytes()).hexdigest()
+        return pattern, values
+
+    def __cache_lookup(self, kind, key, values):
+        """ Find an object in the cache.
+
+        Returns:
+            object: The cached object, None if the pattern is not known.
+            boolean: True if also the values of the matrix are unchanged.
+
+        """
+        cache = self._cache[kind]
+        if not self.use_cache or key not in cache:
+            self._stats['misses'] += 1
+            return None, False
+        # Move to end to mark as most recently used
+        cache.move_to_end(key)
+        cached_values, obj = cache[key]
+        if cached_values == values:
+            self._stats['hits'] += 1
+            return obj, True
+        self._stats['value_updates'] += 1
+        return obj, False
+
+    def __cache_store(self, kind, key, values, obj):
+        if not self.use_cache:
+            return
+        cache = self._cache[kind]
+        cache[key] = (values, obj)
+        cache.move_to_end(key)
+        while len(cache) > self.max_cache_size:
+            cache.popitem(last=False)
+
+    def __cached_factorization(self, kind, A, opts, factorize):
+        pattern, values = self.__fingerprint(A)
+        # Factorizations depend on the options, make them part of the key
+        key = (pattern, tuple(sorted(opts.items())))
+        iA, same_values = self.__cache_lookup(kind, key, values)
+        if not same_values:
+            iA = factorize(A, **opts)
+            self.__cache_store(kind, key, values, iA)
+        return iA
+
+    def __cached_amg(self, A, null_space):
+        pattern, values = self.__fingerprint(A)
+        null_space = np.asarray(null_space, dtype=np.float)
+        # The null space determines the tentative prolongation, and thereby
+        # the whole hierarchy.
+        key = (pattern,
+               hashlib.sha1(np.ascontiguousarray(null_space).tobytes())
+               .hexdigest())
+        ml, same_values = self.__cache_lookup('amg', key, values)
+        if same_values:
+            return ml
+        # keep=True is needed to have access to the aggregates later on.
+        if ml is None:
+            ml = pyamg.smoothed_aggregation_solver(A, B=null_space, keep=True)
+        else:
+            # Same pattern, new values: Reuse the aggregates on all levels,
+            # this skips the strength of connection and aggregation steps.
+            agg = [('predefined', {'AggOp': lvl.AggOp.tocsr()})
+                   for lvl in ml.levels[:-1]]
+            ml = pyamg.smoothed_aggregation_solver(A, B=null_space,
+                                                   aggregate=agg, keep=True,
+                                                   max_levels=len(ml.levels))
+        self.__cache_store('amg', key, values, ml)
+        return ml
+
     def __extract_krylov_args(self, **kwargs):
         d = {}
         d['x0'] = kwargs.get('x0', None)
@@ -235,7 +384,6 @@ class Factory():
         d = {}
         d['permc_spec'] = kwargs.get('permc_spec', None)
         d['diag_pivot_thresh'] = kwargs.get('diag_pivot_thresh', None)
-        d['drop_tol'] = kwargs.get('drop_tol', None)
         d['relax'] = kwargs.get('relax', None)
         d['panel_size'] = kwargs.get('panel_size', None)
         return d
@@ -39,6 +39,9 @@ class StaticModel():
     reassemble(): Assembles the lhs matrix and rhs array.
             Returns: lhs, rhs.
             Sets attributes: self.lhs, self.rhs
+    update(faces, cells): Update the discretization locally around the given
+            faces and cells, e.g. faces that started to slip. A subsequent
+            call to solve(discretize=False) reuses the previous factorization.
     stress_disc(): Defines the discretization of the stress term.
             Returns stress discretization object (E.g., Mpsa)
     grid(): Returns: the Grid or GridBucket
@@ -74,6 +77,13 @@ class StaticModel():
 
         self._stress_disc = self.stress_disc()
 
+        # Linear solver factory, and the last factorization of the system
+        # matrix. After a local update of the discretization, the old
+        # factorization is used as a preconditioner.
+        self._ls_factory = LSFactory()
+        self._factorization = None
+        self._local_update = False
+
         self.displacement_name = 'displacement'
         self.frac_displacement_name = 'frac_displacement'
 
@@ -110,11 +120,10 @@ class StaticModel():
 
         # Solve
         tic = time.time()
-        ls = LSFactory()
+        ls = self._ls_factory
 
         if self.rhs.size <  max_direct:
-            logger.info('Solve linear system using direct solver')
-            self.x = ls.direct(self.lhs,self.rhs)
+            self.x = self._solve_direct()
         else:
             logger.info('Solve linear system using GMRES')
             precond = self._setup_preconditioner()
@@ -136,12 +145,41 @@ class StaticModel():
         """
         return self.solve(**kwargs)
 
+    def update(self, faces=None, cells=None):
+        """ Update the discretization locally.
+
+        The stress discretization is recomputed only in the vicinity of the
+        given faces and cells, see FracturedMpsa.update_fractures(). Use
+        solve(discretize=False) afterwards, this avoids a global
+        re-discretization, and reuses the previous factorization as a
+        preconditioner.
+
+        Parameters:
+            faces (np.array, int, optional): Faces to update around, e.g.
+                FrictionSlipModel.changed_faces.
+            cells (np.array, int, optional): Cells to update around, e.g.
+                cells where the stiffness has changed.
+
+        Returns:
+            np.array (int): Index of the faces where the stress was updated.
+
+        """
+        updated = self._stress_disc.update_fractures(self.grid(), self.data(),
+                                                     faces=faces, cells=cells)
+        if updated.size > 0:
+            self._local_update = True
+        return updated
+
     def reassemble(self, discretize=True):
         """
         reassemble matrices. This must be called between every time step to
         update the rhs of the system.
         """
         self.lhs, self.rhs = self._stress_disc.matrix_rhs(self.grid(), self.data(), discretize)
+        if discretize:
+            # The full system is rediscretized, any old factorization is
+            # outdated.
+            self._local_update = False
         return self.lhs, self.rhs
 
     def stress_disc(self):
@@ -259,6 +297,28 @@ class StaticModel():
             self.exporter.write_vtk(variables, time_step=time_step)
 
     ### Helper functions for linear solve below
+    def _solve_direct(self):
+        ls = self._ls_factory
+        if self._local_update and self._factorization is not None:
+            # The matrix has only been changed locally since the last
+            # factorization. Use the old factorization as a preconditioner,
+            # GMRES should then converge in a few iterations.
+            logger.info('Solve linear system using GMRES, preconditioned by '
+                        'previous factorization')
+            M = spl.LinearOperator(self.lhs.shape, self._factorization)
+            x, info = ls.gmres(self.lhs)(self.rhs, M=M, tol=1e-12,
+                                         maxiter=50, restart=50)
+            if info == 0:
+                return x
+            logger.info('GMRES did not converge, refactorize')
+
+        logger.info('Solve linear system using direct solver')
+        # The factorization is cached by the factory, so repeated solves with
+        # an unchanged matrix only do the triangular solves.
+        self._factorization = ls.lu(self.lhs)
+        self._local_update = False
+        return self._factorization(self.rhs)
+
     def _setup_preconditioner(self):
         solvers, ind, not_ind = self._assign_solvers()
 
@@ -44,6 +44,8 @@ class ParabolicModel():
     initial_condition(): returns the initial condition for global variable
     grid(): returns the grid bucket for the problem
     time_step(): returns time step length
+    set_time_step(dt): change the time step length, used by adaptive solvers
+    cfl(): returns the time step allowed by the CFL condition
     end_time(): returns end time
     save(save_every=1): save solution. Parameter: save_every, save only every
                                                   save_every time steps
@@ -248,6 +250,23 @@ class ParabolicModel():
         'Returns the time step'
         return self._time_step
 
+    def set_time_step(self, dt):
+        'Change the time step, and update the time discretization'
+        self._time_step = dt
+        self._set_data()
+        self._time_disc = self.time_disc()
+
+    def cfl(self):
+        '''Returns the time step allowed by the CFL condition for the advective
+        term. If no discharge is given, there is no restriction.'''
+        if self.is_GridBucket:
+            if not all('discharge' in d for _, d in self.grid()):
+                return np.inf
+            return self.advective_disc().cfl(self.grid())
+        if 'discharge' not in self.data():
+            return np.inf
+        return self.advective_disc().cfl(self.grid(), self.data())
+
     def end_time(self):
         'Returns the end time'
         return self._end_time
@@ -261,6 +280,56 @@ class ParabolicModel():
                                                              if k in self._data}
             self.exporter.write_vtk(variables, time_step=time)
 
+class MultiComponentParabolicModel(ParabolicModel):
+    '''
+    Parabolic model for several components (tracers or species) that are
+    transported by the same discharge field, and share the discretization
+    parameters. The components are advanced together, see
+    time_stepper.MultiComponentImplicit.
+
+    Init:
+    - gb (Grid/GridBucket) Grid or grid bucket for the problem
+    - num_species (int) Number of components
+    - physics (string) Physics key word. See Parameters class for valid physics
+
+    Functions, in addition to those of ParabolicModel:
+    initial_condition(): returns initial condition of size
+                         num_species x num_dof. Defaults to the initial
+                         condition of the data assigner for all components.
+    species_rhs(): returns contributions to the right hand side that differ
+                   between the components, of size num_species x num_dof, or
+                   None (default).
+    split(x_name): store the solution of each grid, as an array of size
+                   num_species x g.num_cells
+    '''
+
+    def __init__(self, gb, num_species, physics='transport', **kwargs):
+        self.num_species = num_species
+        ParabolicModel.__init__(self, gb, physics=physics, **kwargs)
+
+    def solver(self):
+        'Initiate solver'
+        return time_stepper.MultiComponentImplicit(self)
+
+    def initial_condition(self):
+        'Returns initial condition for all components'
+        global_variable = ParabolicModel.initial_condition(self)
+        return np.tile(global_variable, (self.num_species, 1))
+
+    def species_rhs(self):
+        'Right hand side contribution of each component'
+        return None
+
+    def split(self, x_name='solution'):
+        self.x_name = x_name
+        if self.is_GridBucket:
+            for g, d in self.grid():
+                dof = self._time_disc.dof_of_grid(self.grid(), g)
+                d[self.x_name] = self._solver.p[:, dof]
+        else:
+            self._data[self.x_name] = self._solver.p
+
+
 class ParabolicDataAssigner():
     '''
     Base class for assigning valid data to a grid.
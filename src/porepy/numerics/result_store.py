@@ -0,0 +1,236 @@
+"""
+Storage of time step results on disk, with bounded memory usage.
+
+The solutions are buffered in memory, and written in chunks of a fixed number
+of time steps to binary files. Uncompressed chunks are read back as memory
+mapped arrays, compressed chunks are loaded one at a time. The times and the
+layout of the store are kept in a small index file, so that a store can be
+reopened for post processing.
+
+Example:
+    store = ResultStore('results', 'pressure', every=10, compress=True)
+    solver.parameters['store_results'] = store
+    solver.solve()
+
+    # Later, possibly in another process
+    store = ResultStore.open('results', 'pressure')
+    p_last = store[-1]
+    for t, p in store:
+        ...
+
+"""
+import os
+import json
+import numpy as np
+
+
+class ResultStore(object):
+    """
+    Chunked on-disk storage of a sequence of solution vectors.
+
+    Attributes:
+        folder (str): Folder of the files.
+        name (str): Root of the file names.
+        every (int): Only every every-th appended state is stored.
+        chunk_size (int): Number of stored states in each file.
+        compress (boolean): Whether the chunks are compressed.
+
+    """
+
+    def __init__(self, folder, name='results', every=1, chunk_size=100,
+                 compress=False):
+        """
+        Create a new store. Existing files with the same name are overwritten.
+
+        Parameters:
+            folder (str): Folder of the files, created if it does not exist.
+            name (str, optional): Root of the file names. Defaults to
+                'results'.
+            every (int, optional): Decimation, only every every-th state
+                passed to append() is stored. Defaults to 1.
+            chunk_size (int, optional): Number of states in each file, and the
+                maximum number of states kept in memory. Defaults to 100.
+            compress (boolean, optional): Compress the chunks with zlib.
+                Defaults to False.
+
+        """
+        if every < 1 or chunk_size < 1:
+            raise ValueError('every and chunk_size should be positive')
+        self.folder = folder
+        self.name = name
+        self.every = int(every)
+        self.chunk_size = int(chunk_size)
+        self.compress = compress
+
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self._times = []
+        self._shape = None
+        self._dtype = None
+        self._num_appended = 0
+        # States of the current, incomplete chunk, starting at index
+        # self._buffer_start
+        self._buffer = []
+        self._buffer_start = 0
+        self._cache = (None, None)
+
+    @classmethod
+    def open(cls, folder, name='results'):
+        """
+        Open an existing store for reading, or to append more states.
+
+        Parameters:
+            folder (str): Folder of the files.
+            name (str, optional): Root of the file names.
+
+        Returns:
+            ResultStore: The store.
+
+        """
+        with open(os.path.join(folder, name + '_index.json')) as f:
+            meta = json.load(f)
+        store = cls.__new__(cls)
+        store.folder = folder
+        store.name = name
+        store.every = meta['every']
+        store.chunk_size = meta['chunk_size']
+        store.compress = meta['compress']
+        store._times = list(np.load(os.path.join(folder,
+                                                 name + '_times.npy')))
+        store._shape = tuple(meta['shape']) if meta['shape'] else None
+        store._dtype = np.dtype(meta['dtype']) if meta['dtype'] else None
+        store._num_appended = meta['num_appended']
+        store._cache = (None, None)
+
+        # Read the last chunk back to the buffer if it is incomplete
+        num_stored = len(store._times)
+        store._buffer_start = num_stored - num_stored % store.chunk_size
+        store._buffer = []
+        if store._buffer_start < num_stored:
+            chunk = store._buffer_start // store.chunk_size
+            store._buffer = list(np.array(store._load_chunk(chunk)))
+        return store
+
+    def append(self, t, x):
+        """
+        Append the state at a time step. Subject to decimation.
+
+        Parameters:
+            t (double): Time.
+            x (np.ndarray): State. All states should have the same shape.
+
+        """
+        store = self._num_appended % self.every == 0
+        self._num_appended += 1
+        if not store:
+            return
+
+        x = np.asarray(x)
+        if self._shape is None:
+            self._shape = x.shape
+            self._dtype = x.dtype
+        elif x.shape != self._shape:
+            raise ValueError('All states should have shape '
+                             + str(self._shape))
+
+        self._times.append(float(t))
+        self._buffer.append(x.astype(self._dtype, copy=True))
+        if len(self._buffer) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered states and the index to disk.
+
+        An incomplete chunk is written, but kept in memory, so that it can be
+        completed by later calls to append().
+        """
+        if self._buffer:
+            chunk = self._buffer_start // self.chunk_size
+            self._write_chunk(chunk, np.array(self._buffer))
+            if len(self._buffer) == self.chunk_size:
+                self._buffer = []
+                self._buffer_start += self.chunk_size
+            if self._cache[0] == chunk:
+                self._cache = (None, None)
+        self._write_index()
+
+    def close(self):
+        """
+        Write remaining states to disk.
+        """
+        self.flush()
+
+    @property
+    def times(self):
+        """ np.ndarray: Times of the stored states. """
+        return np.array(self._times)
+
+    def __len__(self):
+        return len(self._times)
+
+    def time_index(self, t):
+        """
+        Index of the stored state closest to time t.
+        """
+        return int(np.argmin(np.abs(np.array(self._times) - t)))
+
+    def __getitem__(self, i):
+        """
+        Random access to the stored state with index i.
+        """
+        n = len(self._times)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError('Index out of range')
+        if i >= self._buffer_start:
+            return self._buffer[i - self._buffer_start].copy()
+        chunk = i // self.chunk_size
+        return np.array(self._load_chunk(chunk)[i - chunk * self.chunk_size])
+
+    def __iter__(self):
+        """
+        Streaming reader, yields (time, state) for all stored states. Only one
+        chunk is held in memory at a time.
+        """
+        n = len(self._times)
+        for i in range(n):
+            yield self._times[i], self[i]
+
+    #------------------------------------------------------------------------#
+
+    def _chunk_file(self, chunk):
+        ext = '.npz' if self.compress else '.npy'
+        return os.path.join(self.folder, self.name + '_' + str(chunk) + ext)
+
+    def _write_chunk(self, chunk, states):
+        if self.compress:
+            np.savez_compressed(self._chunk_file(chunk), x=states)
+        else:
+            np.save(self._chunk_file(chunk), states)
+
+    def _load_chunk(self, chunk):
+        if self._cache[0] == chunk:
+            return self._cache[1]
+        if self.compress:
+            with np.load(self._chunk_file(chunk)) as f:
+                states = f['x']
+        else:
+            states = np.load(self._chunk_file(chunk), mmap_mode='r')
+        self._cache = (chunk, states)
+        return states
+
+    def _write_index(self):
+        np.save(os.path.join(self.folder, self.name + '_times.npy'),
+                np.array(self._times))
+        meta = {'every': self.every,
+                'chunk_size': self.chunk_size,
+                'compress': self.compress,
+                'shape': list(self._shape) if self._shape is not None else None,
+                'dtype': self._dtype.str if self._dtype is not None else None,
+                'num_appended': self._num_appended}
+        with open(os.path.join(self.folder, self.name + '_index.json'),
+                  'w') as f:
+            json.dump(meta, f)
@@ -1,8 +1,12 @@
 import numpy as np
+import scipy.sparse as sps
 import logging
 
 from porepy.grids.grid_bucket import GridBucket
 from porepy.numerics.linalg.linsolve import Factory as LSFactory
+from porepy.numerics.fv import fvutils
+from porepy.numerics.result_store import ResultStore
+from porepy.numerics import checkpoint
 
 
 logger = logging.getLogger(__name__)
@@ -14,6 +18,8 @@ class AbstractSolver(object):
     dT/dt + G(T) = 0,
     where G(T) is a space discretization
     """
+    # Time level, relative to the time step, at which the problem is updated
+    _time_level = 1
 
     def __init__(self, problem):
         """
@@ -27,6 +33,13 @@ class AbstractSolver(object):
             problem.time_step()
             problem.end_time()
             problem.initial_pressure()
+
+        Results are stored if self.parameters['store_results'] is True (in
+        memory), or a ResultStore (on disk).
+
+        Checkpoints are written after the time steps if
+        self.parameters['checkpoint'] is a checkpoint.Checkpointer. A run is
+        continued from a checkpoint by restart().
         """
         # Get data
         g = problem.grid()
@@ -43,6 +56,7 @@ class AbstractSolver(object):
         self.data = data
         self.dt = problem.time_step()
         self.T = problem.end_time()
+        self.t_start = 0.0
         self.space_disc = problem.space_disc()
         self.time_disc = problem.time_disc()
         self.p0 = p0
@@ -52,28 +66,231 @@ class AbstractSolver(object):
         self.lhs = []
         self.rhs = []
 
-        self.parameters = {'store_results': False, 'verbose': False}
+        self.parameters = {'store_results': False, 'verbose': False,
+                           'adaptive': False, 'rtol': 1e-3, 'atol': 1e-6,
+                           'dt_min': 0, 'dt_max': np.inf, 'grow': 2.0,
+                           'shrink': 0.2, 'safety': 0.9, 'checkpoint': None}
+        # Use discretization matrices restored from a checkpoint in the next
+        # call to reassemble(), see restart()
+        self._reuse_discretization = False
 
     def solve(self):
         """
         Solve problem.
+
+        If self.parameters['adaptive'] is True, the time step is adapted, see
+        _solve_adaptive().
         """
-        nt = np.ceil(self.T / self.dt).astype(np.int)
+        if self.parameters['adaptive']:
+            return self._solve_adaptive()
+
+        nt = np.ceil((self.T - self.t_start) / self.dt).astype(np.int)
         logger.warning('Time stepping using ' + str(nt) + ' steps')
-        t = self.dt
+        t = self.t_start + self.dt
         counter = 1
         while t < self.T *(1 + 1e-14):
             logger.warning('Step ' + str(counter) + ' out of ' + str(nt))
             counter += 1
             self.update(t)
             self.reassemble()
+            self._reuse_discretization = False
             self.step()
             logger.debug('Maximum value ' + str(self.p.max()) +\
                          ', minimum value ' + str(self.p.min()))
+            self._checkpoint(t)
             t += self.dt
         self.update(t)
+        self._close_store()
+        return self.data
+
+    def _solve_adaptive(self):
+        """
+        Solve problem with adaptive time steps.
+
+        The local error of a step is estimated by comparing the solution with
+        a linear extrapolation of the two previous states,
+            err = dt / (dt + dt_prev) * (p - p_pred),
+        which is the standard estimate for the first order methods. The same
+        estimate is used for BDF2 and Crank-Nicolson, for which it is
+        conservative, since their local error is of higher order. The error
+        is measured relative to atol + rtol * |p|, and steps with an error
+        above one are rejected and retried with a smaller time step. The next
+        time step is scaled by safety / sqrt(err), limited by the factors
+        grow and shrink and by the bounds dt_min and dt_max, all given in
+        self.parameters. The first step uses problem.time_step(), and is
+        always accepted, since there is no history to estimate from. If the
+        problem has a method cfl(), it is used as an upper bound on the time
+        step of explicit methods.
+
+        For the time step to be changed, the problem must have a method
+        set_time_step(dt).
+        """
+        prm = self.parameters
+        cfl = np.inf
+        if self._time_level == 0 and hasattr(self.problem, 'cfl'):
+            cfl = self.problem.cfl()
+
+        self._store_result(self.t_start)
+
+        t = self.t_start
+        dt = min(self.dt, cfl)
+        p_prev = None
+        dt_prev = None
+        num_rejected = 0
+        num_accepted = 0
+        while t < self.T * (1 - 1e-14):
+            dt = min(dt, prm['dt_max'], cfl, self.T - t)
+            self._set_time_step(dt)
+            self.problem.update(t + self._time_level * dt)
+            self.p0 = self.p
+            self._start_step(p_prev, dt_prev)
+            self.reassemble()
+            self._reuse_discretization = False
+            self.step()
+
+            if p_prev is None:
+                err = 0
+            else:
+                p_pred = self.p0 + dt / dt_prev * (self.p0 - p_prev)
+                scale = prm['atol'] + prm['rtol'] * np.abs(self.p)
+                err = dt / (dt + dt_prev) \
+                    * np.max(np.abs(self.p - p_pred) / scale)
+
+            if err > 1 and dt > prm['dt_min']:
+                # Reject the step, and retry with a smaller time step
+                num_rejected += 1
+                factor = max(prm['shrink'], prm['safety'] / np.sqrt(err))
+                logger.info('Reject step at time ' + str(t) + ' with dt '
+                            + str(dt) + ', error ' + str(err))
+                self.p = self.p0
+                dt = max(dt * factor, prm['dt_min'])
+                continue
+
+            num_accepted += 1
+            t += dt
+            logger.info('Accept step to time ' + str(t) + ' with dt '
+                        + str(dt) + ', error ' + str(err))
+            self._store_result(t)
+            self._checkpoint(t)
+            self._accept_step()
+
+            p_prev = self.p0
+            dt_prev = dt
+            if err > 0:
+                factor = min(prm['grow'], max(prm['shrink'],
+                                              prm['safety'] / np.sqrt(err)))
+            else:
+                factor = prm['grow']
+            dt = max(dt * factor, prm['dt_min'])
+
+        logger.warning('Adaptive time stepping used ' + str(num_accepted)
+                       + ' steps, ' + str(num_rejected) + ' rejected')
+        self._close_store()
         return self.data
 
+    def _start_step(self, p_prev, dt_prev):
+        """
+        Prepare a step of the adaptive time stepping. Called before
+        reassemble(), with the state before self.p0 and the time step that
+        led to self.p0. Both are None for the first step.
+        """
+        pass
+
+    def _accept_step(self):
+        """
+        Called when a step of the adaptive time stepping is accepted.
+        """
+        pass
+
+    def _store_result(self, t):
+        """
+        Store the current state, if requested by self.parameters.
+
+        If parameters['store_results'] is a ResultStore, the state is written
+        to the store, otherwise it is appended to data[physics] in memory.
+        """
+        store = self.parameters['store_results']
+        if isinstance(store, ResultStore):
+            store.append(t, self.p)
+        elif store == True:
+            self.data[self.problem.physics].append(self.p)
+            self.data['times'].append(t)
+
+    def _close_store(self):
+        """
+        Write remaining results to a ResultStore, and make it available
+        through the data dictionary.
+        """
+        store = self.parameters['store_results']
+        if isinstance(store, ResultStore):
+            store.flush()
+            self.data[self.problem.physics] = store
+            self.data['times'] = store.times
+
+    def _checkpoint(self, t):
+        """
+        Write a checkpoint of the state at time t, if requested by
+        self.parameters['checkpoint'] and due.
+        """
+        checkpointer = self.parameters['checkpoint']
+        if checkpointer is not None:
+            checkpointer.dump(self._checkpoint_state(), t,
+                              self._checkpoint_data())
+
+    def _checkpoint_state(self):
+        " State needed to continue the time stepping. "
+        return self.p
+
+    def _restore_state(self, x):
+        self.p = x
+        self.p0 = x
+
+    def _checkpoint_data(self):
+        if isinstance(self.g, GridBucket):
+            return self.g
+        return self.data
+
+    def restart(self, file_name):
+        """
+        Continue a run from a checkpoint.
+
+        The state and the time are read from the checkpoint, and the stored
+        discretization matrices are put back into the data. A subsequent call
+        to solve() integrates from the time of the checkpoint to the end
+        time. The first step uses the restored matrices instead of
+        discretizing again, for discretizations on a single grid whose
+        matrix_rhs() takes a discretize argument (Tpfa, Mpfa, Mpsa, Biot).
+        The following steps discretize as in an uninterrupted run.
+
+        Parameters:
+            file_name (str): Name of the checkpoint file.
+        """
+        x, t = checkpoint.load(file_name, self._checkpoint_data())
+        self._restore_state(x)
+        self.t_start = t
+        self._reuse_discretization = True
+        logger.info('Restart from time ' + str(t))
+
+    def _set_time_step(self, dt):
+        """
+        Change the time step, and update the time discretization.
+        """
+        if dt == self.dt:
+            return
+        if not hasattr(self.problem, 'set_time_step'):
+            raise ValueError('Problem does not support change of time step')
+        self.dt = dt
+        self.problem.set_time_step(dt)
+        self.time_disc = self.problem.time_disc()
+        self.reset()
+
+    def reset(self):
+        """
+        Discard discretizations stored by the solver. Called when the time
+        step is changed.
+        """
+        pass
+
     def step(self):
         """
         Take one time step
@@ -89,9 +306,7 @@ class AbstractSolver(object):
         self.problem.update(t)
         self.p0 = self.p
         # Store result
-        if self.parameters['store_results'] == True:
-            self.data[self.problem.physics].append(self.p)
-            self.data['times'].append(t - self.dt)
+        self._store_result(t - self.dt)
 
     def reassemble(self):
         """
@@ -113,13 +328,28 @@ class AbstractSolver(object):
         else:
             if not isinstance(discs, tuple):
                 discs = [discs]
-            lhs, rhs = discs[0].matrix_rhs(self.g, self.data)
+            lhs, rhs = self._matrix_rhs(discs[0])
             for disc in discs[1:]:
-                lhs_n, rhs_n = disc.matrix_rhs(self.g, self.data)
+                lhs_n, rhs_n = self._matrix_rhs(disc)
                 lhs += lhs_n
                 rhs += rhs_n
         return lhs, rhs
 
+    def _matrix_rhs(self, disc):
+        """
+        Assemble a discretization on a single grid. After a restart, the
+        discretization matrices restored from the checkpoint are used if the
+        discretization supports it, see restart().
+        """
+        if getattr(self, '_reuse_discretization', False) \
+                and _takes_discretize(disc):
+            try:
+                return disc.matrix_rhs(self.g, self.data, discretize=False)
+            except KeyError:
+                # The matrices were not stored in the checkpoint
+                pass
+        return disc.matrix_rhs(self.g, self.data)
+
 
 class Implicit(AbstractSolver):
     """
@@ -138,16 +368,160 @@ class Implicit(AbstractSolver):
         self.rhs = lhs_time * self.p0 + rhs_flux + rhs_time
 
 
+class FlowOrderedImplicit(Implicit):
+    """
+    Implicit time discretization:
+    (y_k+1 - y_k) / dt = F^k+1
+    where the linear system is solved by substitution in flow order, see
+    fvutils.flow_ordered_solve().
+
+    For advective transport discretized by upwinding, also on a GridBucket
+    with UpwindCoupling, the system matrix is block triangular when the cells
+    are sorted along the discharge. The system is then solved cell by cell,
+    with cycles in the discharge field treated as small local systems, and no
+    global linear solve is needed. The time step is not limited by the CFL
+    condition, and the cost of a step is comparable to an explicit step.
+    If diffusion is included, the matrix is treated as one large block, which
+    is equivalent to a direct solve.
+
+    The cell ordering is only recomputed when the sparsity pattern of the
+    system matrix changes.
+    """
+
+    def __init__(self, problem):
+        Implicit.__init__(self, problem)
+        self._ordering = None
+        self._pattern = None
+
+    def step(self):
+        """
+        Take one time step
+        """
+        lhs = sps.csr_matrix(self.lhs, copy=True)
+        lhs.eliminate_zeros()
+        lhs.sort_indices()
+        if self._pattern is None \
+                or not np.array_equal(self._pattern[0], lhs.indptr) \
+                or not np.array_equal(self._pattern[1], lhs.indices):
+            self._ordering = fvutils.flow_ordering(lhs)
+            self._pattern = (lhs.indptr, lhs.indices)
+        self.p = fvutils.flow_ordered_solve(lhs, self.rhs, self._ordering)
+        return self.p
+
+
+class MultiComponentImplicit(Implicit):
+    """
+    Implicit time discretization for several components (e.g. tracers or
+    species) that are transported with the same discretization:
+    (y_k+1 - y_k) / dt = F^k+1
+
+    The state self.p is an array of size num_species x num_dof. The space and
+    time discretizations are assembled in the first call to reassemble(), and
+    the system matrix is factorized once. All components are then advanced
+    together, by sparse matrix-matrix products and a single solve with the
+    factorization for each time step.
+
+    Contributions to the right hand side that differ between the components
+    are given by problem.species_rhs(), as an array of size
+    num_species x num_dof, or None. The discretization is assumed to be
+    constant in time, call reset() to reassemble it, e.g. after a change in
+    the discharge field.
+    """
+
+    def __init__(self, problem):
+        Implicit.__init__(self, problem)
+        self.num_species = self.p0.shape[0]
+        self._ls = LSFactory()
+        self._solve = None
+
+    def reset(self):
+        """
+        Force reassembly and factorization of the discretization in the next
+        time step.
+        """
+        self._solve = None
+
+    def _operators(self, lhs_time, lhs_flux):
+        " Matrices acting on the new and the previous state, respectively. "
+        return lhs_time + lhs_flux, lhs_time
+
+    def reassemble(self):
+        if self._solve is None:
+            lhs_flux, rhs_flux = self._discretize(self.space_disc)
+            lhs_time, rhs_time = self._discretize(self.time_disc)
+            self.lhs, self._lhs_prev = self._operators(lhs_time, lhs_flux)
+            self._rhs_common = rhs_flux + rhs_time
+            self._solve = self._ls.lu(self.lhs)
+
+        # One column per component
+        self.rhs = self._lhs_prev * self.p0.T \
+            + self._rhs_common[:, np.newaxis]
+        species_rhs = getattr(self.problem, 'species_rhs', None)
+        if species_rhs is not None:
+            species_rhs = species_rhs()
+        if species_rhs is not None:
+            self.rhs += species_rhs.T
+
+    def step(self):
+        """
+        Take one time step
+        """
+        self.p = self._solve(self.rhs).T
+        return self.p
+
+
+class MultiComponentExplicit(MultiComponentImplicit):
+    """
+    Explicit time discretization for several components transported with the
+    same discretization:
+    (y_k - y_k-1)/dt = F^k
+    See MultiComponentImplicit for a description.
+    """
+    _time_level = 0
+
+    def __init__(self, problem):
+        MultiComponentImplicit.__init__(self, problem)
+
+    def solve(self):
+        """
+        Solve problem.
+        """
+        return Explicit.solve(self)
+
+    def _operators(self, lhs_time, lhs_flux):
+        return lhs_time, lhs_time - lhs_flux
+
+
 class BDF2(AbstractSolver):
     """
     Second order implicit time discretization:
     (y_k+2 - 4/3 * y_k+1 + 1/3 * y_k) / dt = 2/3 * F^k+2
+
+    With adaptive time steps, the variable step formula is used, with
+    w = dt_k+2 / dt_k+1:
+    (y_k+2 - (1+w)^2/(1+2w) * y_k+1 + w^2/(1+2w) * y_k) / dt_k+2
+        = (1+w)/(1+2w) * F^k+2
+    The first step is implicit Euler.
     """
 
     def __init__(self, problem):
         self.flag_first = True
         AbstractSolver.__init__(self, problem)
         self.p_1 = self.p0
+        self.dt_prev = self.dt
+
+    def _start_step(self, p_prev, dt_prev):
+        self.flag_first = p_prev is None
+        self.p_1 = p_prev
+        self.dt_prev = dt_prev
+
+    def _checkpoint_state(self):
+        " The current and the previous state. "
+        return np.array([self.p, self.p0])
+
+    def _restore_state(self, x):
+        self.p = x[0]
+        self.p0 = x[1]
 
     def update(self, t):
         """
@@ -169,9 +543,14 @@ class BDF2(AbstractSolver):
             self.lhs = lhs_time + lhs_flux
             self.rhs = lhs_time * self.p0 + rhs_flux + rhs_time
         else:
-            self.lhs = lhs_time + 2. / 3 * lhs_flux
-            bdf2_rhs = 4. / 3 * lhs_time * self.p0 - 1. / 3 * lhs_time * self.p_1
-            self.rhs = bdf2_rhs + 2. / 3 * rhs_flux + rhs_time
+            # Ratio of the time step to the previous one. The coefficients
+            # are 2/3, 4/3 and 1/3 for constant time steps.
+            w = self.dt / self.dt_prev
+            c_flux = (1 + w) / (1 + 2 * w)
+            self.lhs = lhs_time + c_flux * lhs_flux
+            bdf2_rhs = (1 + w)**2 / (1 + 2 * w) * lhs_time * self.p0 \
+                - w**2 / (1 + 2 * w) * lhs_time * self.p_1
+            self.rhs = bdf2_rhs + c_flux * rhs_flux + rhs_time
 
 
 class Explicit(AbstractSolver):
@@ -179,6 +558,7 @@ class Explicit(AbstractSolver):
     Explicit time discretization:
     (y_k - y_k-1)/dt = F^k
     """
+    _time_level = 0
 
     def __init__(self, problem):
         AbstractSolver.__init__(self, problem)
@@ -187,15 +567,21 @@ class Explicit(AbstractSolver):
         """
         Solve problem.
         """
-        t = 0.0
+        if self.parameters['adaptive']:
+            return self._solve_adaptive()
+
+        t = self.t_start
         while t < self.T - self.dt + 1e-14:
             if self.parameters['verbose']:
                 print('solving time step: ', t)
             self.update(t)
             self.reassemble()
+            self._reuse_discretization = False
             self.step()
             t += self.dt
+            self._checkpoint(t)
 
+        self._close_store()
         return self.data
 
     def reassemble(self):
@@ -228,6 +614,13 @@ class CrankNicolson(AbstractSolver):
         update parameters for next time step
         """
         AbstractSolver.update(self, t)
+        self._accept_step()
+
+    def _accept_step(self):
+        """
+        The discretization at the end of the step is used for the start of
+        the next one.
+        """
         self.lhs_flux_0 = self.lhs_flux
         self.rhs_flux_0 = self.rhs_flux
         self.lhs_time_0 = self.lhs_time
@@ -242,3 +635,10 @@ class CrankNicolson(AbstractSolver):
         self.lhs = self.lhs_time + 0.5 * self.lhs_flux
         self.rhs = (self.lhs_time - 0.5 * self.lhs_flux_0) * \
             self.p0 + rhs1 + rhs0
+
+
+def _takes_discretize(disc):
+    " Whether disc.matrix_rhs() has a discretize argument. "
+    code = getattr(disc.matrix_rhs, '__code__', None)
+    return code is not None \
+        and 'discretize' in code.co_varnames[:code.co_argcount]
@@ -1470,12 +1470,11 @@ def is_planar(pts, normal=None, tol=1e-5):
     else:
         normal = normal.flatten() / np.linalg.norm(normal)
 
-    check_all = np.zeros(pts.shape[1]-1, dtype=np.bool)
-
-    for idx, p in enumerate(pts[:, 1:].T):
-        den = np.linalg.norm(pts[:, 0] - p)
-        dotprod = np.dot(normal, (pts[:, 0] - p)/(den if den else 1))
-        check_all[idx] = np.isclose(dotprod, 0, atol=tol, rtol=0)
+    diff = pts[:, 0].reshape((-1, 1)) - pts[:, 1:]
+    den = np.linalg.norm(diff, axis=0)
+    den[den == 0] = 1
+    dotprod = np.dot(normal, diff / den)
+    check_all = np.isclose(dotprod, 0, atol=tol, rtol=0)
 
     return np.all(check_all)
 
@@ -1,4 +1,5 @@
 from __future__ import division, print_function
+import multiprocessing
 import numpy as np
 import scipy.sparse as sps
 import scipy.optimize as opt
@@ -110,33 +111,86 @@ def half_space_pt(n, x0, pts, recompute=True):
 
 #------------------------------------------------------------------------------#
 
-def star_shape_cell_centers(g):
+def star_shape_cell_centers(g, cell_centers=None, num_proc=1):
+    """
+    Find points with respect to which the cells are star shaped.
+
+    A cell is star shaped with respect to the points in the intersection of
+    the half spaces of its faces. The given cell centers are first tested,
+    for all cells at once, and kept if they lie in the interior of the
+    intersection. For the remaining cells an interior point is found by a
+    linear program, see half_space_pt().
+
+    Parameters:
+        g (grid): Grid, with geometry fields computed.
+        cell_centers (np.ndarray, 3 x num_cells, optional): Candidate
+            points. Defaults to g.cell_centers.
+        num_proc (int, optional): Number of processes used to solve the
+            linear programs. Defaults to 1.
+
+    Returns:
+        np.ndarray, 3 x num_cells: The points. If no point is found for a
+            cell, the column is nan.
+
+    """
+    if cell_centers is None:
+        cell_centers = g.cell_centers
 
     if g.dim < 2:
-        return g.cell_centers
+        return cell_centers
 
-    faces, _, sgn = sps.find(g.cell_faces)
+    faces, cells, sgn = sps.find(g.cell_faces)
     nodes, _, _ = sps.find(g.face_nodes)
 
+    # Outward unit normals, and a point on the plane of each face of each
+    # cell
+    loc_n = g.face_nodes.indptr[faces]
+    normal = sgn * g.face_normals[:, faces] / g.face_areas[faces]
+    x0, x1 = g.nodes[:, nodes[loc_n]], g.nodes[:, nodes[loc_n + 1]]
+
+    # The candidate of a cell should lie strictly inside the half spaces of
+    # all its faces
+    dist = np.sum((cell_centers[:, cells] - (x0 + x1) / 2.) * normal, axis=0)
+    is_star = np.bincount(cells, weights=dist >= 0,
+                          minlength=g.num_cells) == 0
+    cell_centers = cell_centers.copy()
+
     xn = g.nodes
     if g.dim == 2:
         R = cg.project_plane_matrix(xn)
         xn = np.dot(R, xn)
 
-    cell_centers = np.zeros((3, g.num_cells))
-    for c in np.arange(g.num_cells):
+    # Linear programs for the remaining cells
+    other = np.where(~is_star)[0]
+    problems = []
+    for c in other:
         loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-        faces_loc = faces[loc]
-        loc_n = g.face_nodes.indptr[faces_loc]
-        normal = np.multiply(sgn[loc], np.divide(g.face_normals[:, faces_loc],
-                                                 g.face_areas[faces_loc]))
-
-        x0, x1 = xn[:, nodes[loc_n]], xn[:, nodes[loc_n + 1]]
+        x0, x1 = xn[:, nodes[loc_n[loc]]], xn[:, nodes[loc_n[loc] + 1]]
         coords = np.concatenate((x0, x1), axis=1)
-        cell_centers[:, c] = half_space_pt(normal, (x1 + x0)/2., coords)
+        problems.append((normal[:, loc], (x1 + x0)/2., coords))
+
+    if num_proc > 1 and len(problems) > 1:
+        pool = multiprocessing.Pool(num_proc)
+        try:
+            pts = pool.map(_half_space_pt_worker, problems)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        pts = [half_space_pt(*p) for p in problems]
 
-    if g.dim == 2:
-        cell_centers = np.dot(R.T, cell_centers)
+    if other.size > 0:
+        pts = np.array(pts).T
+        if g.dim == 2:
+            pts = np.dot(R.T, pts)
+        cell_centers[:, other] = pts
 
     return cell_centers
+
+#------------------------------------------------------------------------------#
+
+def _half_space_pt_worker(args):
+    """ Unpack the arguments of half_space_pt, for use with Pool.map. """
+    return half_space_pt(*args)
+
 #------------------------------------------------------------------------------#
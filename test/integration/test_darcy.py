@@ -107,6 +107,53 @@ class BasicsTest(unittest.TestCase):
                 assert np.allclose(d['pressure'], p_ref)
         return gb
 
+#------------------------------------------------------------------------------#
+
+    def test_scenarios_mono_grid(self):
+        """
+        Solve for several boundary value and source scenarios at once, compare
+        with separate solves.
+        """
+        g = CartGrid([5, 5])
+        g.compute_geometry()
+        bound_faces = g.get_boundary_faces()
+        param = Parameters(g)
+        param.set_bc('flow', bc.BoundaryCondition(g, bound_faces,
+                                                  ['dir'] * bound_faces.size))
+        problem = elliptic.EllipticModel(g, {'param': param})
+
+        num_scen = 3
+        bc_vals = np.random.rand(g.num_faces, num_scen)
+        sources = np.random.rand(g.num_cells, num_scen)
+        p = problem.solve_scenarios(bc_vals, sources)
+        assert p.shape == (g.num_cells, num_scen)
+
+        for i in range(num_scen):
+            param.set_bc_val('flow', bc_vals[:, i])
+            param.set_source('flow', sources[:, i])
+            assert np.allclose(p[:, i], problem.solve())
+
+    def test_scenarios_grid_bucket(self):
+        gb = setup_3d(np.array([4, 4, 4]), simplex_grid=False)
+        problem = elliptic.EllipticModel(gb)
+        g_3d = gb.grids_of_dimension(3)[0]
+
+        # Scale the boundary values, keep the source terms
+        bc_val = gb.node_props(g_3d)['param'].get_bc_val('flow')
+        scale = np.array([1, 0, 2])
+        p = problem.solve_scenarios({g_3d: np.outer(bc_val, scale)})
+        problem.split('pressure')
+
+        p_ref = problem.solve()
+        assert np.allclose(p[:, 0], p_ref)
+        for g, d in gb:
+            assert d['pressure'].shape == (g.num_cells, scale.size)
+        assert np.allclose(gb.node_props(g_3d)['pressure'][:, 0],
+                           elliptic_dirich_neumann_source_sink_cart_ref_3d())
+
+        # Linearity in the boundary values
+        assert np.allclose(p[:, 2] - p[:, 1], 2 * (p[:, 0] - p[:, 1]))
+
 
 def setup_3d(nx, simplex_grid=False):
     f1 = np.array(
@@ -7,6 +7,7 @@ from porepy.params.tensor import SecondOrder as PermTensor
 from porepy.params.tensor import FourthOrder as StiffnessTensor
 from porepy.grids.structured import CartGrid
 from porepy.params import bc
+from porepy.params.data import Parameters
 
 
 class TestPartialMPFA(unittest.TestCase):
@@ -118,6 +119,41 @@ class TestPartialMPFA(unittest.TestCase):
         assert (bound_flux - bound_flux_full).max() < 1e-8
         assert (bound_flux - bound_flux_full).min() > -1e-8
 
+    def test_update_permeability_in_place(self):
+        # Change the permeability in a single cell, update the stored
+        # discretization, and compare with a full discretization.
+        g = CartGrid([5, 5])
+        g.compute_geometry()
+        np.random.seed(42)
+        kxx = 1 + np.random.random(g.num_cells)
+        bound_faces = g.get_boundary_faces()
+        bnd = bc.BoundaryCondition(g, bound_faces, ['dir'] * bound_faces.size)
+
+        param = Parameters(g)
+        param.set_tensor('flow', PermTensor(g.dim, kxx))
+        param.set_bc('flow', bnd)
+        data = {'param': param}
+        discr = mpfa.Mpfa()
+        discr.discretize(g, data)
+
+        cell = 12
+        kxx[cell] = 10
+        param.set_tensor('flow', PermTensor(g.dim, kxx))
+        updated = discr.update(g, data, cells=np.array([cell]))
+
+        # The faces that share a vertex with the cell should be updated
+        cn = g.cell_nodes()
+        nodes = cn.indices[cn.indptr[cell]:cn.indptr[cell + 1]]
+        known = np.unique(sps.find(g.face_nodes[nodes])[1])
+        assert np.all(np.sort(updated) == known)
+
+        data_full = {'param': param}
+        discr.discretize(g, data_full)
+        diff_flux = data['flux'] - data_full['flux']
+        diff_bound = data['bound_flux'] - data_full['bound_flux']
+        assert np.allclose(diff_flux.A, 0)
+        assert np.allclose(diff_bound.A, 0)
+
     if __name__ == '__main__':
         unittest.main()
 
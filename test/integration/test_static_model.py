@@ -4,7 +4,7 @@ import unittest
 from porepy.numerics.mechanics import StaticModel
 from porepy.fracs import meshing
 from porepy.params.data import Parameters
-from porepy.params import bc
+from porepy.params import bc, tensor
 from porepy.grids.grid import FaceTag
 
 
@@ -77,4 +77,39 @@ class BasicsTest(unittest.TestCase):
         u_right = data['d_f'][:, int(round(data['d_f'].shape[1]/2)):]
         assert np.all(np.abs(u_left - u_right - 1) < 1e-10)
 
+    def test_local_update(self):
+        """
+        Change the stiffness next to the fracture, update the discretization
+        locally and compare with a full discretization.
+        """
+        f = np.array([[0,0,1], [0,2,1],[2,2,1], [2,0,1]]).T
+        g = meshing.cart_grid([f], [2, 2, 2]).grids_of_dimension(3)[0]
+
+        def setup_data(mu):
+            data = {'param': Parameters(g)}
+            bound = bc.BoundaryCondition(g, g.get_boundary_faces(), 'dir')
+            data['param'].set_bc('mechanics', bound)
+            data['param'].set_slip_distance(np.ones(g.dim * g.num_faces))
+            data['param'].set_tensor('mechanics', tensor.FourthOrder(
+                g.dim, mu, np.ones(g.num_cells)))
+            return data
+
+        mu = np.ones(g.num_cells)
+        data = setup_data(mu)
+        solver = StaticModel(g, data)
+        solver.solve()
+
+        # Soften the cell on one side of a fracture face
+        cell = np.argwhere(g.cell_faces[g.frac_pairs[0, 0]])[0, 1]
+        mu[cell] = 0.1
+        data['param'].set_tensor('mechanics', tensor.FourthOrder(
+            g.dim, mu, np.ones(g.num_cells)))
+        updated = solver.update(cells=np.array([cell]))
+        assert updated.size > 0
+        d = solver.solve(discretize=False)
+
+        data_full = setup_data(mu)
+        d_full = StaticModel(g, data_full).solve()
 
+        assert np.allclose((data['stress'] - data_full['stress']).A, 0)
+        assert np.allclose(d, d_full)
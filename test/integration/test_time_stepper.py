@@ -1,12 +1,22 @@
 import unittest
+import tempfile
+import shutil
 import numpy as np
 
 from porepy.numerics.parabolic import ParabolicModel, ParabolicDataAssigner
+from porepy.numerics.parabolic import MultiComponentParabolicModel
 from porepy.numerics.time_stepper import Implicit, Explicit, BDF2
-from porepy.numerics.time_stepper import CrankNicolson
+from porepy.numerics.time_stepper import CrankNicolson, FlowOrderedImplicit
+from porepy.numerics.time_stepper import MultiComponentExplicit
+from porepy.numerics.result_store import ResultStore
+from porepy.numerics.checkpoint import Checkpointer
+from porepy.numerics import elliptic
+from porepy.numerics.fv import fvutils
 from porepy.grids import structured
+from porepy.grids.grid import FaceTag
 from porepy.fracs import meshing
-from porepy.params import tensor
+from porepy.params import tensor, bc
+from porepy.params.data import Parameters
 
 
 class TestBase(unittest.TestCase):
@@ -35,6 +45,62 @@ class TestBase(unittest.TestCase):
         assert np.sum(np.abs(solver.p) > 1e-6) == 1
         assert np.sum(np.abs(solver.p - 1) < 1e-6) == 1
 
+    def test_store_results_on_disk(self):
+        '''Results written to a ResultStore should equal those stored in
+        memory'''
+        problem = UnitSquareInjectionTwoSteps(self.gb)
+        problem.update(0.0)
+        solver = Implicit(problem)
+        solver.parameters['store_results'] = True
+        solver.solve()
+        in_memory = list(solver.data['transport'])
+        times = list(solver.data['times'])
+
+        folder = tempfile.mkdtemp()
+        try:
+            problem = UnitSquareInjectionTwoSteps(self.gb)
+            problem.update(0.0)
+            solver = Implicit(problem)
+            solver.parameters['store_results'] = ResultStore(folder,
+                                                             chunk_size=2)
+            solver.solve()
+            store = ResultStore.open(folder)
+            assert np.allclose(store.times, times)
+            for x, (_, y) in zip(in_memory, store):
+                assert np.allclose(x, y)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_checkpoint_restart(self):
+        '''A run restarted from a checkpoint should end in the same state as
+        an uninterrupted run'''
+        for g, d in self.gb:
+            d['transport_data'] = InjectionData(g, d)
+        solve_elliptic_problem(self.gb)
+
+        folder = tempfile.mkdtemp()
+        file_name = folder + '/checkpoint.npz'
+        try:
+            for method in [Implicit, Explicit, BDF2]:
+                problem = AdvectiveInjection(self.gb)
+                solver = method(problem)
+                # Three steps of four, the last step is not checkpointed
+                solver.parameters['checkpoint'] = Checkpointer(file_name,
+                                                               every=3,
+                                                               signals=[])
+                solver.solve()
+                assert solver.parameters['checkpoint'].num_dumps == 1
+                p_full = solver.p
+
+                problem = AdvectiveInjection(self.gb)
+                solver = method(problem)
+                solver.restart(file_name)
+                assert np.isclose(solver.t_start, 0.75)
+                solver.solve()
+                assert np.allclose(solver.p, p_full)
+        finally:
+            shutil.rmtree(folder)
+
     def test_BDF2_solver(self):
         '''Inject 1 in cell 0. Test that rhs and pressure solution
         is correct'''
@@ -86,6 +152,127 @@ class TestBase(unittest.TestCase):
         assert np.sum(np.abs(solver.p) > 1e-6) == 1
         assert np.sum(np.abs(solver.p - 0.5) < 1e-6) == 1
 
+    def test_flow_ordered_implicit_solver(self):
+        '''Advection of an injected tracer. The flow ordered solver should
+        give the same solution as a direct solve'''
+        for g, d in self.gb:
+            d['transport_data'] = InjectionData(g, d)
+        solve_elliptic_problem(self.gb)
+
+        problem = AdvectiveInjection(self.gb)
+        solver = Implicit(problem)
+        solver.solve()
+        p_direct = solver.p
+
+        problem = AdvectiveInjection(self.gb)
+        solver = FlowOrderedImplicit(problem)
+        solver.solve()
+        assert np.allclose(solver.p, p_direct)
+        assert solver.p.max() > 1e-3
+
+    def test_multi_component_solvers(self):
+        '''Advection of three components, with initial conditions 0, c and 2c.
+        The first component should equal the single component solution, and
+        the solution should be linear in the initial condition'''
+        for g, d in self.gb:
+            d['transport_data'] = InjectionData(g, d)
+        solve_elliptic_problem(self.gb)
+
+        for single, multi in [(Implicit, None),
+                              (Explicit, MultiComponentExplicit)]:
+            problem = AdvectiveInjection(self.gb)
+            solver = single(problem)
+            solver.solve()
+            p_single = solver.p
+
+            problem = MultiComponentAdvectiveInjection(self.gb)
+            if multi is None:
+                solver = problem._solver
+            else:
+                solver = multi(problem)
+            solver.solve()
+            assert solver.p.shape == (3, p_single.size)
+            assert np.allclose(solver.p[0], p_single)
+            assert np.allclose(solver.p[2] - 2 * solver.p[1] + solver.p[0], 0)
+            assert not np.allclose(solver.p[1], solver.p[0])
+
+        problem.split('T')
+        for g, d in self.gb:
+            assert d['T'].shape == (3, g.num_cells)
+
+    def test_adaptive_implicit_solver(self):
+        '''Adaptive time steps for an advective problem. The times should
+        cover the interval, and the solution should be close to a solution
+        with small fixed time steps'''
+        for g, d in self.gb:
+            d['transport_data'] = InjectionData(g, d)
+        solve_elliptic_problem(self.gb)
+
+        problem = AdvectiveInjection(self.gb, time_step=1./64)
+        solver = Implicit(problem)
+        solver.solve()
+        p_fine = solver.p
+
+        problem = AdvectiveInjection(self.gb, time_step=0.01)
+        solver = Implicit(problem)
+        solver.parameters['adaptive'] = True
+        solver.parameters['store_results'] = True
+        solver.parameters['rtol'] = 1e-2
+        solver.solve()
+
+        times = np.array(solver.data['times'])
+        assert np.isclose(times[-1], 1)
+        assert np.all(np.diff(times) > 0)
+        assert len(solver.data['transport']) == times.size
+        # The step size should have grown
+        assert np.diff(times).max() > 0.01
+        assert np.allclose(solver.p, p_fine, atol=1e-2 * np.abs(p_fine).max())
+
+    def test_adaptive_second_order_solvers(self):
+        '''Adaptive time steps for BDF2 and Crank-Nicolson. The solution
+        should be close to a solution with small fixed time steps'''
+        for g, d in self.gb:
+            d['transport_data'] = InjectionData(g, d)
+        solve_elliptic_problem(self.gb)
+
+        for solver_class in [BDF2, CrankNicolson]:
+            problem = AdvectiveInjection(self.gb, time_step=1./64)
+            solver = solver_class(problem)
+            solver.solve()
+            p_fine = solver.p
+
+            problem = AdvectiveInjection(self.gb, time_step=0.01)
+            solver = solver_class(problem)
+            solver.parameters['adaptive'] = True
+            solver.parameters['store_results'] = True
+            solver.parameters['rtol'] = 1e-2
+            solver.solve()
+
+            times = np.array(solver.data['times'])
+            assert np.isclose(times[-1], 1)
+            assert np.all(np.diff(times) > 0)
+            assert np.diff(times).max() > 0.01
+            assert np.allclose(solver.p, p_fine,
+                               atol=1e-2 * np.abs(p_fine).max())
+
+    def test_adaptive_explicit_cfl(self):
+        '''The time steps of an explicit solver are bounded by the CFL
+        condition'''
+        for g, d in self.gb:
+            d['transport_data'] = InjectionData(g, d)
+        solve_elliptic_problem(self.gb)
+
+        problem = AdvectiveInjection(self.gb, time_step=1)
+        solver = Explicit(problem)
+        solver.parameters['adaptive'] = True
+        solver.parameters['store_results'] = True
+        solver.solve()
+
+        times = np.array(solver.data['times'])
+        assert np.isclose(times[-1], 1)
+        assert np.all(np.diff(times) <= problem.cfl() * (1 + 1e-10))
+        assert np.all(np.isfinite(solver.p))
+
 
 ###############################################################################
 
@@ -115,3 +302,55 @@ class UnitSquareInjectionTwoSteps(UnitSquareInjectionMultiDim):
 
     def time_step(self):
         return 0.5
+
+
+###############################################################################
+class AdvectiveInjection(ParabolicModel):
+    def __init__(self, gb, time_step=0.25):
+        ParabolicModel.__init__(self, gb, time_step=time_step, end_time=1.0)
+
+    def space_disc(self):
+        return self.source_disc(), self.advective_disc()
+
+
+class MultiComponentAdvectiveInjection(MultiComponentParabolicModel):
+    def __init__(self, gb):
+        MultiComponentParabolicModel.__init__(self, gb, 3, time_step=0.25,
+                                              end_time=1.0)
+
+    def space_disc(self):
+        return self.source_disc(), self.advective_disc()
+
+    def initial_condition(self):
+        c = np.linspace(0, 1, self.grid().num_cells())
+        return np.vstack((0 * c, c, 2 * c))
+
+
+class InjectionData(ParabolicDataAssigner):
+    def source(self, t):
+        return injection(self.grid())
+
+
+def injection(g):
+    value = np.zeros(g.num_cells)
+    if g.dim == 3:
+        value[0] = 1.0
+    return value
+
+
+def solve_elliptic_problem(gb):
+    for g, d in gb:
+        d['param'].set_source('flow', injection(g))
+        dir_bound = np.argwhere(g.has_face_tag(FaceTag.DOMAIN_BOUNDARY))
+        bc_cond = bc.BoundaryCondition(
+            g, dir_bound, ['dir'] * dir_bound.size)
+        d['param'].set_bc('flow', bc_cond)
+
+    gb.add_edge_prop('param')
+    for e, d in gb.edges_props():
+        g_h = gb.sorted_nodes_of_edge(e)[1]
+        d['param'] = Parameters(g_h)
+    flux = elliptic.EllipticModel(gb)
+    flux.solve()
+    flux.split('pressure')
+    fvutils.compute_discharges(gb)
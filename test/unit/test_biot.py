@@ -6,6 +6,7 @@ import unittest
 from porepy.numerics.fv import mpfa, mpsa, fvutils, biot
 from porepy.params import tensor, bc
 from porepy.params.data import Parameters
+from porepy.grids import structured
 from test.integration import setup_grids_mpfa_mpsa_tests as setup_grids
 
 
@@ -77,6 +78,46 @@ class BiotTest(unittest.TestCase):
 #            assert np.isclose(sol[:sz_mech], 
 #                              const_bound_val_mech * np.ones(sz_mech)).all()
 
+    def test_fixed_stress_splitting(self):
+        # The fixed stress iterations should reproduce the monolithic
+        # solution, with the same factorizations used for several right
+        # hand sides.
+        g = structured.CartGrid([4, 4])
+        g.compute_geometry()
+        discr = biot.Biot()
+
+        bound_faces = g.get_boundary_faces()
+        bound = bc.BoundaryCondition(g, bound_faces.ravel('F'),
+                                     ['dir'] * bound_faces.size)
+
+        mu = np.ones(g.num_cells)
+        c = tensor.FourthOrder(g.dim, mu, 2 * mu)
+        k = tensor.SecondOrder(g.dim, np.ones(g.num_cells))
+
+        param = Parameters(g)
+        param.set_bc('flow', bound)
+        param.set_bc('mechanics', bound)
+        param.set_tensor('flow', k)
+        param.set_tensor('mechanics', c)
+        param.porosity = np.ones(g.num_cells)
+        data = {'param': param,
+                'inverter': 'python',
+                'dt': 1
+               }
+
+        discr.discretize(g, data)
+        A, _ = discr.matrix_rhs(g, data, discretize=False)
+        residuals = []
+        slv = discr.fixed_stress(g, data,
+                                 callback=lambda i, r: residuals.append(r))
+
+        np.random.seed(0)
+        for _ in range(2):
+            b = np.random.rand(g.num_cells * (g.dim + 1))
+            x = slv(b)
+            assert np.allclose(x, np.linalg.solve(A.todense(), b))
+        assert residuals[-1] < 1e-10
+
     def test_face_vector_to_scalar(self):
         # Test of function face_vector_to_scalar
         nf = 3
@@ -0,0 +1,116 @@
+import numpy as np
+import scipy.sparse as sps
+import unittest
+import tempfile
+import shutil
+import signal
+import os
+
+from porepy.numerics import checkpoint, time_stepper
+from porepy.grids import structured
+from porepy.params.data import Parameters
+from porepy.params import tensor, bc
+from porepy.numerics.fv import mpfa
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.folder, 'checkpoint')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _setup(self):
+        g = structured.CartGrid([3, 3])
+        g.compute_geometry()
+        param = Parameters(g)
+        param.set_tensor('flow', tensor.SecondOrder(2, np.ones(g.num_cells)))
+        faces = g.get_boundary_faces()
+        param.set_bc('flow', bc.BoundaryCondition(g, faces,
+                                                  ['dir'] * faces.size))
+        param.set_bc_val('flow', np.arange(g.num_faces, dtype=np.float))
+        return g, {'param': param}
+
+    def test_save_load_matrices(self):
+        g, data = self._setup()
+        discr = mpfa.Mpfa('flow')
+        A, b = discr.matrix_rhs(g, data)
+        x = np.random.rand(g.num_cells)
+        checkpoint.save(self.file_name, x, 0.3, data)
+
+        _, data_new = self._setup()
+        y, t = checkpoint.load(self.file_name, data_new)
+        assert np.allclose(x, y)
+        assert t == 0.3
+        for key in ['flux', 'bound_flux']:
+            assert (data_new[key] != data[key]).nnz == 0
+        # No discretization needed
+        A_new, b_new = discr.matrix_rhs(g, data_new, discretize=False)
+        assert (A_new != A).nnz == 0
+        assert np.allclose(b_new, b)
+
+    def test_keys(self):
+        data = {'flux': sps.identity(3, format='csr'),
+                'stress': sps.identity(4, format='csr'), 'other': 1}
+        checkpoint.save(self.file_name, np.zeros(2), 1., data,
+                        keys=['stress'], compress=True)
+        data_new = {}
+        checkpoint.load(self.file_name, data_new)
+        assert list(data_new.keys()) == ['stress']
+        assert data_new['stress'].shape == (4, 4)
+
+    def test_periodic_dump(self):
+        cp = checkpoint.Checkpointer(self.file_name, every=2, signals=[])
+        written = [cp.dump(np.ones(2) * i, i) for i in range(5)]
+        assert written == [False, True, False, True, False]
+        x, t = checkpoint.load(self.file_name)
+        assert t == 3
+        assert np.allclose(x, 3)
+
+    def test_no_signals_by_default(self):
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+        handler = signal.getsignal(signal.SIGUSR1)
+        cp = checkpoint.Checkpointer(self.file_name)
+        assert signal.getsignal(signal.SIGUSR1) == handler
+        cp.close()
+
+    def test_signal_dump(self):
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+        handler = signal.getsignal(signal.SIGUSR1)
+        with checkpoint.Checkpointer(self.file_name,
+                                     signals=[signal.SIGUSR1]) as cp:
+            assert signal.getsignal(signal.SIGUSR1) != handler
+            assert not cp.dump(np.zeros(2), 0.)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert cp.dump(np.ones(2), 1.)
+            assert not cp.dump(np.zeros(2), 2.)
+            assert checkpoint.load(self.file_name)[1] == 1.
+        # The old handler is restored on exit
+        assert signal.getsignal(signal.SIGUSR1) == handler
+
+    def test_restart_reuses_matrices(self):
+        g, data = self._setup()
+        discr = mpfa.Mpfa('flow')
+        A, b = discr.matrix_rhs(g, data)
+        checkpoint.save(self.file_name, np.zeros(g.num_cells), 0.3, data)
+
+        _, data_new = self._setup()
+        solver = time_stepper.Implicit.__new__(time_stepper.Implicit)
+        solver.g, solver.data = g, data_new
+        checkpoint.load(self.file_name, data_new)
+
+        calls = []
+        discr.discretize = lambda *args: calls.append(args)
+        solver._reuse_discretization = True
+        A_new, b_new = solver._discretize(discr)
+        assert len(calls) == 0
+        assert (A_new != A).nnz == 0
+        assert np.allclose(b_new, b)
+
+        solver._reuse_discretization = False
+        solver._discretize(discr)
+        assert len(calls) == 1
@@ -0,0 +1,111 @@
+import numpy as np
+import scipy.spatial
+import unittest
+import tempfile
+import shutil
+import os
+import multiprocessing
+
+from porepy.fracs import meshing, simplex
+from porepy.fracs.fractures import Fracture, FractureNetwork
+from porepy.grids.simplex import TriangleGrid
+from porepy.grids.structured import TensorGrid
+
+# Folder where the fake mesher records the gmsh file names it is given
+_log_folder = None
+
+
+def _fake_triangle_grid(fracs, domain, **kwargs):
+    """ Replacement of simplex.triangle_grid that does not need gmsh. The
+    fracture is triangulated with a lattice and points along the
+    intersections, and the intersections are returned as 1d grids.
+    """
+    file_name = kwargs.get('file_name', 'gmsh_frac_file')
+    with open(file_name + '.geo', 'w'):
+        pass
+    with open(os.path.join(_log_folder, str(os.getpid())), 'a') as f:
+        f.write(file_name + '\n')
+
+    ip, edges = fracs['points'], fracs['edges']
+    lo, hi = domain.min(axis=1), domain.max(axis=1)
+    x, y = np.meshgrid(np.linspace(lo[0], hi[0], 5),
+                       np.linspace(lo[1], hi[1], 5))
+    pts = [domain, np.vstack((x.ravel(), y.ravel()))]
+    s = np.linspace(0, 1, 5)
+    for e in edges.T:
+        pts.append(ip[:, e[0:1]] + s * (ip[:, e[1:2]] - ip[:, e[0:1]]))
+    pts = np.unique(np.round(np.hstack(pts), 8), axis=1)
+    tri = scipy.spatial.Delaunay(pts.T).simplices.T
+    g = TriangleGrid(np.vstack((pts, np.zeros(pts.shape[1]))), tri)
+    g.global_point_ind = np.arange(g.num_nodes)
+
+    grids_1d = []
+    for e in edges.T:
+        start, tangent = ip[:, e[0]], ip[:, e[1]] - ip[:, e[0]]
+        diff = pts - start.reshape((-1, 1))
+        t = tangent.dot(diff) / tangent.dot(tangent)
+        dist = np.linalg.norm(diff - np.outer(tangent, t), axis=0)
+        on_line = np.where((dist < 1e-8) & (t > -1e-8) & (t < 1 + 1e-8))[0]
+        on_line = on_line[np.argsort(t[on_line])]
+        h = TensorGrid(np.arange(on_line.size))
+        h.nodes = g.nodes[:, on_line]
+        h.global_point_ind = on_line
+        grids_1d.append(h)
+    return [[g], grids_1d, []]
+
+
+@unittest.skipIf(getattr(multiprocessing, 'get_start_method',
+                         lambda: 'fork')() != 'fork',
+                 'the patched mesher is only inherited by forked workers')
+class TestParallelDfn(unittest.TestCase):
+
+    def setUp(self):
+        global _log_folder
+        _log_folder = tempfile.mkdtemp()
+        self.triangle_grid = simplex.triangle_grid
+        simplex.triangle_grid = _fake_triangle_grid
+        self.cwd = os.getcwd()
+        os.chdir(_log_folder)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        simplex.triangle_grid = self.triangle_grid
+        shutil.rmtree(_log_folder)
+
+    def _network(self):
+        f_1 = np.array([[-1, -1, 0], [1, -1, 0], [1, 1, 0], [-1, 1, 0]]).T
+        f_2 = np.array([[-1, 0, -1], [1, 0, -1], [1, 0, 1], [-1, 0, 1]]).T
+        f_3 = np.array([[0, -1, -1], [0, 1, -1], [0, 1, 1], [0, -1, 1]]).T
+        return FractureNetwork([Fracture(f) for f in [f_1, f_2, f_3]])
+
+    def test_non_conforming_parallel(self):
+        '''Meshing the fractures in worker processes should give the same
+        bucket as meshing them one after another, and the temporary gmsh
+        folders should be removed'''
+        gb_serial = meshing.dfn(self._network(), conforming=False)
+        gb = meshing.dfn(self._network(), conforming=False, num_proc=2)
+
+        assert gb.size() == gb_serial.size()
+        for dim in [2, 1]:
+            grids = gb.grids_of_dimension(dim)
+            known = gb_serial.grids_of_dimension(dim)
+            assert len(grids) == len(known)
+            for g, h in zip(grids, known):
+                assert g.num_cells == h.num_cells
+                assert np.array_equal(g.global_point_ind,
+                                      h.global_point_ind)
+
+        # One gmsh file name per fracture from the workers, each in its own
+        # temporary folder
+        file_names = []
+        for log in os.listdir(_log_folder):
+            if log.isdigit() and int(log) != os.getpid():
+                with open(os.path.join(_log_folder, log)) as f:
+                    file_names += f.read().split()
+        assert len(file_names) == 3
+        folders = set(os.path.dirname(f) for f in file_names)
+        assert len(folders) == 3
+        assert not any(os.path.exists(f) for f in folders)
+
+if __name__ == '__main__':
+    unittest.main()
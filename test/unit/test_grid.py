@@ -1,7 +1,13 @@
 import numpy as np
+import scipy.sparse as sps
 import unittest
 
-from porepy.grids import structured
+from porepy.grids import structured, simplex, grid, check
+from porepy.params import tensor, bc
+from porepy.fracs import meshing
+from porepy.params.data import Parameters
+from porepy.numerics.fv import mpfa, mpsa, time_of_flight
+from porepy.numerics.fv.transport import upwind
 
 #------------------------------------------------------------------------------#
 
@@ -23,4 +29,182 @@ class BasicsTest( unittest.TestCase ):
         known = np.repeat( np.sqrt(3), g.num_cells )
         assert np.allclose( cell_diameters, known )
 
+#------------------------------------------------------------------------------#
+
+    def test_memoized_topology(self):
+        g = structured.CartGrid([3, 2])
+        grid.topology_cache_statistics(reset=True)
+        cn = g.cell_nodes()
+        assert (g.cell_nodes() != cn).nnz == 0
+        stats = grid.topology_cache_statistics()
+        assert stats['cell_nodes'] == {'hits': 1, 'misses': 1}
+
+        # The returned values can be modified without affecting the cache
+        bf = g.get_boundary_faces()
+        bf[:] = -1
+        assert np.all(g.get_boundary_faces() >= 0)
+
+        # Reassignment of the topology invalidates the cache
+        g.face_nodes = g.face_nodes[:, ::-1].tocsc()
+        assert (g.cell_nodes() != cn).nnz > 0
+        assert grid.topology_cache_statistics()['cell_nodes']['misses'] == 2
+
+#------------------------------------------------------------------------------#
+
+    def test_memoized_face_tags(self):
+        g = structured.CartGrid([3, 2])
+        num_bound = g.get_boundary_faces().size
+        g.remove_face_tag(g.get_boundary_faces()[0], grid.FaceTag.BOUNDARY)
+        assert g.get_boundary_faces().size == num_bound - 1
+        g.face_tags = np.zeros_like(g.face_tags)
+        assert g.get_boundary_faces().size == 0
+
+#------------------------------------------------------------------------------#
+
+    def test_compact_topology(self):
+        '''Discretizations on a grid with compact topology should equal those
+        on the original grid'''
+        for g in [structured.CartGrid([3, 2]),
+                  simplex.StructuredTetrahedralGrid([2, 1, 1])]:
+            g.compute_geometry()
+            h = g.copy().compact_topology()
+            assert h.cell_faces.data.dtype == np.int8
+            assert h.face_nodes.indices.dtype == np.int32
+            assert np.array_equal(h.face_nodes.indices, g.face_nodes.indices)
+            nbytes = lambda m: m.data.nbytes + m.indices.nbytes \
+                + m.indptr.nbytes
+            assert nbytes(h.cell_faces) < 0.6 * nbytes(g.cell_faces)
+
+            out = []
+            for gr in [g, h]:
+                k = tensor.SecondOrder(gr.dim, np.ones(gr.num_cells))
+                c = tensor.FourthOrder(gr.dim, np.ones(gr.num_cells),
+                                       np.ones(gr.num_cells))
+                faces = gr.get_boundary_faces()
+                bnd = bc.BoundaryCondition(gr, faces, ['dir'] * faces.size)
+                out.append(mpfa.mpfa(gr, k, bnd, inverter='python')
+                           + mpsa.mpsa(gr, c, bnd, inverter='python'))
+            for a, b in zip(*out):
+                assert np.allclose((a - b).A, 0)
+
+            # Transport and time of flight
+            out = []
+            for gr in [g, h]:
+                solver = upwind.Upwind()
+                param = Parameters(gr)
+                faces = gr.get_boundary_faces()
+                param.set_bc(solver, bc.BoundaryCondition(
+                    gr, faces, ['neu'] * faces.size))
+                dis = solver.discharge(gr, [1, 0.5, 0.25])
+                data = {'param': param, 'discharge': dis}
+                q = np.ones(gr.num_cells)
+                poro = np.ones(gr.num_cells)
+                out.append(solver.matrix_rhs(gr, data)
+                           + (solver.outflow(gr, data),
+                              time_of_flight.compute_tof(gr, dis, poro, q),
+                              time_of_flight.compute_tof_reordered(
+                                  gr, dis, poro, q)))
+            for a, b in zip(*out):
+                if sps.issparse(a):
+                    a, b = a.A, b.A
+                assert np.allclose(a, b)
+
+#------------------------------------------------------------------------------#
+
+    def test_chunked_geometry_3d(self):
+        '''Geometry computed in blocks, with and without threads, should
+        equal the geometry computed in one go'''
+        g = simplex.StructuredTetrahedralGrid([3, 2, 2])
+        g.nodes += 0.1 * np.sin(5 * g.nodes)
+        g.compute_geometry()
+        for chunk_size, num_threads in [(7, None), (10, 3)]:
+            h = g.copy()
+            h.compute_geometry(chunk_size=chunk_size, num_threads=num_threads)
+            for key in ['face_areas', 'face_normals', 'face_centers',
+                        'cell_volumes', 'cell_centers']:
+                assert np.allclose(getattr(g, key), getattr(h, key))
+
+        # Topology stored row-wise
+        h = g.copy()
+        h.cell_faces = h.cell_faces.tocsr()
+        h.compute_geometry(chunk_size=7)
+        assert np.allclose(g.cell_volumes, h.cell_volumes)
+        assert np.allclose(g.cell_centers, h.cell_centers)
+
+        self.assertRaises(ValueError, g.copy().compute_geometry, chunk_size=0)
+
+#------------------------------------------------------------------------------#
+
+    def test_simplex_unique_faces(self):
+        '''Faces found from packed integer keys should equal those of
+        setmembership.unique_rows, also when the keys overflow int64'''
+        from porepy.utils import setmembership
+        face_nodes = np.sort(np.random.randint(0, 20, (2, 50)), axis=0)
+        known, _, known_ind = setmembership.unique_rows(face_nodes.T)
+        fn, ind = simplex._unique_face_nodes(face_nodes, simplex._byte_order)
+        assert np.all(fn.T == known) and np.all(ind == known_ind)
+
+        # Large node indices, and too many nodes per face for one key
+        for shape in [(3, 50), (20, 500)]:
+            face_nodes = np.sort(np.random.randint(0, 20, shape), axis=0)
+            face_nodes[:, 0] = 2**22
+            fn, ind = simplex._unique_face_nodes(face_nodes)
+            assert np.all(fn[:, ind] == face_nodes)
+            assert np.all(np.diff(ind[np.lexsort(face_nodes[::-1])]) >= 0)
+            assert ind.max() + 1 == setmembership.unique_rows(
+                face_nodes.T)[0].shape[0]
+
+        # Triangles given as floats
+        p = np.array([[0, 1, 1, 0], [0, 0, 1, 1]], dtype=np.float)
+        tri = np.array([[0, 1, 2], [0, 2, 3]]).T
+        g = simplex.TriangleGrid(p, tri.astype(np.float))
+        h = simplex.TriangleGrid(p, tri)
+        assert g.num_faces == 5
+        assert (g.face_nodes != h.face_nodes).nnz == 0
+        assert (g.cell_faces != h.cell_faces).nnz == 0
+
+#------------------------------------------------------------------------------#
+
+    def test_check_grid(self):
+        '''Valid grids should pass the sanity checks, while flipped normals,
+        duplicate nodes and faces without cells should be detected'''
+        for g in [structured.CartGrid(4), structured.CartGrid([3, 2]),
+                  simplex.StructuredTetrahedralGrid([2, 2, 2])]:
+            g.compute_geometry()
+            check.grid(g)
+
+        g = structured.CartGrid([3, 2])
+        g.compute_geometry()
+        g.face_normals[:, 4] *= -1
+        self.assertRaises(AssertionError, check.normal_orientation, g)
+        self.assertRaises(AssertionError, check.closed_cells, g)
+
+        g = structured.CartGrid([3, 2])
+        g.nodes[:, 1] = g.nodes[:, 0]
+        self.assertRaises(AssertionError, check.duplicate_nodes, g)
+
+        g = structured.CartGrid([3, 2])
+        g.cell_faces = g.cell_faces.tolil()
+        g.cell_faces[1, :] = 0
+        g.cell_faces = g.cell_faces.tocsc()
+        g.cell_faces.eliminate_zeros()
+        self.assertRaises(AssertionError, check.isolated_faces, g)
+
+#------------------------------------------------------------------------------#
+
+    def test_check_split_grid(self):
+        '''Grids split along fractures have coincident nodes on the fracture
+        faces, these should pass the sanity checks'''
+        f_2d = np.array([[1, 3], [2, 2]])
+        f_3d = np.array([[1, 3, 3, 1], [1, 1, 3, 3], [2, 2, 2, 2]])
+        for f, nx in [(f_2d, [4, 4]), (f_3d, [4, 4, 4])]:
+            gb = meshing.cart_grid([f], nx)
+            for g, _ in gb:
+                check.grid(g)
+
+        # Coincident nodes away from the fracture are still detected
+        g = gb.grids_of_dimension(3)[0]
+        g.nodes[:, 0] = g.nodes[:, 1]
+        self.assertRaises(AssertionError, check.duplicate_nodes, g)
+
 #------------------------------------------------------------------------------#
@@ -2,6 +2,7 @@ import unittest
 import numpy as np
 
 from porepy.utils import half_space
+from porepy.grids import structured, coarsening
 
 #------------------------------------------------------------------------------#
 
@@ -142,4 +143,22 @@ class BasicsTest( unittest.TestCase ):
         pt_known = np.array([0.9411337621203867, 0.3417142038105351, 0])
         assert np.allclose(pt, pt_known)
 
+#------------------------------------------------------------------------------#
+
+    def test_star_shape_cell_centers(self):
+        # Coarse cells of a Cartesian grid: an L-shaped cell whose centroid
+        # is outside its kernel, [0, 1] x [0, 1], and four squares.
+        g = structured.CartGrid([3, 3])
+        g.compute_geometry()
+        subdiv = np.array([0, 0, 0, 0, 1, 2, 0, 3, 4])
+        coarsening.generate_coarse_grid(g, subdiv)
+        centroids = np.array([[1.1, 1.5, 2.5, 1.5, 2.5],
+                              [1.1, 1.5, 1.5, 2.5, 2.5],
+                              [0, 0, 0, 0, 0]])
+
+        for num_proc in [1, 2]:
+            cc = half_space.star_shape_cell_centers(g, centroids, num_proc)
+            assert np.all(cc[:2, 0] > 0) and np.all(cc[:2, 0] < 1)
+            assert np.allclose(cc[:, 1:], centroids[:, 1:])
+
 #------------------------------------------------------------------------------#
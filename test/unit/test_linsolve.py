@@ -0,0 +1,86 @@
+import numpy as np
+import scipy.sparse as sps
+import unittest
+
+from porepy.numerics.linalg.linsolve import Factory
+
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+
+def _laplace_1d(n, scale=1.):
+    data = [-scale * np.ones(n - 1), 2 * scale * np.ones(n),
+            -scale * np.ones(n - 1)]
+    return sps.diags(data, [-1, 0, 1], format='csr')
+
+
+class TestFactoryCache(unittest.TestCase):
+
+    def test_lu_reuse(self):
+        A = _laplace_1d(10)
+        b = np.arange(10, dtype=np.float)
+        factory = Factory()
+        x = factory.lu(A)(b)
+        x2 = factory.lu(A.copy())(b)
+        assert np.allclose(A * x, b)
+        assert np.allclose(x, x2)
+        stats = factory.cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['value_updates'] == 0
+
+    def test_lu_new_values(self):
+        A = _laplace_1d(10)
+        B = _laplace_1d(10, scale=2)
+        b = np.arange(10, dtype=np.float)
+        factory = Factory()
+        factory.lu(A)
+        x = factory.lu(B)(b)
+        # The factorization should be updated with the new values
+        assert np.allclose(B * x, b)
+        stats = factory.cache_stats()
+        assert stats['misses'] == 1
+        assert stats['value_updates'] == 1
+        assert stats['size'] == 1
+
+    def test_no_cache(self):
+        A = _laplace_1d(10)
+        factory = Factory(use_cache=False)
+        factory.lu(A)
+        factory.lu(A)
+        stats = factory.cache_stats()
+        assert stats['misses'] == 2
+        assert stats['size'] == 0
+
+    def test_eviction(self):
+        factory = Factory(max_cache_size=2)
+        for n in range(3, 7):
+            factory.lu(_laplace_1d(n))
+        assert factory.cache_stats()['size'] == 2
+        # The least recently used matrix should have been evicted
+        factory.lu(_laplace_1d(3))
+        assert factory.cache_stats()['misses'] == 5
+
+    @unittest.skipIf(pyamg is None, 'pyamg not available')
+    def test_amg_reuse(self):
+        n = 200
+        A = _laplace_1d(n)
+        B = _laplace_1d(n, scale=3)
+        b = np.ones(n)
+        factory = Factory()
+        factory.amg(A, as_precond=False)
+        factory.amg(A, as_precond=False)
+        solve = factory.amg(B, as_precond=False)
+        x = solve(b)
+        # Compare with a hierarchy built from scratch
+        x_known = Factory().amg(B, as_precond=False)(b)
+        assert np.allclose(x, x_known)
+        stats = factory.cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['value_updates'] == 1
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import numpy as np
+import unittest
+import tempfile
+import shutil
+import os
+import time
+
+from porepy.fracs import meshing
+from porepy.fracs.fractures import Fracture
+from porepy.fracs.mesh_cache import MeshCache
+
+
+class TestMeshCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _bucket(self):
+        f = np.array([[0, 2, 2, 0], [1, 1, 1, 1], [0, 0, 2, 2]])
+        return meshing.cart_grid([f], [2, 2, 2])
+
+    def test_key(self):
+        cache = MeshCache(self.folder)
+        f = np.array([[0, 1, 1, 0], [0, 0, 1, 1], [.5, .5, .5, .5]])
+        domain = {'xmin': 0, 'xmax': 1, 'ymin': 0, 'ymax': 1, 'zmin': 0,
+                  'zmax': 1}
+        k = cache.key([f], domain, h_ideal=0.1)
+        # Order of keywords and ignored keywords do not matter
+        assert k == cache.key([f], dict(reversed(list(domain.items()))),
+                              h_ideal=0.1, verbose=2)
+        assert k != cache.key([f], domain, h_ideal=0.2)
+        assert k != cache.key([f + 1e-10], domain, h_ideal=0.1)
+        assert k != cache.key([Fracture(f)], domain, h_ideal=0.1)
+        with self.assertRaises(ValueError):
+            cache.key(object())
+
+    def test_get_put(self):
+        cache = MeshCache(self.folder)
+        gb = self._bucket()
+        gb.assign_node_ordering()
+        assert cache.get('a') is None
+        cache.put('a', gb)
+        assert 'a' in cache
+        gb_new = cache.get('a')
+        assert gb_new.size() == gb.size()
+        assert gb_new.num_cells() == gb.num_cells()
+
+    def test_lru_eviction(self):
+        cache = MeshCache(self.folder, max_entries=2)
+        gb = self._bucket()
+        cache.put('a', gb)
+        cache.put('b', gb)
+        # Use a, so that b is the least recently used entry
+        past = time.time() - 10
+        os.utime(cache._file_name('b'), (past, past))
+        cache.get('a')
+        cache.put('c', gb)
+        assert len(cache) == 2
+        assert 'a' in cache and 'c' in cache and 'b' not in cache
+
+        size = os.path.getsize(cache._file_name('a'))
+        cache = MeshCache(self.folder, max_bytes=1.5 * size)
+        cache.put('d', gb)
+        assert len(cache) == 1 and 'd' in cache
+
+    def test_simplex_grid_hit(self):
+        '''On a cache hit, the bucket is returned without meshing'''
+        cache = MeshCache(self.folder)
+        f = np.array([[0, 1, 1, 0], [0, 0, 1, 1], [.5, .5, .5, .5]])
+        domain = {'xmin': 0, 'xmax': 1, 'ymin': 0, 'ymax': 1, 'zmin': 0,
+                  'zmax': 1}
+        kwargs = {'h_ideal': 0.5, 'h_min': 0.5}
+        key = cache.key('simplex_grid', [f], domain, None, [], **kwargs)
+        gb = self._bucket()
+        cache.put(key, gb)
+        gb_new = meshing.simplex_grid([f], domain, mesh_cache=cache, **kwargs)
+        assert gb_new.num_cells() == gb.num_cells()
@@ -1,5 +1,7 @@
 import unittest
 import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.csgraph
 
 from porepy.grids import structured, simplex, partition
 
@@ -221,6 +223,31 @@ class TestOverlap(unittest.TestCase):
         unittest.main()
 
 
+class TestPartitionGrid(unittest.TestCase):
+
+    def test_partition_grid_overlap(self):
+        # All subgrids extracted at once should equal those extracted one by
+        # one, also with overlap layers
+        g = simplex.StructuredTriangleGrid(np.array([5, 4]))
+        g.compute_geometry()
+        p = np.repeat(np.array([3, 0, 7, 5]), 10)
+        for num_layers in [0, 1]:
+            sub_g, face_maps, node_maps = partition.partition_grid(g, p,
+                                                                   num_layers)
+            for i, pi in enumerate(np.unique(p)):
+                ci = partition.overlap(g, np.where(p == pi)[0], num_layers)
+                h, sub_f, sub_n = partition.extract_subgrid(g, ci)
+                assert np.array_equal(sub_g[i].parent_cell_ind, ci)
+                assert np.array_equal(face_maps[i], sub_f)
+                assert np.array_equal(node_maps[i], sub_n)
+                assert (sub_g[i].cell_faces != h.cell_faces).nnz == 0
+                assert (sub_g[i].face_nodes != h.face_nodes).nnz == 0
+                assert np.array_equal(sub_g[i].face_normals, h.face_normals)
+
+    if __name__ == '__main__':
+        unittest.main()
+
+
 class TestConnectivityChecker(unittest.TestCase):
 
     def setup(self):
@@ -273,3 +300,46 @@ class TestConnectivityChecker(unittest.TestCase):
 
     if __name__ == '__main__':
         unittest.main()
+
+
+class TestBisection(unittest.TestCase):
+
+    def is_connected(self, g, p):
+        c2c = g.cell_connection_map().tocsr()
+        for i in np.unique(p):
+            ci = np.where(p == i)[0]
+            num_comp, _ = sps.csgraph.connected_components(c2c[ci][:, ci])
+            if num_comp > 1:
+                return False
+        return True
+
+    def test_rcb_cart_2d(self):
+        g = structured.CartGrid([8, 6])
+        g.compute_geometry()
+        p = partition.partition_rcb(g, 4)
+        assert np.array_equal(np.bincount(p), 12 * np.ones(4))
+        assert self.is_connected(g, p)
+
+    def test_rcb_weights(self):
+        g = simplex.StructuredTriangleGrid([6, 6])
+        g.compute_geometry()
+        w = np.ones(g.num_cells)
+        w[g.cell_centers[0] < 3] = 3
+        p = partition.partition_rcb(g, 3, w)
+        part_weight = np.bincount(p, weights=w)
+        assert np.all(np.abs(part_weight - w.sum() / 3) < 6)
+        assert self.is_connected(g, p)
+
+    def test_spectral_3d(self):
+        g = structured.CartGrid([5, 4, 3])
+        p = partition.partition_spectral(g, 3)
+        assert np.array_equal(np.bincount(p), 20 * np.ones(3))
+        assert self.is_connected(g, p)
+
+    def test_make_connected(self):
+        g = structured.CartGrid([4, 1])
+        p = partition.make_connected(g, np.array([0, 1, 0, 1]))
+        assert np.array_equal(p, np.array([0, 0, 0, 1]))
+
+    if __name__ == '__main__':
+        unittest.main()
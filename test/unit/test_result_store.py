@@ -0,0 +1,71 @@
+import numpy as np
+import unittest
+import tempfile
+import shutil
+
+from porepy.numerics.result_store import ResultStore
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _fill(self, store, num_steps):
+        states = [np.arange(6) + i for i in range(num_steps)]
+        for i, x in enumerate(states):
+            store.append(0.1 * i, x)
+        return states
+
+    def test_random_access(self):
+        for compress in [False, True]:
+            store = ResultStore(self.folder, 'p', chunk_size=3,
+                                compress=compress)
+            states = self._fill(store, 8)
+            # Access before and after flush
+            for flush in [False, True]:
+                if flush:
+                    store.close()
+                assert len(store) == 8
+                assert np.allclose(store.times, 0.1 * np.arange(8))
+                for i in [0, 4, 7, -1]:
+                    assert np.allclose(store[i], states[i])
+            # Only the incomplete chunk is kept in memory
+            assert len(store._buffer) == 2
+
+    def test_decimation(self):
+        store = ResultStore(self.folder, 'p', every=3, chunk_size=2)
+        states = self._fill(store, 8)
+        assert len(store) == 3
+        assert np.allclose(store.times, [0, 0.3, 0.6])
+        assert np.allclose(store[1], states[3])
+        assert store.time_index(0.65) == 2
+
+    def test_reopen_and_stream(self):
+        store = ResultStore(self.folder, 'p', chunk_size=3, compress=True)
+        states = self._fill(store, 5)
+        store.close()
+
+        store = ResultStore.open(self.folder, 'p')
+        assert len(store) == 5
+        store.append(0.5, np.arange(6) + 5)
+        store.append(0.6, np.arange(6) + 6)
+        store.close()
+
+        store = ResultStore.open(self.folder, 'p')
+        streamed = [(t, x) for t, x in store]
+        assert len(streamed) == 7
+        for i, (t, x) in enumerate(streamed):
+            assert np.isclose(t, 0.1 * i)
+            assert np.allclose(x, np.arange(6) + i)
+
+    def test_shape_mismatch(self):
+        store = ResultStore(self.folder, 'p')
+        store.append(0, np.zeros(3))
+        self.assertRaises(ValueError, store.append, 1, np.zeros(4))
+
+    if __name__ == '__main__':
+        unittest.main()
@@ -0,0 +1,76 @@
+import numpy as np
+import unittest
+import tempfile
+import shutil
+import os
+
+from porepy.grids import structured, simplex, serialization
+from porepy.fracs import meshing
+
+
+class TestGridSerialization(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.folder, 'grid.npz')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _compare_grids(self, g, h):
+        assert type(g) is type(h)
+        assert set(g.__dict__.keys()) == set(h.__dict__.keys())
+        for key, val in g.__dict__.items():
+            other = getattr(h, key)
+            if isinstance(val, np.ndarray):
+                assert np.array_equal(val, other)
+            elif hasattr(val, 'nnz'):
+                # The index ordering must be preserved
+                assert np.array_equal(val.indices, other.indices)
+                assert np.array_equal(val.indptr, other.indptr)
+                assert np.array_equal(val.data, other.data)
+            else:
+                assert val == other
+
+    def test_grids(self):
+        grids = [structured.CartGrid([3, 2, 2]),
+                 simplex.StructuredTriangleGrid([2, 3]),
+                 structured.TensorGrid(np.array([0, 1, 3]))]
+        for g in grids:
+            g.compute_geometry()
+            g.global_point_ind = np.arange(g.num_nodes)
+            for mmap in [True, False]:
+                serialization.save_grid(g, self.file_name)
+                h = serialization.load_grid(self.file_name, mmap=mmap)
+                self._compare_grids(g, h)
+
+    def test_geometry_of_loaded_grid(self):
+        g = simplex.StructuredTetrahedralGrid([2, 2, 2])
+        serialization.save_grid(g, self.file_name)
+        h = serialization.load_grid(self.file_name)
+        g.compute_geometry()
+        h.compute_geometry()
+        assert np.allclose(g.cell_volumes, h.cell_volumes)
+        assert np.allclose(g.face_normals, h.face_normals)
+
+    def test_grid_bucket(self):
+        f_1 = np.array([[0, 2, 2, 0], [1, 1, 1, 1], [0, 0, 2, 2]])
+        f_2 = np.array([[1, 1, 1, 1], [0, 2, 2, 0], [0, 0, 2, 2]])
+        gb = meshing.cart_grid([f_1, f_2], [2, 2, 2])
+        gb.assign_node_ordering()
+        serialization.save_grid_bucket(gb, self.file_name)
+        gb_new = serialization.load_grid_bucket(self.file_name)
+
+        assert gb_new.size() == gb.size()
+        assert gb_new.graph.number_of_edges() == gb.graph.number_of_edges()
+        grids = {d['node_number']: g for g, d in gb}
+        grids_new = {d['node_number']: g for g, d in gb_new}
+        assert sorted(grids.keys()) == sorted(grids_new.keys())
+        for num, g in grids.items():
+            self._compare_grids(g, grids_new[num])
+
+        numbers = {g: d['node_number'] for g, d in gb}
+        for e, d in gb.edges_props():
+            e_new = (grids_new[numbers[e[0]]], grids_new[numbers[e[1]]])
+            fc_new = gb_new.edge_prop(e_new, 'face_cells')[0]
+            assert (fc_new != d['face_cells']).nnz == 0
@@ -3,6 +3,7 @@ import numpy as np
 import unittest
 
 from porepy.grids import structured, simplex
+from porepy.grids.grid import Grid
 from porepy.utils import setmembership
 
 
@@ -199,6 +200,37 @@ class TestCartGridGeometry1CellPert3D(unittest.TestCase):
     if __name__ == '__main__':
         unittest.main()
 
+class TestTensorGridClosedFormGeometry(unittest.TestCase):
+    """ The closed form geometry should equal the general algorithm. """
+
+    def _compare(self, g, h):
+        g.compute_geometry()
+        Grid.compute_geometry(h)
+        for key in ['face_areas', 'face_normals', 'face_centers',
+                    'cell_volumes', 'cell_centers']:
+            assert np.allclose(getattr(g, key), getattr(h, key))
+
+    def test_tensor_2d(self):
+        x = np.array([0, .3, 1.])
+        y = np.array([0, 2, 2.5, 4])
+        self._compare(structured.TensorGrid(x, y),
+                      structured.TensorGrid(x, y))
+
+    def test_tensor_3d(self):
+        x = np.array([0, .3, 1.])
+        y = np.array([0, 2, 2.5, 4])
+        z = np.array([1, 1.5, 3, 3.2])
+        self._compare(structured.TensorGrid(x, y, z),
+                      structured.TensorGrid(x, y, z))
+
+    def test_perturbed_nodes(self):
+        g = structured.CartGrid([2, 2, 2])
+        h = structured.CartGrid([2, 2, 2])
+        g.nodes[0, 13] += 0.2
+        h.nodes[0, 13] += 0.2
+        assert not g._is_lattice()
+        self._compare(g, h)
+
 class TestStructuredTriangleGridGeometry(unittest.TestCase):
     """ Create simplest possible configuration, test sanity of geometric
     quantities.
@@ -328,3 +360,24 @@ class TestStructuredSimplexGridCoverage(unittest.TestCase):
 
     if __name__ == '__main__':
         unittest.main()
+
+
+class TestStructuredSimplexFaceNumbering(unittest.TestCase):
+    """ The analytic face numbering of the structured simplex grids should
+    give the same topology as the general simplex grids.
+    """
+    def test_triangles(self):
+        g = simplex.StructuredTriangleGrid(np.array([4, 3]))
+        g_gen = simplex.TriangleGrid(g.nodes[:2], g.cell_node_matrix().T)
+        assert (g.face_nodes != g_gen.face_nodes).nnz == 0
+        assert (g.cell_faces != g_gen.cell_faces).nnz == 0
+
+    def test_tets(self):
+        g = simplex.StructuredTetrahedralGrid(np.array([2, 3, 2]))
+        tet = g.cell_nodes().indices.reshape((4, -1), order='F')
+        g_gen = simplex.TetrahedralGrid(g.nodes, tet)
+        assert (g.face_nodes != g_gen.face_nodes).nnz == 0
+        assert (g.cell_faces != g_gen.cell_faces).nnz == 0
+
+    if __name__ == '__main__':
+        unittest.main()
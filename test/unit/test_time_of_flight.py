@@ -0,0 +1,85 @@
+import numpy as np
+import unittest
+
+from porepy.grids import structured
+from porepy.numerics.fv import time_of_flight, fvutils
+
+
+class TestReorderedTimeOfFlight(unittest.TestCase):
+
+    def setup(self):
+        g = structured.CartGrid([5, 4])
+        g.compute_geometry()
+        np.random.seed(42)
+        # A random flux field will contain cycles. The sources are positive
+        # in all cells, so that the system is non-singular.
+        flux = np.random.rand(g.num_faces) - 0.5
+        q = np.random.rand(g.num_cells)
+        poro = 0.2 * np.ones(g.num_cells)
+        return g, flux, poro, q
+
+    def test_chain(self):
+        g = structured.CartGrid([4, 1])
+        g.compute_geometry()
+        flux = np.zeros(g.num_faces)
+        flux[:5] = 1
+        q = np.zeros(g.num_cells)
+        q[0] = 1
+        poro = np.ones(g.num_cells)
+
+        A = time_of_flight._upwind_system(g, flux, q)[0]
+        cell_order, comp_ptr, level_ptr = fvutils.flow_ordering(A)
+        assert np.all(cell_order == np.arange(4))
+        assert np.all(np.diff(comp_ptr) == 1)
+        assert level_ptr.size == 5
+
+        tof = time_of_flight.compute_tof_reordered(g, flux, poro, q)
+        known = time_of_flight.compute_tof(g, flux, poro, q)
+        assert np.allclose(tof, known)
+        assert np.allclose(tof, [0.5, 1.5, 2.5, 3.5])
+
+    def test_random_flux(self):
+        g, flux, poro, q = self.setup()
+        tof = time_of_flight.compute_tof_reordered(g, flux, poro, q)
+        known = time_of_flight.compute_tof(g, flux, poro, q)
+        assert np.allclose(tof, known)
+
+    def test_cycle(self):
+        # Circulation 0 -> 1 -> 3 -> 2 -> 0 in a 2x2 grid
+        g = structured.CartGrid([2, 2])
+        g.compute_geometry()
+        flux = np.zeros(g.num_faces)
+        flux[[1, 9]] = 1
+        flux[[4, 8]] = -1
+        q = np.array([1, 0.5, 0.1, 0.2])
+        poro = np.ones(g.num_cells)
+
+        A = time_of_flight._upwind_system(g, flux, q)[0]
+        _, comp_ptr, _ = fvutils.flow_ordering(A)
+        assert comp_ptr.size == 2
+
+        tof, c = time_of_flight.compute_tof_reordered(
+            g, flux, poro, q, tracers=[np.array([0]), np.array([1, 2, 3])])
+        known = time_of_flight.compute_tof(g, flux, poro, q)
+        assert np.allclose(tof, known)
+        assert np.allclose(c.sum(axis=0), 1)
+
+    def test_backward(self):
+        g, flux, poro, q = self.setup()
+        tof = time_of_flight.compute_tof_reordered(g, flux, poro, -q,
+                                                   backward=True)
+        known = time_of_flight.compute_tof(g, -flux, poro, q)
+        assert np.allclose(tof, known)
+
+    def test_tracer_partition(self):
+        g, flux, poro, q = self.setup()
+        tracers = [np.arange(10), np.arange(10, g.num_cells)]
+        tof, c = time_of_flight.compute_tof_reordered(g, flux, poro, q,
+                                                      tracers=tracers)
+        assert np.allclose(tof, time_of_flight.compute_tof(g, flux, poro, q))
+        assert c.shape == (2, g.num_cells)
+        assert np.allclose(c.sum(axis=0), 1)
+        assert np.all(c >= 0)
+
+    if __name__ == '__main__':
+        unittest.main()
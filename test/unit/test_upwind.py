@@ -511,4 +511,42 @@ class BasicsTest( unittest.TestCase ):
         assert np.allclose(rhs, rhs_known, rtol, atol)
         assert np.allclose(deltaT, deltaT_known, rtol, atol)
 
+#------------------------------------------------------------------------------#
+
+    def test_upwind_operator_refresh(self):
+        g = structured.CartGrid([3, 2], [1, 1])
+        g.compute_geometry()
+
+        solver = upwind.Upwind()
+        param = Parameters(g)
+        bf = g.get_boundary_faces()
+        bc = BoundaryCondition(g, bf, bf.size * ['dir'])
+        param.set_bc(solver, bc)
+        param.set_bc_val(solver, np.arange(g.num_faces, dtype=np.float))
+
+        data = {'param': param, 'discharge': solver.discharge(g, [1, 0, 0])}
+        M_0, rhs_0 = solver.matrix_rhs(g, data)
+        operator = data['upwind_operator']
+
+        # A new discharge field should reuse the operator
+        data['discharge'] = solver.discharge(g, [-1, 2, 0])
+        M, rhs = solver.matrix_rhs(g, data)
+        assert data['upwind_operator'] is operator
+
+        fresh = {'param': param, 'discharge': data['discharge']}
+        M_known, rhs_known = solver.matrix_rhs(g, fresh)
+        assert np.allclose(M.todense(), M_known.todense())
+        assert np.allclose(rhs, rhs_known)
+
+        # The matrix from the previous discharge is left untouched, unless
+        # the refresh is done in place
+        M_first = solver.matrix_rhs(g, {'param': param,
+                                        'discharge': solver.discharge(
+                                            g, [1, 0, 0])})[0]
+        assert np.allclose(M_0.todense(), M_first.todense())
+        M_in_place = operator.refresh(solver.discharge(g, [1, 0, 0]),
+                                      in_place=True)
+        assert M_in_place is operator.matrix
+        assert np.allclose(M_in_place.todense(), M_first.todense())
+
 #------------------------------------------------------------------------------#